@@ -1 +1,3 @@
-from .insertionsort import insertion_sort
\ No newline at end of file
+from .insertionsort import insertion_sort
+from .radixsort import radix_sort
+from .countingsort import counting_sort
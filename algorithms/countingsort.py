@@ -0,0 +1,50 @@
+from data_structures.referential_array import ArrayR, T
+from data_structures.abstract_list import List
+from typing import Callable
+
+
+def counting_sort(items: ArrayR[T] | List[T], key: Callable[[T], int], radix: int) -> ArrayR[T] | List[T]:
+    """
+    Sort an array or list using a stable counting sort.
+    It sorts arrays inplace (mutation), and returns a copy for lists.
+    The returned list is of the same type as the argument.
+
+    key must return an int in range(radix), and items are ordered by it. Equal keys keep
+    their original relative order. key is evaluated once per item.
+
+    :complexity:
+        Best = Worst case O(N + radix)
+        Where N is the length of the list.
+    """
+    arr = items if type(items) is ArrayR else ArrayR.from_list(items)
+    n = len(arr)
+
+    keys = ArrayR(n)
+    # counts[k + 1] counts key k, so that the prefix sums give each key's first position.
+    counts = ArrayR(radix + 1)
+    for b in range(radix + 1):
+        counts[b] = 0
+    for i in range(n):
+        k = key(arr[i])
+        keys[i] = k
+        counts[k + 1] += 1
+    for b in range(1, radix + 1):
+        counts[b] += counts[b - 1]
+
+    buffer = ArrayR(n)
+    for i in range(n):
+        k = keys[i]
+        position = counts[k]
+        counts[k] = position + 1
+        buffer[position] = arr[i]
+    for i in range(n):
+        arr[i] = buffer[i]
+
+    if type(items) is ArrayR:
+        return arr
+
+    # Construct a new list of same type as items
+    res = type(items)()
+    for item in arr:
+        res.append(item)
+    return res
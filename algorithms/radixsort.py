@@ -0,0 +1,121 @@
+from data_structures.referential_array import ArrayR, T
+from data_structures.abstract_list import List
+from data_structures.linked_stack import LinkedStack
+from typing import Callable, Sequence
+
+# Segments of at most this many items are finished by insertion sort.
+_CUTOFF = 32
+
+
+def radix_sort(items: ArrayR[T] | List[T], key: Callable[[T], Sequence[int]], radix: int = 256) -> ArrayR[T] | List[T]:
+    """
+    Sort an array or list using a stable most-significant-digit radix sort.
+    It sorts arrays inplace (mutation), and returns a copy for lists.
+    The returned list is of the same type as the argument.
+
+    key must return a sequence of digits in range(radix), such as a bytes object, and
+    items are ordered lexicographically by it (a key that is a prefix of another sorts
+    first). Equal keys keep their original relative order. key is evaluated once per item.
+
+    :complexity:
+        Best case O(N) when the first digit already separates the items into
+        segments of at most _CUTOFF
+        Worst case O(N * K) when keys share long prefixes
+        Where N is the length of the list and K the key length (plus O(radix) per segment
+        split).
+    """
+    arr = items if type(items) is ArrayR else ArrayR.from_list(items)
+    n = len(arr)
+
+    # Each item travels with its key, so a move is a single array write.
+    pairs = ArrayR(n)
+    for i in range(n):
+        item = arr[i]
+        pairs[i] = (key(item), item)
+    buffer = ArrayR(n)
+    # Bucket 0 holds keys that end at this digit; digit d goes to bucket d + 1.
+    counts = ArrayR(radix + 2)
+
+    segments = LinkedStack()
+    segments.push((0, n, 0))
+    while len(segments) > 0:
+        lo, hi, depth = segments.pop()
+
+        if hi - lo <= _CUTOFF:
+            for i in range(lo + 1, hi):
+                i_pair = pairs[i]
+                i_key = i_pair[0]
+                j = i - 1
+                while j >= lo and i_key < pairs[j][0]:
+                    pairs[j + 1] = pairs[j]
+                    j -= 1
+                pairs[j + 1] = i_pair
+            continue
+
+        if not _count_digits(pairs, lo, hi, depth, counts, radix):
+            # Every key has the same digit here: skip to the first digit where the
+            # smallest and largest keys differ, which all keys share up to.
+            smallest = largest = pairs[lo][0]
+            for i in range(lo + 1, hi):
+                k = pairs[i][0]
+                if k < smallest:
+                    smallest = k
+                elif largest < k:
+                    largest = k
+            stop = len(smallest)
+            while depth < stop and smallest[depth] == largest[depth]:
+                depth += 1
+            if smallest == largest:
+                continue
+            _count_digits(pairs, lo, hi, depth, counts, radix)
+
+        # counts[b] becomes the first position of bucket b - 1.
+        counts[0] = lo
+        for b in range(1, radix + 2):
+            counts[b] += counts[b - 1]
+        for i in range(lo, hi):
+            pair = pairs[i]
+            k = pair[0]
+            b = k[depth] + 1 if depth < len(k) else 0
+            position = counts[b]
+            counts[b] = position + 1
+            buffer[position] = pair
+        for i in range(lo, hi):
+            pairs[i] = buffer[i]
+
+        # counts[b] is now the end of bucket b; bucket 0 (ended keys) is already final.
+        start = counts[0]
+        for b in range(1, radix + 1):
+            stop = counts[b]
+            if stop - start > 1:
+                segments.push((start, stop, depth + 1))
+            start = stop
+
+    for i in range(n):
+        arr[i] = pairs[i][1]
+
+    if type(items) is ArrayR:
+        return arr
+
+    # Construct a new list of same type as items
+    res = type(items)()
+    for item in arr:
+        res.append(item)
+    return res
+
+
+def _count_digits(pairs: ArrayR, lo: int, hi: int, depth: int, counts: ArrayR, radix: int) -> bool:
+    """
+    Counts the keys of pairs[lo:hi] into counts[b + 1] by their bucket b at `depth`.
+    Returns False if they all fell into the same bucket.
+    :complexity: O(hi - lo + radix)
+    """
+    for b in range(radix + 2):
+        counts[b] = 0
+    for i in range(lo, hi):
+        k = pairs[i][0]
+        counts[k[depth] + 2 if depth < len(k) else 1] += 1
+    for b in range(1, radix + 2):
+        if counts[b] != 0:
+            return counts[b] != hi - lo
+    return False
@@ -0,0 +1,77 @@
+"""
+Benchmark: event-loop stalls while a coroutine drains a ProcessingLine, iterating it
+synchronously (signing inline on the loop) versus with `async for` (signing batches on
+an executor).
+
+A heartbeat task asks to wake every 1 ms and records how late each wake-up is; the
+reported stalls are those delays.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_line [N]
+
+Defaults to N = 50,000 transactions.
+"""
+import asyncio
+import sys
+import time
+
+from processing_line import ProcessingLine, Transaction
+
+TICK = 0.001
+
+
+def make_line(n):
+    line = ProcessingLine(Transaction(n // 2, "carol", "dave"))
+    line.add_transactions(Transaction(i, "alice", "bob") for i in range(n))
+    return line
+
+
+async def heartbeat(stalls, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        stalls.append(time.perf_counter() - start - TICK)
+
+
+async def drain_sync(line):
+    count = 0
+    for _ in line:
+        count += 1
+        if count % 10_000 == 0:
+            await asyncio.sleep(0)  # a typical "cooperative" consumer
+    return count
+
+
+async def drain_async(line):
+    count = 0
+    async for _ in line:
+        count += 1
+    return count
+
+
+async def measure(drain, n):
+    line = make_line(n)
+    stalls = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stalls, stop))
+    await asyncio.sleep(TICK)
+    start = time.perf_counter()
+    count = await drain(line)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    assert count == n + 1
+    stalls.sort()
+    return elapsed, stalls[-1], stalls[int(0.99 * (len(stalls) - 1))], len(stalls)
+
+
+def main(n):
+    print(f"N = {n}")
+    for name, drain in (("sync for", drain_sync), ("async for", drain_async)):
+        elapsed, worst, p99, beats = asyncio.run(measure(drain, n))
+        print(f"  {name:<10} total {elapsed:6.2f} s  heartbeats {beats:6d}  "
+              f"max stall {worst * 1e3:8.1f} ms  p99 stall {p99 * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
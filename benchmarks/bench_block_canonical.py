@@ -0,0 +1,66 @@
+"""
+Benchmark: BlockGrouper.canonical() for every block size S of 36-character signatures,
+sorting the blocks by insertion sort alone, by counting sort on the leading symbol
+followed by insertion sort, and as chosen automatically by block count
+(COUNTING_SORT_BLOCKS).
+
+Run from the repository root:
+    python -m benchmarks.bench_block_canonical [N]
+
+Defaults to N = 20,000 signatures.
+"""
+import sys
+import time
+
+from benchmarks.bench_book_compressed import make_random
+from data_structures import ArrayR
+from fraud_detection import BlockGrouper
+
+
+class InsertionGrouper(BlockGrouper):
+    COUNTING_SORT_BLOCKS = 37
+
+
+class CountingGrouper(BlockGrouper):
+    COUNTING_SORT_BLOCKS = 2
+
+
+def canonical_all(grouper, signatures, S):
+    blocks = ArrayR(len(signatures[0]) // S)
+    return [grouper.canonical(sig, S, blocks) for sig in signatures]
+
+
+def timed(run, repeat=3):
+    """ Best of repeat runs, as the timings of one run are only tens of milliseconds. """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(n):
+    signatures = [tr.signature for tr in make_random(n)]
+    L = len(signatures[0])
+    print(f"N = {n}, L = {L}, COUNTING_SORT_BLOCKS = {BlockGrouper.COUNTING_SORT_BLOCKS} "
+          f"(us per signature)")
+    print(f"  {'S':>3} {'blocks':>6} {'insertion':>10} {'counting':>9} {'auto':>7} {'speedup':>8}")
+    totals = [0.0, 0.0, 0.0]
+    for S in range(1, L + 1):
+        insertion, expected = timed(lambda: canonical_all(InsertionGrouper, signatures, S))
+        counting, keys = timed(lambda: canonical_all(CountingGrouper, signatures, S))
+        assert keys == expected
+        auto, keys = timed(lambda: canonical_all(BlockGrouper, signatures, S))
+        assert keys == expected
+        for k, elapsed in enumerate((insertion, counting, auto)):
+            totals[k] += elapsed
+        print(f"  {S:>3} {L // S:>6} {insertion / n * 1e6:>10.1f} {counting / n * 1e6:>9.1f} "
+              f"{auto / n * 1e6:>7.1f} {insertion / auto:>8.2f}")
+    print(f"  total (s) {totals[0]:>10.2f} {totals[1]:>9.2f} {totals[2]:>7.2f} "
+          f"{totals[0] / totals[2]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
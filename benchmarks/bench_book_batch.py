@@ -0,0 +1,70 @@
+"""
+Benchmark: ProcessingBook.get_many() and delete_many() against looking up / deleting the
+same transactions one at a time, for batches of growing size, given in random order
+and already in page order, on two workloads:
+
+  random   real signatures from Transaction.sign (shallow trie, where the batch
+           methods look up / delete each transaction on its own)
+  prefix   signatures sharing a long common prefix (deep trie, where sharing the
+           descent saves the most)
+
+Batches below ProcessingBook.SHARED_DESCENT_MIN_BATCH also go one by one, and get_many()
+only shares the descent for batches already in page order.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_batch [N] [PREFIX]
+
+Defaults to N = 200,000 entries and a 30-character shared prefix.
+"""
+import random
+import sys
+import time
+
+from benchmarks.bench_book_compressed import make_random
+from benchmarks.bench_book_deep import make_transactions as make_prefixed
+from processing_book import ProcessingBook
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def get_each(book, txs):
+    for tr in txs:
+        book[tr]
+
+
+def delete_each(book, txs):
+    for tr in txs:
+        del book[tr]
+
+
+def main(n, prefix_len):
+    for label, txs in (("random", make_random(n)), (f"prefix{prefix_len}", make_prefixed(n, prefix_len))):
+        pairs = [(tr, i) for i, tr in enumerate(txs)]
+        book = ProcessingBook.bulk_load(pairs)
+        print(f"{label}: N = {n}")
+        print(f"  {'batch':>7} {'order':>6} {'get each (ms)':>14} {'get_many (ms)':>14} {'speedup':>8} "
+              f"{'del each (ms)':>14} {'delete_many (ms)':>17} {'speedup':>8}")
+        # Batches are samples of the book's entries, so at most n of them.
+        for size in sorted({min(size, n) for size in (16, 1_000, 10_000, 50_000)}):
+            shuffled = random.Random(size).sample(txs, size)
+            ordered = sorted(shuffled, key=lambda tr: book.page_indices(tr.signature))
+            for order, batch in (("random", shuffled), ("page", ordered)):
+                each = timed(lambda: get_each(book, batch))
+                many = timed(lambda: book.get_many(batch))
+
+                target = ProcessingBook.bulk_load(pairs)
+                del_each = timed(lambda: delete_each(target, batch))
+                target = ProcessingBook.bulk_load(pairs)
+                del_many = timed(lambda: target.delete_many(batch))
+                assert len(target) == n - size
+                print(f"  {size:>7} {order:>6} {each * 1e3:>14.1f} {many * 1e3:>14.1f} {each / many:>8.2f} "
+                      f"{del_each * 1e3:>14.1f} {del_many * 1e3:>17.1f} {del_each / del_many:>8.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
@@ -0,0 +1,89 @@
+"""
+Benchmark: building a book with item-by-item `book[tr] = amount` versus
+ProcessingBook.bulk_load, for the plain and the path-compressed layouts.
+
+Workloads:
+  random     real signatures from Transaction.sign
+  prefix     signatures sharing a long common prefix
+
+each both in arrival order (bulk_load(..., sort=True), which radix sorts them first) and
+already in page order (bulk_load(..., presorted=True)). By default bulk_load inserts
+arrival-order pairs one by one, as the "items" column does, since sorting them costs
+more than the build saves.
+
+Every pair appears twice with a different amount the second time, so both builds
+also count N errors.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_bulk [N] [PREFIX]
+
+Defaults to N = 1,000,000 and a 30-character shared prefix.
+"""
+import sys
+import time
+
+from benchmarks.bench_book_deep import make_transactions as make_prefixed
+from processing_book import CompressedProcessingBook, ProcessingBook
+from processing_line import Transaction
+
+
+def make_random(n):
+    txs = []
+    for i in range(n):
+        tr = Transaction(i, "alice", "bob")
+        tr.sign()
+        txs.append(tr)
+    return txs
+
+
+def with_duplicates(txs):
+    pairs = [(tr, i) for i, tr in enumerate(txs)]
+    return pairs + [(tr, -i - 1) for i, tr in enumerate(txs)]
+
+
+def build_by_items(cls, pairs):
+    book = cls()
+    for tr, amount in pairs:
+        book[tr] = amount
+    return book
+
+
+def timed(build):
+    start = time.perf_counter()
+    book = build()
+    return time.perf_counter() - start, book
+
+
+def presort(pairs):
+    book = ProcessingBook()
+    # Python's sort is fine here: it only prepares the presorted workloads.
+    return sorted(pairs, key=lambda pair: book.page_indices(pair[0].signature))
+
+
+def main(n, prefix_len):
+    random_pairs = with_duplicates(make_random(n))
+    prefix_pairs = with_duplicates(make_prefixed(n, prefix_len))
+    workloads = (
+        ("random", random_pairs, False),
+        ("random", presort(random_pairs), True),
+        (f"prefix{prefix_len}", prefix_pairs, False),
+        (f"prefix{prefix_len}", presort(prefix_pairs), True),
+    )
+    print(f"N = {n} transactions, {2 * n} pairs")
+    print(f"  {'workload':<10} {'order':<9} {'layout':<11} {'items (s)':>10} {'bulk (s)':>9} {'speedup':>8}")
+    for workload, pairs, is_sorted in workloads:
+        for name, cls in (("plain", ProcessingBook), ("compressed", CompressedProcessingBook)):
+            items_time, by_items = timed(lambda: build_by_items(cls, pairs))
+            bulk_time, bulk = timed(lambda: cls.bulk_load(pairs, presorted=is_sorted, sort=not is_sorted))
+            assert len(bulk) == len(by_items) == n
+            assert bulk.get_error_count() == by_items.get_error_count() == n
+            order = "sorted" if is_sorted else "arrival"
+            print(f"  {workload:<10} {order:<9} {name:<11} {items_time:>10.2f} {bulk_time:>9.2f} "
+                  f"{items_time / bulk_time:>7.2f}x")
+    print("bulk: presorted=True for sorted input, sort=True (radix sort, then build) for arrival")
+    print("order; bulk_load's default for arrival order is the item-by-item build.")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
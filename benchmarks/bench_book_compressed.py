@@ -0,0 +1,70 @@
+"""
+Benchmark: ProcessingBook versus CompressedProcessingBook, nested-book count, traced
+memory and lookup latency, on two workloads:
+
+  random   real signatures from Transaction.sign (shallow trie, little to compress)
+  prefix   signatures sharing a long common prefix (deep single-child chains)
+
+Run from the repository root:
+    python -m benchmarks.bench_book_compressed [N] [PREFIX]
+
+Defaults to N = 50,000 and a 30-character shared prefix.
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_book_deep import make_transactions as make_prefixed
+from processing_book import CompressedProcessingBook, ProcessingBook
+from processing_line import Transaction
+
+
+def make_random(n):
+    txs = []
+    for i in range(n):
+        tr = Transaction(i, "alice", "bob")
+        tr.sign()
+        txs.append(tr)
+    return txs
+
+
+def count_books(book):
+    count = 0
+    stack = [book]
+    while stack:
+        current = stack.pop()
+        count += 1
+        for slot in current.pages:
+            if isinstance(slot, ProcessingBook):
+                stack.append(slot)
+    return count
+
+
+def measure(cls, txs):
+    tracemalloc.start()
+    book = cls()
+    for i, tr in enumerate(txs):
+        book[tr] = i
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for tr in txs:
+        book[tr]
+    lookup = (time.perf_counter() - start) / len(txs)
+    return count_books(book), memory, lookup
+
+
+def main(n, prefix_len):
+    workloads = (("random", make_random(n)), (f"prefix{prefix_len}", make_prefixed(n, prefix_len)))
+    print(f"N = {n}")
+    print(f"  {'workload':<10} {'layout':<11} {'books':>8} {'memory (MiB)':>13} {'B/tx':>7} {'get (us)':>9}")
+    for workload, txs in workloads:
+        for name, cls in (("plain", ProcessingBook), ("compressed", CompressedProcessingBook)):
+            books, memory, lookup = measure(cls, txs)
+            print(f"  {workload:<10} {name:<11} {books:>8} {memory / 2**20:>13.1f} "
+                  f"{memory / n:>7.0f} {lookup * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
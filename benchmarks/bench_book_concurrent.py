@@ -0,0 +1,94 @@
+"""
+Benchmark: throughput of ConcurrentProcessingBook (one lock per root page) against a
+ProcessingBook behind one global lock, for a mixed insert / lookup / delete workload
+split across threads; then inserts with a rank() query after each one, against a
+plain ProcessingBook, which shows what point queries cost on the concurrent book.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_concurrent [N] [THREADS...]
+
+Defaults to N = 200,000 operations per run and 1, 2, 4 and 8 threads.
+"""
+import random
+import sys
+import threading
+import time
+
+from benchmarks.bench_book_compressed import make_random
+from processing_book import ConcurrentProcessingBook, ProcessingBook
+
+
+class GlobalLockProcessingBook(ProcessingBook):
+    """ The baseline: every operation holds the same lock. """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+
+    def _insert(self, tr, amount):
+        with self._lock:
+            return super()._insert(tr, amount)
+
+    def _get(self, key):
+        with self._lock:
+            return super()._get(key)
+
+    def _delete(self, key):
+        with self._lock:
+            return super()._delete(key)
+
+
+def work(book, jobs):
+    for i, (tr, roll) in enumerate(jobs):
+        book[tr] = i
+        if roll < 0.5:
+            book[tr]
+        elif roll < 0.75:
+            del book[tr]
+
+
+def run(cls, jobs, threads):
+    book = cls()
+    workers = [threading.Thread(target=work, args=(book, jobs[i::threads])) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, book
+
+
+def insert_and_rank(cls, txs):
+    book = cls()
+    start = time.perf_counter()
+    for i, tr in enumerate(txs):
+        book[tr] = i
+        book.rank(tr)
+    return time.perf_counter() - start
+
+
+def main(n, thread_counts):
+    # Each transaction is followed by the same operation whichever thread gets it.
+    rng = random.Random(n)
+    txs = make_random(n)
+    jobs = [(tr, rng.random()) for tr in txs]
+    ops = n * 1.75
+    print(f"N = {n} inserts (each followed by a lookup or delete half the time)")
+    print(f"  {'threads':>7} {'global lock (ops/s)':>20} {'striped (ops/s)':>16} {'ratio':>6}")
+    for threads in thread_counts:
+        base, book = run(GlobalLockProcessingBook, jobs, threads)
+        striped, other = run(ConcurrentProcessingBook, jobs, threads)
+        assert len(book) == len(other)
+        print(f"  {threads:>7} {ops / base:>20,.0f} {ops / striped:>16,.0f} {base / striped:>6.2f}")
+
+    count = min(n, 10_000)
+    plain = insert_and_rank(ProcessingBook, txs[:count])
+    concurrent = insert_and_rank(ConcurrentProcessingBook, txs[:count])
+    print(f"{count} inserts, each followed by rank(), one thread")
+    print(f"  ProcessingBook {plain:.2f} s, ConcurrentProcessingBook {concurrent:.2f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         tuple(int(arg) for arg in sys.argv[2:]) or (1, 2, 4, 8))
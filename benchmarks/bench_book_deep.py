@@ -0,0 +1,129 @@
+"""
+Benchmark: ProcessingBook insert / lookup / delete on an adversarial deep-collision
+workload, recursive implementation (as before) versus the iterative one.
+
+All signatures share a long common prefix, so every entry sits PREFIX levels deep.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_deep [N] [PREFIX]
+
+Defaults to N = 20,000 signatures sharing a 30-character prefix.
+"""
+import sys
+import time
+
+from processing_book import ProcessingBook
+from processing_line import Transaction
+
+
+class RecursiveBook(ProcessingBook):
+    """ The previous recursive _insert / _get / _delete, for comparison. """
+
+    def _digit(self, key, level):
+        if type(key) is int:
+            return (key // Transaction._POWERS[level]) % 36
+        return self.page_index(key[level])
+
+    def _insert(self, tr, amount):
+        key = ProcessingBook._key(tr)
+        idx = self._digit(key, self._level)
+        slot = self.pages[idx]
+        if slot is None:
+            self.pages[idx] = ProcessingBook._leaf(tr, amount)
+            self._size += 1
+            return True
+        if isinstance(slot, ProcessingBook):
+            added = slot._insert(tr, amount)
+            if added:
+                self._size += 1
+            return added
+        if ProcessingBook._matches(slot[0], key):
+            if slot[1] != amount:
+                self._errors += 1
+            return False
+        child = RecursiveBook(self._level + 1)
+        child._insert(slot[0], slot[1])
+        child._insert(tr, amount)
+        self.pages[idx] = child
+        self._size += 1
+        return True
+
+    def _get(self, key):
+        slot = self.pages[self._digit(key, self._level)]
+        if slot is None:
+            raise KeyError(key)
+        if isinstance(slot, ProcessingBook):
+            return slot._get(key)
+        if ProcessingBook._matches(slot[0], key):
+            return slot[1]
+        raise KeyError(key)
+
+    def _delete(self, key):
+        idx = self._digit(key, self._level)
+        slot = self.pages[idx]
+        if slot is None:
+            return False
+        if isinstance(slot, ProcessingBook):
+            if not slot._delete(key):
+                return False
+            self._size -= 1
+            if len(slot) == 0:
+                self.pages[idx] = None
+            elif len(slot) == 1:
+                lone_tr, lone_amt = slot._extract_single_leaf()
+                self.pages[idx] = ProcessingBook._leaf(lone_tr, lone_amt)
+            return True
+        if not ProcessingBook._matches(slot[0], key):
+            return False
+        self.pages[idx] = None
+        self._size -= 1
+        return True
+
+
+def make_transactions(n, prefix_len):
+    alphabet = ProcessingBook.LEGAL_CHARACTERS
+    width = Transaction._SIG_LEN - prefix_len
+    prefix = "z" * prefix_len
+    txs = []
+    for i in range(n):
+        digits = []
+        x = i * 7919
+        for _ in range(width):
+            x, r = divmod(x, 36)
+            digits.append(alphabet[r])
+        tr = Transaction(i, "alice", "bob")
+        tr.signature = prefix + "".join(digits)
+        txs.append(tr)
+    return txs
+
+
+def run(book, txs):
+    timings = []
+    start = time.perf_counter()
+    for i, tr in enumerate(txs):
+        book[tr] = i
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for tr in txs:
+        book[tr]
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for tr in txs:
+        del book[tr]
+    timings.append(time.perf_counter() - start)
+    assert len(book) == 0
+    return timings
+
+
+def main(n, prefix_len):
+    txs = make_transactions(n, prefix_len)
+    print(f"N = {n}, shared prefix = {prefix_len} characters")
+    print(f"  {'':<10} {'insert (s)':>11} {'get (s)':>9} {'delete (s)':>11}")
+    for name, book in (("recursive", RecursiveBook()), ("iterative", ProcessingBook())):
+        t_ins, t_get, t_del = run(book, txs)
+        print(f"  {name:<10} {t_ins:>11.3f} {t_get:>9.3f} {t_del:>11.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
@@ -0,0 +1,95 @@
+"""
+Benchmark: iterating a ProcessingBook with its preallocated cursor, against the previous
+iterator, which allocated an ArrayR(2) frame (and a stack node) for every page step and
+every nested book entered.
+
+Allocations are measured with tracemalloc: for a sample of next() calls, the peak of
+memory allocated during the call over what was allocated before it. This counts memory
+that is allocated and freed within the call, which the current total does not show.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_iterate [N] [SAMPLE]
+
+Defaults to N = 1,000,000 entries and a sample of 20,000 next() calls.
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_book_compressed import make_random
+from data_structures import ArrayR
+from data_structures.linked_stack import LinkedStack
+from processing_book import ProcessingBook
+
+
+class FrameIterator:
+    """ The previous traversal: a LinkedStack of ArrayR(2) frames, one per step. """
+
+    def __init__(self, book):
+        self._stack = LinkedStack()
+        self._push(book, -1)
+
+    def _push(self, book, page):
+        frame = ArrayR(2)
+        frame[0] = book
+        frame[1] = page
+        self._stack.push(frame)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while len(self._stack) > 0:
+            frame = self._stack.pop()
+            book = frame[0]
+            p = frame[1] + 1
+            while p < len(book.pages) and book.pages[p] is None:
+                p += 1
+            if p >= len(book.pages):
+                continue
+            self._push(book, p)
+            slot = book.pages[p]
+            if isinstance(slot, ProcessingBook):
+                self._push(slot, -1)
+                continue
+            return (slot[0], slot[1])
+        raise StopIteration
+
+
+def walk(iterator):
+    count = 0
+    for _ in iterator:
+        count += 1
+    return count
+
+
+def allocated_per_next(iterator, sample):
+    tracemalloc.start()
+    total = 0
+    for _ in range(sample):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        next(iterator)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / sample
+
+
+def main(n, sample):
+    txs = make_random(n)
+    book = ProcessingBook.bulk_load((tr, i) for i, tr in enumerate(txs))
+    del txs
+    print(f"N = {n}")
+    print(f"  {'iterator':<24} {'time (s)':>9} {'entries/s':>11} {'B allocated/next':>17}")
+    for label, make in (("ArrayR frame per step", FrameIterator), ("preallocated cursor", iter)):
+        elapsed = time.perf_counter()
+        count = walk(make(book))
+        elapsed = time.perf_counter() - elapsed
+        assert count == n
+        per_next = allocated_per_next(make(book), min(sample, n))
+        print(f"  {label:<24} {elapsed:>9.2f} {n / elapsed:>11,.0f} {per_next:>17.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20_000)
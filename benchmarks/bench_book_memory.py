@@ -0,0 +1,63 @@
+"""
+Benchmark: bytes per stored transaction of a ProcessingBook, with the adaptive page
+layout (sparse pages up to ProcessingBook.SPARSE_PAGE_LIMIT non-empty pages) versus
+every book using a full 36-slot ArrayR (SPARSE_PAGE_LIMIT = 0).
+
+Only the book is measured (books, page arrays and leaves); the transactions and their
+signatures are created before tracing starts.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_memory [N ...]
+
+Defaults to N = 100,000 and 1,000,000. The transactions alone take a few hundred bytes
+each, so check the machine has the memory before asking for 10,000,000.
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_book_compressed import count_books, make_random
+from processing_book import CompressedProcessingBook, ProcessingBook
+from data_structures import SparseArrayR
+
+
+def measure(cls, txs, limit):
+    ProcessingBook.SPARSE_PAGE_LIMIT = limit
+    tracemalloc.start()
+    book = cls()
+    for i, tr in enumerate(txs):
+        book[tr] = i
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    sparse = 0
+    stack = [book]
+    while stack:
+        current = stack.pop()
+        sparse += type(current.pages) is SparseArrayR
+        stack.extend(slot for slot in current.pages if isinstance(slot, ProcessingBook))
+
+    start = time.perf_counter()
+    for tr in txs:
+        book[tr]
+    lookup = (time.perf_counter() - start) / len(txs)
+    return count_books(book), sparse, memory, lookup
+
+
+def main(sizes):
+    adaptive = ProcessingBook.SPARSE_PAGE_LIMIT
+    print(f"  {'N':>10} {'layout':<11} {'pages':<9} {'books':>8} {'sparse':>8} "
+          f"{'B/tx':>7} {'get (us)':>9}")
+    for n in sizes:
+        txs = make_random(n)
+        for name, cls in (("plain", ProcessingBook), ("compressed", CompressedProcessingBook)):
+            for pages, limit in (("dense", 0), ("adaptive", adaptive)):
+                books, sparse, memory, lookup = measure(cls, txs, limit)
+                print(f"  {n:>10} {name:<11} {pages:<9} {books:>8} {sparse:>8} "
+                      f"{memory / n:>7.0f} {lookup * 1e6:>9.2f}")
+        del txs
+    ProcessingBook.SPARSE_PAGE_LIMIT = adaptive
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
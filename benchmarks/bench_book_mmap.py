@@ -0,0 +1,59 @@
+"""
+Benchmark: ProcessingBook.save() and MappedProcessingBook, against rebuilding the book
+from its transactions, for books of growing size: file size, save time, cold-open time,
+lookups and full iteration.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_mmap [N...]
+
+Defaults to N = 10,000, 100,000 and 300,000 entries.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_book_compressed import make_random
+from processing_book import MappedProcessingBook, ProcessingBook
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def lookups(book, txs):
+    for tr in txs:
+        book[tr]
+
+
+def main(sizes):
+    print(f"{'N':>9} {'rebuild (s)':>12} {'save (s)':>9} {'B/entry':>8} {'open (us)':>10} "
+          f"{'1st get (us)':>13} {'get (us)':>9} {'mem get (us)':>13} {'iter (s)':>9} {'mem iter (s)':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "book.pbk")
+        for n in sizes:
+            txs = make_random(n)
+            pairs = [(tr, i) for i, tr in enumerate(txs)]
+            rebuild, book = timed(lambda: ProcessingBook.bulk_load(pairs))
+            save, _ = timed(lambda: book.save(path))
+            size = os.path.getsize(path)
+            sample = random.Random(n).sample(txs, min(n, 10_000))
+
+            opened, mapped = timed(lambda: MappedProcessingBook(path))
+            first, _ = timed(lambda: mapped[sample[0]])
+            get, _ = timed(lambda: lookups(mapped, sample))
+            mem_get, _ = timed(lambda: lookups(book, sample))
+            walk, count = timed(lambda: sum(1 for _ in mapped))
+            mem_walk, _ = timed(lambda: sum(1 for _ in book))
+            assert count == n
+            mapped.close()
+            print(f"{n:>9} {rebuild:>12.2f} {save:>9.2f} {size / n:>8.0f} {opened * 1e6:>10.1f} "
+                  f"{first * 1e6:>13.1f} {get / len(sample) * 1e6:>9.2f} {mem_get / len(sample) * 1e6:>13.2f} "
+                  f"{walk:>9.2f} {mem_walk:>13.2f}")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or (10_000, 100_000, 300_000))
@@ -0,0 +1,55 @@
+"""
+Benchmark: paginated access to a ProcessingBook, rank / select / slice versus walking
+the book's iterator from the start.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_order_stats [N] [PAGE]
+
+Defaults to N = 200,000 signed transactions and pages of 50 entries.
+"""
+import sys
+import time
+from itertools import islice
+
+from benchmarks.bench_book_compressed import make_random
+from processing_book import ProcessingBook
+
+
+def timed(run, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(n, page):
+    txs = make_random(n)
+    book = ProcessingBook.bulk_load([(tr, i) for i, tr in enumerate(txs)])
+    print(f"N = {n}, page size {page}")
+    print(f"  {'operation':<28} {'iterate (ms)':>13} {'direct (ms)':>12} {'speedup':>8}")
+    for position in (n // 10, n // 2, n - page):
+        scan, expected = timed(lambda: [tr for tr, _ in islice(book, position, position + page)])
+        direct, got = timed(lambda: [tr for tr, _ in book.slice(position, position + page)])
+        assert got == expected
+        print(f"  {'slice at ' + str(position):<28} {scan * 1e3:>13.1f} {direct * 1e3:>12.2f} "
+              f"{scan / direct:>7.0f}x")
+
+        target = expected[0]
+        scan, expected_rank = timed(lambda: next(i for i, (tr, _) in enumerate(book) if tr is target))
+        direct, rank = timed(lambda: book.rank(target))
+        assert rank == expected_rank == position
+        print(f"  {'rank of entry ' + str(position):<28} {scan * 1e3:>13.1f} {direct * 1e3:>12.3f} "
+              f"{scan / direct:>7.0f}x")
+
+        scan, _ = timed(lambda: next(islice(book, position, None)))
+        direct, _ = timed(lambda: book.select(position))
+        print(f"  {'select(' + str(position) + ')':<28} {scan * 1e3:>13.1f} {direct * 1e3:>12.3f} "
+              f"{scan / direct:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -0,0 +1,52 @@
+"""
+Benchmark: prefix and range queries on a ProcessingBook, iter_prefix / iter_range
+versus filtering a full iteration of the book.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_queries [N]
+
+Defaults to N = 200,000 signed transactions.
+"""
+import sys
+import time
+
+from benchmarks.bench_book_compressed import make_random
+from processing_book import ProcessingBook
+
+
+def timed(query, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in query())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def main(n):
+    txs = make_random(n)
+    book = ProcessingBook.bulk_load([(tr, i) for i, tr in enumerate(txs)])
+    path = book.page_indices
+    signature = sorted(tr.signature for tr in txs)[n // 2]
+
+    print(f"N = {n}")
+    print(f"  {'query':<26} {'results':>8} {'scan (ms)':>10} {'direct (ms)':>12} {'speedup':>8}")
+    for length in (1, 2, 3, 4):
+        prefix = signature[:length]
+        scan, count = timed(lambda: (tr for tr, _ in book if tr.signature.startswith(prefix)))
+        direct, direct_count = timed(lambda: book.iter_prefix(prefix))
+        assert count == direct_count
+        print(f"  {'iter_prefix(' + repr(prefix) + ')':<26} {count:>8} {scan * 1e3:>10.1f} "
+              f"{direct * 1e3:>12.2f} {scan / direct:>7.0f}x")
+
+    lo, hi = signature[:3], signature[:2] + "9"
+    scan, count = timed(lambda: (tr for tr, _ in book if path(lo) <= path(tr.signature) < path(hi)))
+    direct, direct_count = timed(lambda: book.iter_range(lo, hi))
+    assert count == direct_count
+    print(f"  {'iter_range' + repr((lo, hi)):<26} {count:>8} {scan * 1e3:>10.1f} "
+          f"{direct * 1e3:>12.2f} {scan / direct:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,64 @@
+"""
+Benchmark: consistent views of a ProcessingBook, ProcessingBook.snapshot() versus copying
+the whole book (a presorted bulk_load of its iteration), and the cost snapshots add to
+later writes.
+
+Run from the repository root:
+    python -m benchmarks.bench_book_snapshot [N] [WRITES]
+
+Defaults to N = 200,000 entries and 2,000 writes after the view is taken.
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_book_compressed import make_random
+from processing_book import ProcessingBook
+
+
+def traced(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, memory, result
+
+
+def write_all(book, txs, snapshot_every=0):
+    snapshots = []
+    for i, tr in enumerate(txs):
+        if snapshot_every and i % snapshot_every == 0:
+            snapshots.append(book.snapshot())
+        book[tr] = i
+    return snapshots
+
+
+def main(n, writes):
+    txs = make_random(n + writes)
+    base, extra = txs[:n], txs[n:]
+    pairs = [(tr, i) for i, tr in enumerate(base)]
+    print(f"N = {n}, {writes} writes after the view is taken")
+
+    book = ProcessingBook.bulk_load(pairs)
+    elapsed, memory, _ = traced(lambda: ProcessingBook.bulk_load(book, presorted=True))
+    print(f"  full copy:     {elapsed * 1e3:10.1f} ms  {memory / 2**20:8.1f} MiB")
+    elapsed, memory, snapshot = traced(book.snapshot)
+    print(f"  snapshot():    {elapsed * 1e3:10.4f} ms  {memory:8d} B")
+
+    print(f"  {'writes':<32} {'time (ms)':>10} {'memory (MiB)':>13} {'B/write':>8}")
+    for label, every in (("no snapshot", 0), ("one snapshot before", writes), ("a snapshot every 100", 100),
+                         ("a snapshot every write", 1)):
+        book = ProcessingBook.bulk_load(pairs)
+        if every == writes:
+            held = book.snapshot()
+            every = 0
+        elapsed, memory, held = traced(lambda: write_all(book, extra, every))
+        print(f"  {label:<32} {elapsed * 1e3:>10.1f} {memory / 2**20:>13.2f} {memory / writes:>8.0f}")
+        del held
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2_000)
@@ -0,0 +1,113 @@
+"""
+Benchmark: FraudDetection.detect_by_blocks through BlockGrouper, against the previous
+per-block-size loop, which re-read every signature for each S, allocated an ArrayR of
+blocks per transaction, built group keys by repeated concatenation and counted them in
+a fresh HashTableSeparateChaining(97).
+
+The previous loop is quadratic once there are many more groups than its 97 buckets, so
+both are run at a small N; BlockGrouper alone is then run at a large N, per block size,
+keyed by fingerprints (the default) and by canonical strings (fingerprints=False).
+
+Run from the repository root:
+    python -m benchmarks.bench_detect_blocks [N] [BASELINE_N]
+
+Defaults to N = 1,000,000 and BASELINE_N = 5,000, with 36-character signatures.
+"""
+import sys
+import time
+
+from benchmarks.bench_book_compressed import make_random
+from algorithms.insertionsort import insertion_sort
+from data_structures import ArrayR
+from data_structures.hash_table_separate_chaining import HashTableSeparateChaining
+from fraud_detection import BlockGrouper, FraudDetection
+
+
+def detect_per_size(transactions):
+    """ The previous detect_by_blocks (string signatures). """
+    N = len(transactions)
+    if N == 0:
+        return (1, 1)
+    L = len(transactions[0].signature)
+    best_S = 1
+    best_score = 1
+    S = 1
+    while S <= L:
+        groups = HashTableSeparateChaining(97)
+        r = L - (L // S) * S
+        B = L // S
+        for t in transactions:
+            blocks = ArrayR(B)
+            sig = t.signature
+            tail = "" if r == 0 else sig[L - r:L]
+            i = 0
+            while i < B:
+                start = i * S
+                blocks[i] = sig[start:start + S]
+                i += 1
+            if B > 1:
+                insertion_sort(blocks)
+            key = tail + "|"
+            i = 0
+            while i < B:
+                key = key + str(blocks[i]) + "|"
+                i += 1
+            try:
+                c = groups[key]
+                groups[key] = c + 1
+            except KeyError:
+                groups[key] = 1
+        score = 1
+        items = groups.items()
+        i = 0
+        while i < len(items):
+            score *= items[i][1]
+            i += 1
+        if score > best_score:
+            best_score = score
+            best_S = S
+        S += 1
+    return (best_S, best_score)
+
+
+def make_transactions(n):
+    """ Signed transactions, with repeated timestamps so some signatures collide. """
+    txs = make_random(n)
+    for i in range(0, n, 97):
+        txs[i].signature = txs[i // 2].signature
+    return ArrayR.from_list(txs)
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def main(n, baseline_n):
+    small = make_transactions(baseline_n)
+    before, expected = timed(lambda: detect_per_size(small))
+    after, result = timed(lambda: FraudDetection(small).detect_by_blocks())
+    assert result == expected
+    print(f"N = {baseline_n}, L = 36: previous loop {before:.2f} s, BlockGrouper {after:.2f} s "
+          f"({before / after:.1f}x)")
+
+    txs = make_transactions(n)
+    read, grouper = timed(lambda: BlockGrouper(txs))
+    exact = BlockGrouper(txs, fingerprints=False)
+    print(f"N = {n}, L = 36: signatures read once in {read:.2f} s")
+    print(f"  {'S':>3} {'blocks':>6} {'fingerprint (s)':>16} {'canonical (s)':>14} {'speedup':>8}")
+    totals = [read, read]
+    for S in range(1, grouper.length + 1):
+        fast, score = timed(lambda: grouper.score(S))
+        slow, expected = timed(lambda: exact.score(S))
+        assert score == expected
+        totals[0] += fast
+        totals[1] += slow
+        print(f"  {S:>3} {grouper.length // S:>6} {fast:>16.2f} {slow:>14.2f} {slow / fast:>8.1f}")
+    print(f"  total {totals[0]:>19.1f} {totals[1]:>14.1f} {totals[1] / totals[0]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5_000)
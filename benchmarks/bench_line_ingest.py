@@ -0,0 +1,48 @@
+"""
+Benchmark: ProcessingLine ingest throughput, one add_transaction call per transaction
+versus a single add_transactions call over the whole batch.
+
+Run from the repository root:
+    python -m benchmarks.bench_line_ingest [N]
+
+Defaults to N = 1,000,000.
+"""
+import sys
+import time
+
+from processing_line import ProcessingLine, Transaction
+
+
+def make_batch(n):
+    return [Transaction(i if i % 3 else n + i, "alice", "bob") for i in range(n)]
+
+
+def ingest_per_item(batch, critical):
+    line = ProcessingLine(critical)
+    start = time.perf_counter()
+    for tx in batch:
+        line.add_transaction(tx)
+    return time.perf_counter() - start, line
+
+
+def ingest_bulk(batch, critical):
+    line = ProcessingLine(critical)
+    start = time.perf_counter()
+    line.add_transactions(batch)
+    return time.perf_counter() - start, line
+
+
+def main(n):
+    batch = make_batch(n)
+    critical = Transaction(n, "carol", "dave")
+    t_single, a = ingest_per_item(batch, critical)
+    t_bulk, b = ingest_bulk(batch, critical)
+    assert len(a._before) == len(b._before) and len(a._after) == len(b._after)
+    print(f"N = {n}")
+    print(f"  add_transaction  {t_single:7.3f} s  {n / t_single / 1e6:6.2f} M tx/s")
+    print(f"  add_transactions {t_bulk:7.3f} s  {n / t_bulk / 1e6:6.2f} M tx/s")
+    print(f"  speedup {t_single / t_bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,60 @@
+"""
+Benchmark: character -> page lookups in ProcessingBook.
+
+Compares the previous LEGAL_CHARACTERS.index scan, page_index (ordinal table lookup)
+and page_indices (whole-signature decode) over the same characters.
+
+Run from the repository root:
+    python -m benchmarks.bench_page_index [N]
+
+Defaults to N = 1,000,000 lookups.
+"""
+import sys
+import time
+
+from processing_book import ProcessingBook
+from processing_line import Transaction
+
+
+class ScanBook(ProcessingBook):
+    """ The previous page_index: a linear scan of LEGAL_CHARACTERS. """
+
+    def page_index(self, character):
+        return ProcessingBook.LEGAL_CHARACTERS.index(character)
+
+
+def main(n):
+    n_sigs = max(1, n // Transaction._SIG_LEN)
+    signatures = []
+    for i in range(n_sigs):
+        tr = Transaction(i, "alice", "bob")
+        tr.sign()
+        signatures.append(tr.signature)
+    characters = "".join(signatures)
+    book = ProcessingBook()
+    scan_book = ScanBook()
+
+    start = time.perf_counter()
+    for c in characters:
+        scan_book.page_index(c)
+    t_scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for c in characters:
+        book.page_index(c)
+    t_table = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for sig in signatures:
+        book.page_indices(sig)
+    t_bulk = time.perf_counter() - start
+
+    total = len(characters)
+    print(f"{total} character lookups")
+    print(f"  page_index (scan)   {t_scan:7.3f} s  {1e9 * t_scan / total:6.1f} ns/char")
+    print(f"  page_index (table)  {t_table:7.3f} s  {1e9 * t_table / total:6.1f} ns/char")
+    print(f"  page_indices (bulk) {t_bulk:7.3f} s  {1e9 * t_bulk / total:6.1f} ns/char")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
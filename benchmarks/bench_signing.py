@@ -0,0 +1,63 @@
+"""
+Benchmark: per-transaction Transaction.sign (with and without the username cache)
+versus batch Transaction.sign_many.
+
+Run from the repository root:
+    python -m benchmarks.bench_signing [N ...]
+
+Defaults to N = 10,000 / 100,000 / 1,000,000 transactions.
+"""
+import sys
+import time
+
+from data_structures import ArrayR
+from processing_line import Transaction
+
+USERS = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi"]
+
+
+def make_transactions(n):
+    arr = ArrayR(n)
+    for i in range(n):
+        arr[i] = Transaction(i, USERS[i % len(USERS)], USERS[(i * 7 + 3) % len(USERS)])
+    return arr
+
+
+def bench_per_transaction(arr):
+    start = time.perf_counter()
+    for i in range(len(arr)):
+        arr[i].sign()
+    return time.perf_counter() - start
+
+
+def bench_per_transaction_cached(arr, capacity=64):
+    Transaction.enable_user_cache(capacity)
+    try:
+        return bench_per_transaction(arr)
+    finally:
+        Transaction.disable_user_cache()
+
+
+def bench_batch(arr):
+    start = time.perf_counter()
+    Transaction.sign_many(arr)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    Transaction._triples()  # table build is a one-off, keep it out of the timings
+    print(f"{'N':>10} {'sign (s)':>10} {'sign+cache (s)':>15} {'sign_many (s)':>14} {'speedup':>8}")
+    for n in sizes:
+        a = make_transactions(n)
+        b = make_transactions(n)
+        c = make_transactions(n)
+        t_single = bench_per_transaction(a)
+        t_cached = bench_per_transaction_cached(c)
+        t_batch = bench_batch(b)
+        for i in range(n):
+            assert a[i].signature == b[i].signature == c[i].signature
+        print(f"{n:>10} {t_single:>10.3f} {t_cached:>15.3f} {t_batch:>14.3f} {t_single / t_batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,36 @@
+"""
+Benchmark: batch signing throughput of scheme 1 (arbitrary-precision, pure Python)
+versus scheme 2 (64-bit lanes, NumPy backend when installed).
+
+Run from the repository root:
+    python -m benchmarks.bench_signing_schemes [N]
+
+Defaults to N = 1,000,000 transactions.
+"""
+import sys
+import time
+
+import processing_line
+from benchmarks.bench_signing import make_transactions
+from processing_line import Transaction
+
+
+def timed(arr, scheme):
+    start = time.perf_counter()
+    Transaction.sign_many(arr, scheme)
+    return time.perf_counter() - start
+
+
+def main(n):
+    backend = "NumPy" if processing_line.np is not None else "pure Python (NumPy not installed)"
+    Transaction._triples()
+    t1 = timed(make_transactions(n), Transaction.SCHEME_V1)
+    t2 = timed(make_transactions(n), Transaction.SCHEME_V2)
+    print(f"N = {n}, scheme 2 backend: {backend}")
+    print(f"  scheme 1 {t1:8.3f} s  {n / t1 / 1e6:7.3f} M tx/s")
+    print(f"  scheme 2 {t2:8.3f} s  {n / t2 / 1e6:7.3f} M tx/s")
+    print(f"  speedup {t1 / t2:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,75 @@
+"""
+Benchmark: peak traced memory of ProcessingLine (fully populated, then iterated) versus
+StreamingProcessingLine (fed by a generator) over the same feed.
+
+Transactions are generated pre-signed with a shared signature string so the run
+measures the lines' buffering rather than signing time.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming_line [N] [after_fraction]
+
+Defaults to N = 5,000,000 with 10% of transactions after the critical one.
+"""
+import sys
+import time
+import tracemalloc
+
+from processing_line import ProcessingLine, StreamingProcessingLine, Transaction
+
+SIGNATURE = "a" * 36
+
+
+def feed(n, after_fraction):
+    every = max(1, round(1 / after_fraction)) if after_fraction > 0 else n + 1
+    for i in range(n):
+        ts = 2 * n + i if i % every == 0 else i
+        tx = Transaction(ts, "alice", "bob")
+        tx.signature = SIGNATURE
+        yield tx
+
+
+def critical(n):
+    tx = Transaction(2 * n - 1, "carol", "dave")
+    tx.signature = SIGNATURE
+    return tx
+
+
+def run_buffered(n, after_fraction):
+    line = ProcessingLine(critical(n))
+    for tx in feed(n, after_fraction):
+        line.add_transaction(tx)
+    count = 0
+    for _ in line:
+        count += 1
+    return count
+
+
+def run_streaming(n, after_fraction):
+    count = 0
+    for _ in StreamingProcessingLine(critical(n), feed(n, after_fraction)):
+        count += 1
+    return count
+
+
+def measure(fn, n, after_fraction):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fn(n, after_fraction)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert count == n + 1
+    return peak, elapsed
+
+
+def main(n, after_fraction):
+    print(f"N = {n}, {after_fraction:.0%} after critical")
+    for name, fn in (("ProcessingLine", run_buffered), ("StreamingProcessingLine", run_streaming)):
+        peak, elapsed = measure(fn, n, after_fraction)
+        print(f"  {name:<24} peak {peak / 2**20:9.1f} MiB  ({peak / n:6.1f} B/tx)  {elapsed:7.2f} s")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    main(n, fraction)
@@ -0,0 +1,52 @@
+"""
+Benchmark: bytes per live Transaction, __dict__-based (the previous layout) versus the
+current __slots__ layout. Both are measured signed, as they are once processed.
+
+Run from the repository root:
+    python -m benchmarks.bench_transaction_memory [N]
+"""
+import sys
+import tracemalloc
+
+from processing_line import Transaction
+
+
+class DictTransaction:
+    """ The previous Transaction layout: the same four fields in an instance __dict__. """
+
+    def __init__(self, timestamp, from_user, to_user):
+        self.timestamp = timestamp
+        self.from_user = from_user
+        self.to_user = to_user
+        self.signature = None
+
+
+USERS = ["alice", "bob", "carol", "dave"]
+SIGNATURE = "a" * 36
+
+
+def bytes_per_transaction(cls, n):
+    tracemalloc.start()
+    keep = [None] * n
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        tx = cls(1_000_000 + i, USERS[i % 4], USERS[(i + 1) % 4])
+        tx.signature = SIGNATURE  # shared string, so only the object layout is measured
+        keep[i] = tx
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del keep
+    return used / n
+
+
+def main(n):
+    per_dict = bytes_per_transaction(DictTransaction, n)
+    per_slots = bytes_per_transaction(Transaction, n)
+    print(f"N = {n}")
+    print(f"  __dict__ layout: {per_dict:7.1f} bytes/transaction")
+    print(f"  __slots__ layout: {per_slots:6.1f} bytes/transaction")
+    print(f"  saving: {100 * (1 - per_slots / per_dict):.0f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -9,3 +9,6 @@ from .hash_table_separate_chaining import HashTableSeparateChaining
 from .hash_table_linear_probing import LinearProbeTable
 from .hash_table_double_hashing import DoubleHashingTable
 from .hash_table_quadratic_probing import QuadraticProbeTable
+from .lru_cache import LRUCache
+from .hash_counter import HashCounter
+from .sparse_array import SparseArrayR
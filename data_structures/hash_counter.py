@@ -0,0 +1,128 @@
+from __future__ import annotations
+from typing import TypeVar, Generic, Iterator
+from data_structures.referential_array import ArrayR
+
+K = TypeVar('K')
+
+
+class _CountNode(Generic[K]):
+    """ Entry of a HashCounter: linked into its bucket chain and the list of all entries. """
+    __slots__ = ("key", "count", "chain", "after")
+
+    def __init__(self, key: K, count: int) -> None:
+        self.key = key
+        self.count = count
+        self.chain: _CountNode[K] | None = None
+        self.after: _CountNode[K] | None = None
+
+
+class HashCounter(Generic[K]):
+    """
+    Counts how many times each key was added.
+
+    Keys are placed with Python's built-in hash() into separately chained buckets, as in
+    LRUCache, with twice as many buckets as the number of distinct keys expected, so
+    chains stay short without resizing. Entries are also linked in the order their keys
+    were first added, for iteration.
+
+    attributes:
+        expected: number of distinct keys the bucket array is sized for
+    """
+
+    def __init__(self, expected: int) -> None:
+        """
+        :complexity: O(E) where E is the expected number of distinct keys.
+        """
+        if expected < 0:
+            raise ValueError("Expected key count cannot be negative.")
+        self.expected = expected
+        self.__buckets: ArrayR[_CountNode[K] | None] = ArrayR(2 * expected + 1)
+        self.__first: _CountNode[K] | None = None
+        self.__last: _CountNode[K] | None = None
+        self.__length = 0
+
+    def add(self, key: K, amount: int = 1) -> int:
+        """
+        Adds amount to the count of key and returns the new count.
+        :complexity: O(1) expected; O(N) worst case if every key shares a bucket.
+        """
+        position = hash(key) % len(self.__buckets)
+        node = self.__buckets[position]
+        while node is not None:
+            if node.key == key:
+                node.count += amount
+                return node.count
+            node = node.chain
+
+        node = _CountNode(key, amount)
+        node.chain = self.__buckets[position]
+        self.__buckets[position] = node
+        if self.__last is None:
+            self.__first = node
+        else:
+            self.__last.after = node
+        self.__last = node
+        self.__length += 1
+        return amount
+
+    def __getitem__(self, key: K) -> int:
+        """
+        Returns the count of key, 0 if it was never added.
+        :complexity: O(1) expected, see add().
+        """
+        node = self.__buckets[hash(key) % len(self.__buckets)]
+        while node is not None:
+            if node.key == key:
+                return node.count
+            node = node.chain
+        return 0
+
+    def __contains__(self, key: K) -> bool:
+        """
+        :complexity: O(1) expected, see add().
+        """
+        return self[key] > 0
+
+    def __iter__(self) -> Iterator[K]:
+        """
+        Iterates over the keys, in the order they were first added.
+        :complexity: O(N) where N is the number of distinct keys.
+        """
+        node = self.__first
+        while node is not None:
+            yield node.key
+            node = node.after
+
+    def counts(self) -> Iterator[int]:
+        """
+        Iterates over the counts, in the same order as the keys.
+        :complexity: O(N) where N is the number of distinct keys.
+        """
+        node = self.__first
+        while node is not None:
+            yield node.count
+            node = node.after
+
+    def __len__(self) -> int:
+        """
+        Returns the number of distinct keys.
+        """
+        return self.__length
+
+    def clear(self) -> None:
+        """
+        Removes every key.
+        :complexity: O(E) where E is the expected number of distinct keys.
+        """
+        self.__buckets = ArrayR(len(self.__buckets))
+        self.__first = None
+        self.__last = None
+        self.__length = 0
+
+    def __str__(self) -> str:
+        items = []
+        node = self.__first
+        while node is not None:
+            items.append(f"({node.key}, {node.count})")
+            node = node.after
+        return f"<HashCounter [{', '.join(items)}]>"
@@ -38,6 +38,20 @@ class LinkedQueue(Queue[T]):
         self.__rear = new_node
         self.__length += 1
 
+    def append_chain(self, front: Node[T] | None, rear: Node[T] | None, length: int) -> None:
+        """ Adds an already linked chain of nodes, front to rear, to the rear of the queue.
+        :pre: rear is reachable from front through exactly length nodes and rear.link is None
+        :complexity: O(1)
+        """
+        if front is None:
+            return
+        if self.__front is None:
+            self.__front = front
+        else:
+            self.__rear.link = front
+        self.__rear = rear
+        self.__length += length
+
     def serve(self) -> T:
         """ Deletes and returns the element at the queue's front.
         :raises Exception: if the queue is empty
@@ -18,6 +18,17 @@ class LinkedStack(Stack[T]):
         self.__top = new_node
         self.__length += 1
 
+    def push_chain(self, top: Node[T] | None, bottom: Node[T] | None, length: int) -> None:
+        """ Pushes an already linked chain of nodes, top first, so that top becomes the new top.
+        :pre: bottom is reachable from top through exactly length nodes
+        :complexity: O(1)
+        """
+        if top is None:
+            return
+        bottom.link = self.__top
+        self.__top = top
+        self.__length += length
+
     def pop(self) -> T:
         """ Pops the element at the top of the stack.
         :complexity: O(1)
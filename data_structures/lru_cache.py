@@ -0,0 +1,161 @@
+from __future__ import annotations
+from typing import TypeVar, Generic
+from data_structures.referential_array import ArrayR
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class _CacheNode(Generic[K, V]):
+    """ Entry of an LRUCache: linked both into its bucket chain and the recency list. """
+    __slots__ = ("key", "value", "chain", "prev", "next")
+
+    def __init__(self, key: K, value: V) -> None:
+        self.key = key
+        self.value = value
+        self.chain: _CacheNode[K, V] | None = None
+        self.prev: _CacheNode[K, V] | None = None
+        self.next: _CacheNode[K, V] | None = None
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded map that evicts the least recently used entry once it holds more than
+    `capacity` items.
+
+    Keys are placed with Python's built-in hash() into separately chained buckets, and a
+    doubly linked list keeps entries ordered from most to least recently used.
+
+    attributes:
+        capacity: maximum number of entries kept
+        hits: lookups that found their key
+        misses: lookups that did not find their key
+        evictions: entries dropped to stay within capacity
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        :complexity: O(C) where C is the capacity (the bucket array is sized from it).
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity should be larger than 0.")
+        self.capacity = capacity
+        self.__buckets: ArrayR[_CacheNode[K, V] | None] = ArrayR(2 * capacity + 1)
+        # Sentinel: head.next is the most recent entry, head.prev the least recent.
+        self.__head = _CacheNode(None, None)
+        self.__head.prev = self.__head
+        self.__head.next = self.__head
+        self.__length = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __find(self, key: K) -> _CacheNode[K, V] | None:
+        node = self.__buckets[hash(key) % len(self.__buckets)]
+        while node is not None and node.key != key:
+            node = node.chain
+        return node
+
+    def __unlink(self, node: _CacheNode[K, V]) -> None:
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def __push_front(self, node: _CacheNode[K, V]) -> None:
+        node.prev = self.__head
+        node.next = self.__head.next
+        self.__head.next.prev = node
+        self.__head.next = node
+
+    def __remove_from_bucket(self, node: _CacheNode[K, V]) -> None:
+        position = hash(node.key) % len(self.__buckets)
+        current = self.__buckets[position]
+        if current is node:
+            self.__buckets[position] = node.chain
+            return
+        while current.chain is not node:
+            current = current.chain
+        current.chain = node.chain
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        """
+        Returns the value stored for key (marking it most recently used), or default.
+        :complexity: O(1) expected; O(C) worst case if every key shares a bucket.
+        """
+        node = self.__find(key)
+        if node is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if self.__head.next is not node:
+            self.__unlink(node)
+            self.__push_front(node)
+        return node.value
+
+    def __getitem__(self, key: K) -> V:
+        """
+        :raises KeyError: when the key is not cached
+        :complexity: O(1) expected, see get().
+        """
+        node = self.__find(key)
+        if node is None:
+            self.misses += 1
+            raise KeyError(key)
+        self.hits += 1
+        self.__unlink(node)
+        self.__push_front(node)
+        return node.value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        """
+        Stores value for key as the most recently used entry, evicting the least
+        recently used entry if the cache is over capacity.
+        :complexity: O(1) expected, see get().
+        """
+        node = self.__find(key)
+        if node is not None:
+            node.value = value
+            self.__unlink(node)
+            self.__push_front(node)
+            return
+
+        node = _CacheNode(key, value)
+        position = hash(key) % len(self.__buckets)
+        node.chain = self.__buckets[position]
+        self.__buckets[position] = node
+        self.__push_front(node)
+        self.__length += 1
+
+        if self.__length > self.capacity:
+            oldest = self.__head.prev
+            self.__unlink(oldest)
+            self.__remove_from_bucket(oldest)
+            self.__length -= 1
+            self.evictions += 1
+
+    def __contains__(self, key: K) -> bool:
+        """
+        Membership test; does not count as a hit or miss nor change recency.
+        :complexity: O(1) expected.
+        """
+        return self.__find(key) is not None
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def clear(self) -> None:
+        """ Removes every entry and resets the counters. """
+        self.__buckets = ArrayR(len(self.__buckets))
+        self.__head.prev = self.__head
+        self.__head.next = self.__head
+        self.__length = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __str__(self) -> str:
+        items = []
+        node = self.__head.next
+        while node is not self.__head:
+            items.append(f"({node.key}, {node.value})")
+            node = node.next
+        return f"<LRUCache [{', '.join(items)}]>"
@@ -0,0 +1,153 @@
+from __future__ import annotations
+from typing import TypeVar
+from data_structures.abstract_list import List
+from data_structures.abstract_sorted_list import SortedList
+from data_structures.referential_array import ArrayR
+
+T = TypeVar('T')
+
+
+class SparseArrayR(ArrayR[T]):
+    """
+    A fixed-length array of references for arrays that are mostly None.
+
+    It has the same interface as ArrayR (and is one), but only stores its non-None
+    items, so it has no `array` attribute and overrides every ArrayR method that reads
+    one: a bitmap (an integer, as in BitVectorSet) marks which positions are set, and
+    a compact tuple holds their items in position order. The item at position i sits at
+    the number of set bits below bit i.
+
+    Reads are O(1); writes that set or clear a position rebuild the compact tuple, so
+    they are O(K) for K stored items. Use to_dense() to get a plain ArrayR once the
+    array fills up.
+    """
+    __slots__ = ("_length", "_bitmap", "_items")
+
+    def __init__(self, length: int) -> None:
+        """
+        :complexity: O(1) for best/worst case, nothing is stored until it is set.
+        :pre: length >= 0
+        """
+        if length < 0:
+            raise ValueError("Array length cannot be negative.")
+        self._length = length
+        self._bitmap = 0
+        self._items = ()
+
+    @classmethod
+    def from_list(cls, lst: list[T] | List[T] | SortedList[T]) -> SparseArrayR[T]:
+        """ Creates a SparseArrayR from a list, including ArrayList, LinkedList and ArraySortedList
+        :complexity: O(n) where n is the length of the list
+        """
+        new_array = cls(len(lst))
+        bitmap = 0
+        items = []
+        for i in range(len(lst)):
+            if lst[i] is not None:
+                bitmap |= 1 << i
+                items.append(lst[i])
+        new_array._bitmap = bitmap
+        new_array._items = tuple(items)
+        return new_array
+
+    def __len__(self) -> int:
+        """ Returns the length of the array
+        :complexity: O(1)
+        """
+        return self._length
+
+    def __position(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("invalid index")
+        return index
+
+    def __getitem__(self, index: int) -> T | None:
+        """ Returns the object in position index, or None if it was never set.
+        :complexity: O(1)
+        :raises IndexError: if index is out of range
+        """
+        if not 0 <= index < self._length:
+            index = self.__position(index)
+        bitmap = self._bitmap
+        bit = 1 << index
+        if not bitmap & bit:
+            return None
+        return self._items[(bitmap & (bit - 1)).bit_count()]
+
+    def __setitem__(self, index: int, value: T | None) -> None:
+        """ Sets the object in position index to value; None clears the position.
+        :complexity: O(1) when replacing a stored item, O(K) otherwise
+        :raises IndexError: if index is out of range
+        """
+        index = self.__position(index)
+        bit = 1 << index
+        k = (self._bitmap & (bit - 1)).bit_count()
+        items = self._items
+        if self._bitmap & bit:
+            if value is None:
+                self._items = items[:k] + items[k + 1:]
+                self._bitmap &= ~bit
+            else:
+                self._items = items[:k] + (value,) + items[k + 1:]
+        elif value is not None:
+            self._items = items[:k] + (value,) + items[k:]
+            self._bitmap |= bit
+
+    def occupied(self) -> int:
+        """ Returns how many positions hold an item other than None.
+        :complexity: O(1)
+        """
+        return len(self._items)
+
+    def next_set(self, index: int) -> int:
+        """ Returns the first position >= index holding an item, or len(self) if none does.
+        :complexity: O(1), read from the bitmap
+        :pre: index >= 0
+        """
+        rest = self._bitmap >> index
+        if not rest:
+            return self._length
+        return index + (rest & -rest).bit_length() - 1
+
+    def copy(self) -> SparseArrayR[T]:
+        """ Returns a new SparseArrayR with the same contents.
+        :complexity: O(1), the compact item tuple is immutable and shared
+        """
+        clone = SparseArrayR(self._length)
+        clone._bitmap = self._bitmap
+        clone._items = self._items
+        return clone
+
+    def to_dense(self) -> ArrayR[T]:
+        """ Returns a plain ArrayR with the same contents.
+        :complexity: O(n + K), O(n) to allocate the n slots and O(K) to fill the K stored items
+        """
+        dense = ArrayR(self._length)
+        bitmap = self._bitmap
+        k = 0
+        while bitmap:
+            low = bitmap & -bitmap
+            dense[low.bit_length() - 1] = self._items[k]
+            bitmap ^= low
+            k += 1
+        return dense
+
+    def to_list(self) -> list[T]:
+        """ Returns a list representation of the array
+        :complexity: O(n) where n is the length of the array
+        """
+        return [self[i] for i in range(self._length)]
+
+    def __str__(self) -> str:
+        """ Returns a string representation of the array
+        :complexity: O(n) where n is the length of the array
+        """
+        return str(self.to_list())
+
+    def __repr__(self) -> str:
+        """ Returns a string representation of the array for debugging purposes
+        :complexity: O(n) where n is the length of the array
+        """
+        return str(self)
@@ -1,86 +1,369 @@
-from data_structures import ArrayR
-from data_structures.hash_table_separate_chaining import HashTableSeparateChaining
+from data_structures import ArrayR, HashCounter
+from algorithms.countingsort import counting_sort
 from algorithms.insertionsort import insertion_sort
 from processing_line import Transaction
 
 
-class FraudDetection:
-    def __init__(self, transactions: ArrayR):
+def _build_rank_table(symbols):
+    """
+    Returns a translation table, indexed by code point up to the largest one in symbols,
+    mapping each symbol to its position in symbols plus one and every other code point
+    to 0.
+    """
+    table = bytearray(max(ord(c) for c in symbols) + 1 if symbols else 0)
+    i = 0
+    while i < len(symbols):
+        table[ord(symbols[i])] = i + 1
+        i += 1
+    return bytes(table)
+
+
+class BlockGrouper:
+    """
+    Groups transactions by block signature for every block size S = 1..L.
+
+    For block size S a signature is cut into B = L // S blocks plus a tail of the last
+    L mod S characters, and two transactions are in the same group when their tails are
+    equal and their blocks are the same multiset. The score of S is the product of its
+    group sizes.
+
+    Every signature is read once, when the grouper is made. When all transactions are
+    integer-signed, their signature values are kept and blocks are cut from them by
+    divmod, so no signature is rendered; otherwise the signature strings are kept (a
+    mix renders the integer ones, without storing them on the transactions), and they
+    must all have the same length. Each block size is then one pass over those
+    signatures with scratch arrays reused for every transaction, counting group keys in
+    one HashCounter sized by N and cleared between block sizes.
+
+    By default the key is a fingerprint: an integer below FINGERPRINT_PRIME computed
+    from the block values without sorting them (see fingerprint()). Equal multisets
+    always get equal fingerprints, so a transaction whose fingerprint no other one has
+    is alone in its group. Only transactions sharing a fingerprint are then grouped
+    exactly, by their canonical key: the tail followed by the sorted blocks. With
+    fingerprints=False, or when S leaves a single block, every transaction is grouped
+    by its canonical key.
+    """
+    # A Mersenne prime, and two fixed points below it where fingerprints are evaluated.
+    FINGERPRINT_PRIME = (1 << 61) - 1
+    BLOCK_POINT = 0x0F1E2D3C4B5A6978
+    TAIL_POINT = 0x1B873593CC9E2D51
+    # Signature symbols in string order, and the block count from which canonical keys
+    # distribute blocks by leading symbol before insertion sort (measured crossover,
+    # which 36-character signatures only reach at S = 1).
+    SYMBOLS = "0123456789abcdefghijklmnopqrstuvwxyz"
+    COUNTING_SORT_BLOCKS = 32
+    # symbol_rank() of each code point, so the counting sort's key is one lookup.
+    SYMBOL_RANKS = _build_rank_table(SYMBOLS)
+
+    def __init__(self, transactions: ArrayR, fingerprints: bool = True):
         """
-        :complexity: Best case is O(1) and worst case is O(1).
-        
-        We only store the reference to the provided ArrayR; no work scales with the
-        number of transactions here.
+        :complexity: Best case is O(N) with N transactions, when they are all
+        integer-signed or signed with strings. Worst case is O(N * L) with signature
+        length L, when integer signatures are mixed with strings and are rendered.
+        Raises ValueError if the signatures do not all have the same length.
         """
-        self.transactions = transactions 
+        n = 0
+        for _ in transactions:
+            n += 1
+        values = ArrayR(n)
+        integer = n > 0
+        i = 0
+        for t in transactions:
+            value = t.signature_value
+            values[i] = value
+            integer = integer and value is not None
+            i += 1
+        if integer:
+            self.values = values
+            self.signatures = None
+            self.length = Transaction._SIG_LEN
+        else:
+            self.values = None
+            self.signatures = ArrayR(n)
+            i = 0
+            for t in transactions:
+                self.signatures[i] = t.signature
+                i += 1
+            self.length = len(self.signatures[0]) if n > 0 else 0
+            i = 0
+            while i < n:
+                sig = self.signatures[i]
+                if len(sig) != self.length:
+                    raise ValueError(f"{sig!r} has {len(sig)} characters, but the first "
+                                     f"signature has {self.length}")
+                i += 1
+        self.fingerprints = fingerprints
+        self._groups = HashCounter(n)
+        self._keys = ArrayR(n) if fingerprints else None
 
-    def detect_by_blocks(self):
+    @classmethod
+    def fingerprint(cls, sig: str, S: int) -> int:
         """
-        :complexity: O(N*L^2*log L), with N transactions and signature length L.
-        
-        We try every block size S (1..L). Per signature that means sorting B=⌊L/S⌋ blocks
-        by insertion sort (~O(B^2·S)=O(L^2/S)); across N items and all S, this sums to O(N·L^2*log L).
-        """
-        first_sig = None
-        for t in self.transactions:
-            if first_sig is None:
-                first_sig = t.signature
-            N += 1
-        if N == 0:
-            return (1, 1)
+        Returns the fingerprint of sig's blocks of size S and tail.
 
-        L = len(first_sig)
-        best_S = 1
-        best_score = 1
-        S = 1
-        while S <= L:
-            groups = HashTableSeparateChaining(97)
-            r = L - (L // S) * S
-            B = L // S
-
-            for t in self.transactions:
-                sig = t.signature
-                tail = "" if r == 0 else sig[L - r:L]
+        Each block is read as a number v by block_value(), and the blocks give the
+        polynomial prod(BLOCK_POINT - v) modulo FINGERPRINT_PRIME, whose roots are the
+        blocks, so it does not depend on their order. The tail's value is then added to
+        that times TAIL_POINT. Different block multisets can share a fingerprint, but
+        only by chance (or when blocks longer than 11 characters, which exceed the
+        prime, are congruent modulo it).
 
-                blocks = ArrayR(B)
-                i = 0
-                while i < B:
-                    start = i * S
-                    blocks[i] = sig[start:start + S]
-                    i += 1
+        :complexity: Best = Worst = O(L) for a signature of length L, one slice, parse
+        and modular product per block (twice when a block is not base 36).
+        """
+        P = cls.FINGERPRINT_PRIME
+        X = cls.BLOCK_POINT
+        L = len(sig)
+        B = L // S
+        value = 1
+        j = 0
+        try:
+            while j < B:
+                value = value * (X - int(sig[j * S:j * S + S], 36)) % P
+                j += 1
+            if B * S < L:
+                value = (value * cls.TAIL_POINT + int(sig[B * S:L], 36)) % P
+            return value
+        except ValueError:
+            # A character outside base 36: start over reading each block by block_value().
+            pass
+        value = 1
+        j = 0
+        while j < B:
+            value = value * (X - cls.block_value(sig[j * S:j * S + S])) % P
+            j += 1
+        if B * S < L:
+            value = (value * cls.TAIL_POINT + cls.block_value(sig[B * S:L])) % P
+        return value
+
+    @staticmethod
+    def block_value(block: str) -> int:
+        """
+        Returns block read as a base-36 number, or, when it has a character int() does
+        not accept as a base-36 digit (punctuation, most non-ASCII), its code points
+        read as base-0x110000 digits. Equal blocks always get equal values, which is all
+        fingerprint() needs; the few unequal blocks that share one (int() ignores case,
+        and code point values can equal base-36 ones) are told apart by canonical keys.
 
-                if B > 1:
-                    insertion_sort(blocks)
+        :complexity: Best = Worst = O(S) for a block of length S.
+        """
+        try:
+            return int(block, 36)
+        except ValueError:
+            return int.from_bytes(block.encode("utf-32-le", "surrogatepass"), "little")
 
-                key = tail + "|"
-                i = 0
-                while i < B:
-                    key = key + blocks[i] + "|"
-                    i += 1
+    @classmethod
+    def fingerprint_value(cls, value: int, S: int) -> int:
+        """
+        Returns the fingerprint of an integer signature's blocks of size S and tail, as
+        fingerprint() does for a string, with the blocks cut from value by divmod: they
+        are its digits in base 36^S above the tail's L mod S base-36 digits. Block values
+        are alphabet indices rather than parsed strings, so the two kinds of fingerprint
+        are not comparable, but a grouper only ever uses one.
+
+        :complexity: Best = Worst = O(L) for signatures of length L, one divmod and
+        modular product per block.
+        """
+        P = cls.FINGERPRINT_PRIME
+        X = cls.BLOCK_POINT
+        L = Transaction._SIG_LEN
+        B = L // S
+        rest, tail = divmod(value, 36 ** (L - B * S))
+        base = 36 ** S
+        fingerprint = 1
+        j = 0
+        while j < B:
+            rest, block = divmod(rest, base)
+            fingerprint = fingerprint * (X - block) % P
+            j += 1
+        if B * S < L:
+            fingerprint = (fingerprint * cls.TAIL_POINT + tail) % P
+        return fingerprint
+
+    @classmethod
+    def canonical_value(cls, value: int, S: int, blocks: ArrayR) -> int:
+        """
+        Returns an integer signature's canonical key for block size S: its tail followed
+        by its sorted blocks, as the digits of one integer (tail first, then a base-36^S
+        digit per block). The tail and every block have a fixed width for a given S, so
+        equal keys mean equal tails and block multisets, as with canonical(). blocks is
+        scratch space for exactly L // S blocks.
+
+        One-digit blocks (S = 1) are counting sorted when there are at least
+        COUNTING_SORT_BLOCKS of them, which orders them completely; otherwise they are
+        insertion sorted.
+
+        :complexity: Best case is O(L) and worst case is O(L^2 / S), with signature
+        length L: B = L // S divmods, insertion sort (O(B) when already in order, O(B^2)
+        comparisons at worst) and B multiply-adds building the key.
+        """
+        L = Transaction._SIG_LEN
+        B = L // S
+        rest, key = divmod(value, 36 ** (L - B * S))
+        base = 36 ** S
+        j = B
+        while j > 0:
+            j -= 1
+            rest, blocks[j] = divmod(rest, base)
+        if S == 1 and B >= cls.COUNTING_SORT_BLOCKS:
+            counting_sort(blocks, int, 36)
+        elif B > 1:
+            insertion_sort(blocks)
+        j = 0
+        while j < B:
+            key = key * base + blocks[j]
+            j += 1
+        return key
+
+    @classmethod
+    def canonical(cls, sig: str, S: int, blocks: ArrayR) -> str:
+        """
+        Returns sig's canonical key for block size S: its tail followed by its sorted
+        blocks. blocks is scratch space for exactly len(sig) // S blocks.
+
+        With at least COUNTING_SORT_BLOCKS blocks, they are first counting sorted by
+        leading symbol, which leaves insertion sort only the blocks sharing one to
+        order; below that, insertion sort alone is faster. For 36-character signatures
+        that is only S = 1 (36 one-character blocks, which the counting sort leaves in
+        order for insertion sort's single pass); S = 2 already leaves 18 blocks, below
+        the crossover.
+
+        :complexity: Best case is O(L) and worst case is O(L^2 / S), with signature
+        length L: the B = L // S blocks are sliced, sorted by insertion sort (O(B) when
+        already in order, O(B^2) block comparisons at worst) and joined into a key of
+        length L. At S = 1 with the counting sort first, it is O(L + R) with R symbols.
+        """
+        L = len(sig)
+        B = L // S
+        j = 0
+        while j < B:
+            blocks[j] = sig[j * S:j * S + S]
+            j += 1
+        if B >= cls.COUNTING_SORT_BLOCKS:
+            counting_sort(blocks, cls.symbol_rank, len(cls.SYMBOLS) + 1)
+        if B > 1:
+            insertion_sort(blocks)
+        # Tails all have length L mod S and blocks length S, so no separator is needed.
+        return sig[B * S:L] + "".join(blocks)
+
+    @classmethod
+    def symbol_rank(cls, block: str) -> int:
+        """
+        Returns the rank of block's leading symbol in SYMBOLS, plus one, or 0 for a symbol
+        outside it, so ranks follow string order except for those.
+        :complexity: O(1), read from SYMBOL_RANKS.
+        """
+        code = ord(block[0])
+        ranks = cls.SYMBOL_RANKS
+        return ranks[code] if code < len(ranks) else 0
 
-                # Increment group size
-                try:
-                    c = groups[key]
-                    groups[key] = c + 1
-                except KeyError:
-                    groups[key] = 1
+    def score(self, S: int) -> int:
+        """
+        Returns the product of the group sizes for block size S, 1 <= S <= L.
 
-            # Compute suspicion score = product of all group sizes
-            score = 1
-            items = groups.items()  # ArrayR of (key, value) pairs (as 2-length arrays/tuples)
+        :complexity: Best case is O(N * L) with N transactions and signature length L,
+        when fingerprints are used and no two transactions share one: O(L) each to
+        compute and O(1) to count it.
+        Worst case is O(N * L^2 / S), when every transaction is grouped by its canonical
+        key (without fingerprints, or when all of them share fingerprints).
+        """
+        groups = self._groups
+        groups.clear()
+        blocks = ArrayR(self.length // S)
+        if self.values is not None:
+            signatures = self.values
+            fingerprint = self.fingerprint_value
+            canonical = self.canonical_value
+        else:
+            signatures = self.signatures
+            fingerprint = self.fingerprint
+            canonical = self.canonical
+        n = len(signatures)
+        # With a single block nothing is sorted, and the canonical key is cheaper to build.
+        if not self.fingerprints or self.length // S < 2:
             i = 0
-            while i < len(items):
-                kv = items[i]
-                score *= kv[1]
+            while i < n:
+                groups.add(canonical(signatures[i], S, blocks))
                 i += 1
+            return BlockGrouper.product_of_counts(groups)
+
+        keys = self._keys
+        i = 0
+        while i < n:
+            key = fingerprint(signatures[i], S)
+            keys[i] = key
+            groups.add(key)
+            i += 1
+        if len(groups) == n:
+            return 1
+
+        # Group exactly the transactions that share a fingerprint with another one.
+        shared = HashCounter(n - len(groups))
+        i = 0
+        while i < n:
+            if groups[keys[i]] > 1:
+                shared.add(canonical(signatures[i], S, blocks))
+            i += 1
+        return BlockGrouper.product_of_counts(shared)
+
+    @staticmethod
+    def product_of_counts(groups: HashCounter) -> int:
+        """
+        :complexity: Best case is O(G) for G groups, when at most a few sizes repeat.
+        The sizes are tallied first, so the product is a few powers rather than one
+        multiplication per group into an ever larger integer.
+        """
+        sizes = HashCounter(0)
+        for count in groups.counts():
+            if count > 1:
+                sizes.add(count)
+        score = 1
+        for size in sizes:
+            score *= size ** sizes[size]
+        return score
+
+    def best(self):
+        """
+        Returns (best_S, best_score): the block size with the highest score, the
+        smallest such S on ties, and (1, 1) when there are no transactions.
 
+        :complexity: O(sum over S of score(S)), which is O(N * L^2 log L) at worst.
+        """
+        best_S = 1
+        best_score = 1
+        S = 1
+        while S <= self.length:
+            score = self.score(S)
             if score > best_score:
                 best_score = score
                 best_S = S
             S += 1
-
         return (best_S, best_score)
 
+
+class FraudDetection:
+    def __init__(self, transactions: ArrayR):
+        """
+        :complexity: Best case is O(1) and worst case is O(1).
+        
+        We only store the reference to the provided ArrayR; no work scales with the
+        number of transactions here.
+        """
+        self.transactions = transactions 
+
+    def detect_by_blocks(self):
+        """
+        :complexity: Best case is O(N*L^2), worst case O(N*L^2*log L), with N transactions
+        and signature length L.
+        
+        We try every block size S (1..L). The work is done by a BlockGrouper, which reads
+        every signature once and groups them by an O(L) fingerprint of their blocks per S,
+        so O(N*L^2) over all S when fingerprints are distinct. Transactions sharing a
+        fingerprint are grouped exactly, sorting their B=⌊L/S⌋ blocks by insertion sort
+        (~O(B^2·S)=O(L^2/S)); across N items and all S, this sums to O(N·L^2*log L).
+        """
+        return BlockGrouper(self.transactions).best()
+
     def rectify(self, functions: ArrayR):
         """
         :complexity: Per function f with table size T=max(f(tx))+1: best O(N+T), worst O(N+T^2).
@@ -1,35 +1,176 @@
-from data_structures import ArrayR
+import copy
+import mmap
+import struct
+import threading
+
+from algorithms.radixsort import radix_sort
+from data_structures import ArrayR, SparseArrayR
 from data_structures.linked_stack import LinkedStack
 from processing_line import Transaction
 
+
+def _build_page_table(characters):
+    """
+    Returns a 256-byte translation table mapping the byte of each legal character to its
+    page index and every other byte to 255.
+    """
+    table = bytearray(b"\xff" * 256)
+    i = 0
+    while i < len(characters):
+        table[ord(characters[i])] = i
+        i += 1
+    return bytes(table)
+
+
+# The file format written by ProcessingBook.save() and read by MappedProcessingBook.
+# A header, then one record per leaf and per book, each book after everything under it:
+#   header  magic, version, flags (unused), offset of the root book record, size, errors
+#   book    level, size, then one slot per page
+#   leaf    timestamp, amount type (0 int, 1 float), byte lengths of the signature and
+#           both user names, the amount, then the signature (ASCII) and names (UTF-8)
+# A slot is 0 for an empty page, otherwise a record's offset shifted left by one, with
+# the low bit set for a leaf.
+_FILE_MAGIC = b"PBK1"
+_FILE_VERSION = 1
+_FILE_HEADER = struct.Struct("<4sHHQQQ")
+_BOOK_RECORD = struct.Struct("<II36Q")
+_BOOK_HEAD = struct.Struct("<II")
+_SLOT = struct.Struct("<Q")
+_LEAF_HEAD = struct.Struct("<qBHHH")
+_INT_AMOUNT = struct.Struct("<q")
+_FLOAT_AMOUNT = struct.Struct("<d")
+
+
 class ProcessingBook:
     LEGAL_CHARACTERS = "abcdefghijklmnopqrstuvwxyz0123456789"
+    # Shared by every book: character byte -> page index (255 for illegal characters).
+    _PAGE_TABLE = _build_page_table(LEGAL_CHARACTERS)
+    # Whether nested books skip levels where all their entries share a page.
+    _PATH_COMPRESSION = False
+    # Books keep their pages in a SparseArrayR until more than this many are non-empty.
+    SPARSE_PAGE_LIMIT = 8
+    # get_many() and delete_many() only sort a batch to share its descent when it has at
+    # least this many transactions and a lookup goes through at least this many books.
+    SHARED_DESCENT_MIN_BATCH = 64
+    SHARED_DESCENT_MIN_DEPTH = 16
+    # Copy-on-write state, see snapshot(). A book's pages may only be written to while its
+    # _owner is the root's current _token; both stay None until a snapshot is taken.
+    _owner = None
+    _token = None
+    _read_only = False
 
     def __init__(self, level: int = 0):
         """
         :complexity: Best case is O(1) and worst case is O(1).
-        We allocate a fixed 36-slot ArrayR for pages and initialise counters; the work
-        does not depend on how many transactions will be stored later.
+        Pages start as an empty 36-slot SparseArrayR, which stores nothing until a page
+        is filled, and counters are initialised; the work does not depend on how many
+        transactions will be stored later.
         """
         self._level = level  
-        self.pages = ArrayR(len(ProcessingBook.LEGAL_CHARACTERS))
-        i = 0
-        while i < len(self.pages):
-            self.pages[i] = None  
-            i += 1
+        self.pages = SparseArrayR(len(ProcessingBook.LEGAL_CHARACTERS))
         self._size = 0
         self._errors = 0
     
+    def _set_page(self, idx, value):
+        """
+        :complexity: Best case is O(1) once the pages are a full ArrayR.
+        Worst case is O(K) while they are sparse, for K <= SPARSE_PAGE_LIMIT non-empty
+        pages, plus a one-off O(36) when the book outgrows the limit.
+
+        Stores value in page idx when filling a page. Books start with sparse pages,
+        since most nested books hold two or three entries; past SPARSE_PAGE_LIMIT
+        non-empty pages they switch to a full 36-slot ArrayR for good. Either way pages
+        is an ArrayR, so reads (and writes that only replace or clear a page) go to it
+        directly.
+        """
+        pages = self.pages
+        pages[idx] = value
+        if type(pages) is SparseArrayR and pages.occupied() > ProcessingBook.SPARSE_PAGE_LIMIT:
+            self.pages = pages.to_dense()
+
     def page_index(self, character):
         """
         You may find this method helpful. It takes a character and returns the index of the relevant page.
         Time complexity of this method is O(1), because it always only checks 36 characters.
 
         :complexity: Best case is O(1) and worst case is O(1).
-        We index within a fixed alphabet of 36 characters (a–z then 0–9).
+        A single lookup in the precomputed _PAGE_TABLE by the character's ordinal, rather
+        than scanning the alphabet. Raises ValueError for illegal characters.
         """
-        return ProcessingBook.LEGAL_CHARACTERS.index(character)
-    
+        code = ord(character)
+        if code < 256:
+            page = ProcessingBook._PAGE_TABLE[code]
+            if page != 255:
+                return page
+        raise ValueError(f"{character!r} is not a legal signature character")
+
+    def page_indices(self, signature):
+        """
+        Decodes a whole signature into its page indices, one per level. signature may be
+        a string or an integer signature value (see Transaction.signature_value).
+        Raises ValueError for illegal characters.
+
+        The result is a bytes object: an immutable array of small integers, so
+        page_indices(sig)[k] is the page at level k, without building an ArrayR.
+
+        :complexity: Best case is O(L) and worst case is O(L), for a signature of length L.
+        Strings are decoded by one bytes.translate call through _PAGE_TABLE.
+        """
+        if type(signature) is int:
+            L = Transaction._SIG_LEN
+            pages = bytearray(L)
+            k = L - 1
+            while k >= 0:
+                signature, pages[k] = divmod(signature, 36)
+                k -= 1
+            return bytes(pages)
+        try:
+            pages = signature.encode("latin-1").translate(ProcessingBook._PAGE_TABLE)
+        except UnicodeEncodeError:
+            pages = b"\xff"
+        if 255 in pages:
+            raise ValueError(f"{signature!r} contains an illegal signature character")
+        return pages
+
+    def _key_path(self, key):
+        """
+        :complexity: Best case is O(1) for an integer key, which is its own path: its
+        pages are read one level at a time by _page_at. Worst case is O(L) for a string
+        key of length L, decoded by page_indices in one bytes.translate call.
+        Raises ValueError for illegal characters.
+        """
+        if type(key) is int:
+            return key
+        return self.page_indices(key)
+
+    @staticmethod
+    def _page_at(path, level):
+        """
+        :complexity: Best = Worst = O(1).
+        Page index at `level` of a path from _key_path: one division and one modulo for an
+        integer key, a bytes index otherwise.
+        """
+        if type(path) is int:
+            return path // Transaction._POWERS[level] % 36
+        return path[level]
+
+    @staticmethod
+    def _page_range(path, start, stop):
+        """
+        :complexity: Best = Worst = O(stop - start).
+        page_indices(key)[start:stop] for a path from _key_path.
+        """
+        if type(path) is not int:
+            return path[start:stop]
+        pages = bytearray(stop - start)
+        if stop > start:
+            path //= Transaction._POWERS[stop - 1]
+        k = stop - start - 1
+        while k >= 0:
+            path, pages[k] = divmod(path, 36)
+            k -= 1
+        return bytes(pages)
+
     def get_error_count(self):
         """
         Returns the number of errors encountered while storing transactions.
@@ -58,7 +199,11 @@ class ProcessingBook:
         We can descend through at most D nested books, doing O(1) work per level. 
         If the key already exists, we either do nothing (same amount) or increment 
         the error counter (different amount) without changing the stored value.
+
+        Raises TypeError on a snapshot, which is read-only.
         """
+        if self._read_only:
+            raise TypeError("ProcessingBook snapshots are read-only")
         self._insert(tr, amount)
 
     def __getitem__(self, tr: Transaction):
@@ -69,10 +214,10 @@ class ProcessingBook:
         at most one page per level until the leaf is reached; each level costs O(1).
         Raises KeyError if the transaction is not stored.
         """
-        sig = tr.signature
-        if sig is None:
+        key = ProcessingBook._key(tr)
+        if key is None:
             raise KeyError("Unsigned transaction")
-        return self._get(sig)
+        return self._get(key)
 
     def __delitem__(self, tr: Transaction):
         """
@@ -83,14 +228,326 @@ class ProcessingBook:
         to the leaf and, on the way back up, perform at most one O(1) collapse check per level
         (empties and singletons) to keep the structure minimal. 
 
-        Additionally, if the transaction is not stored it raises KeyError.
+        Additionally, if the transaction is not stored it raises KeyError, and on a
+        snapshot (which is read-only) it raises TypeError.
         """
-        sig = tr.signature
-        if sig is None:
+        if self._read_only:
+            raise TypeError("ProcessingBook snapshots are read-only")
+        key = ProcessingBook._key(tr)
+        if key is None:
             raise KeyError("Unsigned transaction")
-        if not self._delete(sig):
+        if not self._delete(key):
             raise KeyError("Transaction not found")
 
+    def _shares_descent(self, transactions):
+        """
+        :complexity: Best case is O(1) for a batch below SHARED_DESCENT_MIN_BATCH.
+        Worst case is O(N + D) to find the first signed of N transactions and follow it
+        down D nested books.
+
+        Whether get_many() and delete_many() should go through the tuple transactions in
+        page order to share their descent. Decoding (and for delete_many() sorting)
+        the signatures costs more than a lookup through a few books, so it only pays off
+        for large batches on deep tries (signatures with long common prefixes); the
+        depth is that of the first signed transaction's lookup.
+        """
+        if len(transactions) < ProcessingBook.SHARED_DESCENT_MIN_BATCH:
+            return False
+        i = 0
+        while i < len(transactions):
+            key = ProcessingBook._key(transactions[i])
+            if key is not None:
+                return self._descent_depth(key) >= ProcessingBook.SHARED_DESCENT_MIN_DEPTH
+            i += 1
+        return False
+
+    def _descent_depth(self, key):
+        """
+        :complexity: Best case is O(1) when the key's page in this book is a leaf or
+        empty. Worst case is O(D) for the D nested books on its path.
+        The number of nested books a lookup of key goes through.
+        """
+        path = self._key_path(key)
+        stop = Transaction._SIG_LEN if type(path) is int else len(path)
+        book = self
+        depth = 0
+        while book._level < stop:
+            slot = book.pages[ProcessingBook._page_at(path, book._level)]
+            if not isinstance(slot, ProcessingBook):
+                break
+            book = slot
+            depth += 1
+        return depth
+
+    def _sorted_requests(self, transactions, sort=True):
+        """
+        :complexity: Best case is O(N * L) for the N transactions in the tuple
+        transactions, with signatures of length L, to decode them when they are already
+        in page order (checked in O(N) comparisons), or when sort is False.
+        Worst case is O(N * L) as well, to radix sort them in page order.
+
+        Returns an ArrayR of (page path, position in transactions, key) triples sorted
+        by page path, and the length of the longest path. Unsigned transactions get an
+        empty path and a key of None. With sort False, transactions that are not in page
+        order already are not sorted: decoding stops at the first one out of order, and
+        the triples returned are None instead.
+        """
+        requests = ArrayR(len(transactions))
+        deepest = 0
+        ordered = True
+        prev = b""
+        i = 0
+        while i < len(transactions):
+            key = ProcessingBook._key(transactions[i])
+            path = b"" if key is None else self.page_indices(key)
+            deepest = max(deepest, len(path))
+            if prev > path:
+                if not sort:
+                    return None, deepest
+                ordered = False
+            prev = path
+            requests[i] = (path, i, key)
+            i += 1
+        if not ordered:
+            radix_sort(requests, key=ProcessingBook._request_path,
+                       radix=len(ProcessingBook.LEGAL_CHARACTERS))
+        return requests, deepest
+
+    @staticmethod
+    def _request_path(request):
+        return request[0]
+
+    @staticmethod
+    def _common_prefix(a, b):
+        """
+        :complexity: Best = Worst = O(L) for paths of length L, done in C by comparing
+        the paths as big integers rather than page by page.
+        The number of leading pages page paths a and b have in common.
+        """
+        n = min(len(a), len(b))
+        a = a[:n]
+        b = b[:n]
+        if a == b:
+            return n
+        differ = int.from_bytes(a, "big") ^ int.from_bytes(b, "big")
+        return n - 1 - (differ.bit_length() - 1) // 8
+
+    def get_many(self, transactions, default=None):
+        """
+        Looks up many transactions at once. Returns an ArrayR holding, for each of
+        transactions in the same order, its amount, or default if it is not stored (or
+        unsigned).
+
+        :complexity: Best case is O(N * L) for N transactions with signatures of length
+        L, to decode them, when they are already in page order on a deep trie (see
+        _shares_descent). Lookups are then made in that order, and each starts from the
+        deepest book the previous one went through that is still on its path, so books
+        shared by several signatures are only reached once from above.
+
+        Worst case is O(N * (D + L)) otherwise, each transaction looked up on its own
+        down D nested books, plus O(L) per string key. Sorting them instead would cost
+        more than the shared descent saves.
+        """
+        transactions = tuple(transactions)
+        if not self._shares_descent(transactions):
+            return self._get_each(transactions, default)
+        requests, deepest = self._sorted_requests(transactions, sort=False)
+        if requests is None:
+            return self._get_each(transactions, default)
+        results = ArrayR(len(requests))
+        books = ArrayR(deepest + 1)
+        books[0] = self
+        depth = 1
+        prev = b""
+        i = 0
+        while i < len(requests):
+            path, position, key = requests[i]
+            i += 1
+            amount = default
+            if key is not None:
+                shared = ProcessingBook._common_prefix(prev, path)
+                while books[depth - 1]._level > shared:
+                    depth -= 1
+                prev = path
+                book = books[depth - 1]
+                while book._level < len(path):
+                    slot = book.pages[path[book._level]]
+                    if slot is None:
+                        break
+                    if isinstance(slot, ProcessingBook):
+                        books[depth] = slot
+                        depth += 1
+                        book = slot
+                        continue
+                    if ProcessingBook._matches(slot[0], key):
+                        amount = slot[1]
+                    break
+            results[position] = amount
+        return results
+
+    def delete_many(self, transactions) -> int:
+        """
+        Deletes many transactions at once and returns how many were stored (and so
+        deleted). Transactions that are not stored, or unsigned, are skipped. Raises
+        TypeError on a snapshot, which is read-only.
+
+        :complexity: Best case is O(N * D) for N transactions, each deleted on its own
+        down D nested books, when the batch is small or the trie shallow (see
+        _shares_descent), plus O(L) per signature of length L for string keys.
+
+        Worst case is O(N * L + B * 36) otherwise, for B nested books holding deleted
+        entries. Deletes are made in page order, sharing the descent as get_many() does. Each
+        book on the current path counts the entries deleted below it, and only when the
+        descent leaves it are its size updated and the collapse check made, once per
+        affected book however many entries it lost. Books are finished bottom-up, so a
+        collapse already sees its children collapsed.
+        """
+        if self._read_only:
+            raise TypeError("ProcessingBook snapshots are read-only")
+        transactions = tuple(transactions)
+        if not self._shares_descent(transactions):
+            return self._delete_each(transactions)
+        requests, deepest = self._sorted_requests(transactions)
+        # The books on the current path, the entries deleted under each so far, and the
+        # page each one sits in within the one above it.
+        books = ArrayR(deepest + 1)
+        removed = ArrayR(deepest + 1)
+        pages = ArrayR(deepest + 1)
+        books[0] = self
+        removed[0] = 0
+        depth = 1
+        # The books below this depth may be written to (see snapshot()).
+        owned = 0
+        token = self._token
+        deleted = 0
+        prev = b""
+        i = 0
+        while i < len(requests):
+            path, _, key = requests[i]
+            i += 1
+            if key is None:
+                continue
+            shared = ProcessingBook._common_prefix(prev, path)
+            while books[depth - 1]._level > shared:
+                depth -= 1
+                ProcessingBook._finish_deletes(books, removed, pages, depth)
+            owned = min(owned, depth)
+            prev = path
+            book = books[depth - 1]
+            while book._level < len(path):
+                idx = path[book._level]
+                slot = book.pages[idx]
+                if slot is None:
+                    break
+                if isinstance(slot, ProcessingBook):
+                    books[depth] = slot
+                    removed[depth] = 0
+                    pages[depth] = idx
+                    depth += 1
+                    book = slot
+                    continue
+                if ProcessingBook._matches(slot[0], key):
+                    while owned < depth:
+                        if owned == 0:
+                            self._own_pages()
+                        elif books[owned]._owner is not token:
+                            books[owned] = books[owned - 1]._copy_child(pages[owned], token)
+                        owned += 1
+                    books[depth - 1].pages[idx] = None
+                    removed[depth - 1] += 1
+                    deleted += 1
+                break
+
+        while depth > 1:
+            depth -= 1
+            ProcessingBook._finish_deletes(books, removed, pages, depth)
+        if removed[0] > 0:
+            self._resize(-removed[0])
+        return deleted
+
+    def _get_each(self, transactions, default):
+        """
+        :complexity: O(N * D) for the N transactions in the tuple transactions, as _get
+        on each.
+        get_many() without sharing the descent.
+        """
+        results = ArrayR(len(transactions))
+        i = 0
+        for tr in transactions:
+            key = ProcessingBook._key(tr)
+            amount = default
+            if key is not None:
+                # A signature shorter than the stored ones runs out of pages (IndexError)
+                # before reaching a leaf, so it is not stored either.
+                try:
+                    amount = self._get(key)
+                except (KeyError, IndexError):
+                    pass
+            results[i] = amount
+            i += 1
+        return results
+
+    def _delete_each(self, transactions) -> int:
+        """
+        :complexity: O(N * D) for the N transactions in the tuple transactions, as
+        _delete on each.
+        delete_many() without sharing the descent.
+        """
+        deleted = 0
+        for tr in transactions:
+            key = ProcessingBook._key(tr)
+            if key is not None:
+                # As in _get_each, a signature that runs out of pages is not stored.
+                try:
+                    if self._delete(key):
+                        deleted += 1
+                except IndexError:
+                    pass
+        return deleted
+
+    @staticmethod
+    def _finish_deletes(books, removed, pages, depth):
+        """
+        :complexity: Best case is O(1) when nothing was deleted under the book.
+        Worst case is that of _collapse_child.
+        Applies the deletes counted under the book at depth to its size and its
+        parent's count, then collapses it if needed.
+        """
+        count = removed[depth]
+        if count == 0:
+            return
+        book = books[depth]
+        book._size -= count
+        removed[depth - 1] += count
+        books[depth - 1]._collapse_child(pages[depth], book)
+
+    @staticmethod
+    def _key(tr: Transaction):
+        """
+        :complexity: Best = Worst = O(1).
+        The key the trie is walked with: the integer signature when the transaction was
+        signed in integer mode (so no string is ever rendered), otherwise the string.
+        Both are read from their slots, skipping the signature properties on this path.
+        """
+        value = tr._signature_value
+        if value is not None:
+            return value
+        return tr._signature
+
+    @staticmethod
+    def _matches(leaf_tr: Transaction, key) -> bool:
+        """
+        :complexity: Best case O(1) when both signatures have the same form.
+        Worst case O(L) when one is an integer and the other a string, since the integer
+        one is rendered to compare them.
+        """
+        leaf_key = ProcessingBook._key(leaf_tr)
+        if type(leaf_key) is type(key):
+            return leaf_key == key
+        if type(key) is int:
+            return leaf_key == Transaction._encode(key, Transaction._triples())
+        return leaf_tr.signature == key
+
     @staticmethod
     def _leaf(tr: Transaction, amount):
         pair = ArrayR(2)
@@ -98,88 +555,375 @@ class ProcessingBook:
         pair[1] = amount
         return pair
     
-    def _insert(self, tr: Transaction, amount) -> bool:
+    @staticmethod
+    def _nested(level: int, path):
+        """
+        :complexity: Best = Worst = O(1).
+        A new nested book for `level` on the way to `path` (a page path, or an integer
+        key as _key_path returns).
         """
-        :complexity: Best case is O(1) when the destination page at the current level
-        is empty and we place a leaf.
+        return ProcessingBook(level)
 
-        Worst case is O(D), where D is the number of signature characters required to
-        separate colliding keys (D is less or equal to L). We create/delegate through 
-        at most D nested books, performing only O(1) work per level.
+    def _bulk_path(self, item):
         """
-        sig = tr.signature
-        idx = self.page_index(sig[self._level])
-        slot = self.pages[idx]
+        :complexity: Best = Worst = O(L), to decode the signature's page path.
+        The page path of a (transaction, amount) pair, the order bulk_load sorts by.
+        """
+        key = ProcessingBook._key(item[0])
+        if key is None:
+            raise KeyError("Unsigned transaction")
+        return self.page_indices(key)
 
-        if slot is None:
-            self.pages[idx] = ProcessingBook._leaf(tr, amount)
-            self._size += 1
-            return True
+    @classmethod
+    def bulk_load(cls, items, presorted: bool = False, sort: bool = False):
+        """
+        Builds a new book from an iterable of (transaction, amount) pairs.
 
-        if isinstance(slot, ProcessingBook):
-            added = slot._insert_at_next(tr, amount)
-            if added:
-                self._size += 1  
-            return added
+        With presorted True (the pairs are already in page order, a..z then 0..9) or
+        sort True (they are first ordered with a stable radix sort), the trie is
+        assembled bottom-up in a single pass: each nested book is created once, when its
+        first two entries are seen, and is linked into its parent once it is complete.
+        No leaf is ever pushed down into a new book as item-by-item insertion does on
+        collisions, and no insert descends from the root.
 
-        leaf_tr, leaf_amt = slot[0], slot[1]
-        if leaf_tr.signature == sig:
-            if leaf_amt != amount:
-                self._errors += 1
-            return False
+        Otherwise the pairs are simply inserted one by one. That is the default because
+        the pure-Python radix sort costs far more than the descents the build saves: for
+        2M pairs in arrival order, sorting and building took about three times as long
+        as inserting them (see benchmarks/bench_book_bulk.py). The build pays off for
+        input that already arrives in page order, most of all for deep plain books.
+
+        The result, including get_error_count(), is the same as inserting the pairs one by
+        one in the given order: the first amount given for a signature is kept and every
+        later, different amount counts as an error.
+
+        Raises ValueError if presorted is True but the pairs are not in page order, and
+        KeyError for unsigned transactions.
+
+        :complexity: Best case is O(N * L) for N pairs with signatures of length L, to
+        decode every presorted signature and compare each with the previous one, or to
+        insert them one by one (O(D) <= O(L) each).
+
+        Worst case is O(N * L) as well: with sort, the sort is O(N * K), where K <= L is
+        the length of the longest shared prefix, and the build does O(1) work per entry
+        plus O(1) per nested book created.
+        """
+        book = cls()
+        if not presorted and not sort:
+            for tr, amount in items:
+                if ProcessingBook._key(tr) is None:
+                    raise KeyError("Unsigned transaction")
+                book[tr] = amount
+            return book
+        if not presorted:
+            ordered = ArrayR.from_list(tuple(items))
+            radix_sort(ordered, key=book._bulk_path,
+                       radix=len(ProcessingBook.LEGAL_CHARACTERS))
+            items = ordered
+
+        # Books still accepting children, deepest (`top`) on the stack's top. `child` is
+        # the subtree (leaf or finished book) holding the previous entry, which is not
+        # linked into its parent until the next entry shows how deep that parent is.
+        stack = LinkedStack()
+        stack.push(book)
+        top = book
+        child = None
+        child_size = 0
+        prev_path = b""
+        for tr, amount in items:
+            key = ProcessingBook._key(tr)
+            if key is None:
+                raise KeyError("Unsigned transaction")
+            path = book.page_indices(key)
+            if child is not None:
+                if path == prev_path:
+                    if child[1] != amount:
+                        book._errors += 1
+                    continue
+                if presorted and path < prev_path:
+                    raise ValueError("bulk_load input is not sorted by signature")
+                level = 0
+                stop = min(len(path), len(prev_path))
+                while level < stop and path[level] == prev_path[level]:
+                    level += 1
+                if top._level == level:
+                    top._set_page(prev_path[level], child)
+                    top._size += child_size
+                else:
+                    top = cls._bulk_link(stack, top, child, child_size, prev_path, path, level)
+            child = ProcessingBook._leaf(tr, amount)
+            child_size = 1
+            prev_path = path
+
+        if child is not None:
+            cls._bulk_link(stack, top, child, child_size, prev_path, prev_path, 0)
+        return book
+
+    @classmethod
+    def _bulk_link(cls, stack, top, child, child_size, child_path, path, level):
+        """
+        :complexity: O(B) for the B books closed or opened.
+        Links `child` (the subtree on the way to child_path) into its parent, given that
+        the next entry, on the way to path, shares its first `level` pages. Every book on
+        the stack deeper than `level` is complete: it takes the child and becomes the
+        child itself. If the remaining top is shallower than `level`, the books down to
+        that level are opened first. Returns the new top of the stack.
+        """
+        while top._level > level:
+            top._set_page(child_path[top._level], child)
+            top._size += child_size
+            child = stack.pop()
+            child_size = child._size
+            top = stack.peek()
+        if top._level < level:
+            nested_level = level if cls._PATH_COMPRESSION else top._level + 1
+            while nested_level <= level:
+                top = cls._nested(nested_level, path)
+                stack.push(top)
+                nested_level += 1
+        top._set_page(child_path[top._level], child)
+        top._size += child_size
+        return top
+
+    def snapshot(self):
+        """
+        Returns a read-only copy of the book as it is now, which later writes to this
+        book do not change. Reads, iteration and queries work on it as on any book;
+        writes raise TypeError.
+
+        :complexity: Best case is O(1) and worst case is O(1).
+        The snapshot shares every nested book and page with this book. Instead, this
+        book gets a new write token, and from then on a write copies each nested book
+        (with its pages) on its path the first time it goes through one still owned by
+        an older token. So the extra memory is one copy of each book on the modified
+        paths, and a snapshot never sees a write.
+        """
+        snap = copy.copy(self)
+        snap._read_only = True
+        if not self._read_only:
+            self._token = object()
+        return snap
+
+    @staticmethod
+    def _copy_pages(pages):
+        """
+        :complexity: O(1) for sparse pages (they share their immutable item tuple),
+        O(36) for a full ArrayR.
+        """
+        if type(pages) is SparseArrayR:
+            return pages.copy()
+        dense = ArrayR(len(pages))
+        i = 0
+        while i < len(pages):
+            dense[i] = pages[i]
+            i += 1
+        return dense
 
-        child = ProcessingBook(self._level + 1)
-        child._insert_at_next(leaf_tr, leaf_amt)
-        child._insert_at_next(tr, amount)
+    def _own_pages(self):
+        """
+        :complexity: Best case is O(1) when the pages already belong to the current token.
+        Worst case is O(36), to copy them. Called on the book a write starts from.
+        """
+        if self._owner is not self._token:
+            self.pages = ProcessingBook._copy_pages(self.pages)
+            self._owner = self._token
+
+    def _copy_child(self, idx, token):
+        """
+        :complexity: Best = Worst = O(36) at most, to copy the child's pages.
+        Replaces the nested book in page idx, which a snapshot may still share, by a copy
+        owned by token, and returns the copy. This book must already be owned by token.
+        """
+        child = copy.copy(self.pages[idx])
+        child.pages = ProcessingBook._copy_pages(child.pages)
+        child._owner = token
         self.pages[idx] = child
-        self._size += 1
-        return True
-    
-    def _insert_at_next(self, tr: Transaction, amount) -> bool:
-        return self._insert(tr, amount)
+        return child
+
+    def _write_path(self, path, level, delta):
+        """
+        :complexity: Best case is O(1) when `level` is this book's level.
+        Worst case is O(D * 36) for the D books down to `level` when they are all still
+        shared with a snapshot and must be copied, O(D) otherwise.
+
+        Walks from this book along path (from _key_path) down to the book at `level`,
+        adding delta to the
+        size of every book on the way (both ends included, this one through _resize),
+        and returns that book. Books still shared with a snapshot are copied on the way,
+        so everything returned or passed may be written to.
+        """
+        self._own_pages()
+        self._resize(delta)
+        token = self._token
+        book = self
+        while book._level != level:
+            idx = ProcessingBook._page_at(path, book._level)
+            child = book.pages[idx]
+            if child._owner is not token:
+                child = book._copy_child(idx, token)
+            child._size += delta
+            book = child
+        return book
+
+    def _resize(self, delta):
+        """
+        :complexity: Best = Worst = O(1).
+        Adds delta to the size of the book a write was made on. Nested books' sizes are
+        updated directly; this is the one counter every write shares.
+        """
+        self._size += delta
+
+    def _count_error(self):
+        """
+        :complexity: Best = Worst = O(1).
+        Counts an update that gave a stored transaction a different amount.
+        """
+        self._errors += 1
+
+    def _new_nested(self, level: int, path):
+        """
+        :complexity: Best = Worst = O(1), plus what _nested() costs.
+        A new nested book for a write made on this book, owned by its current token.
+        """
+        book = self._nested(level, path)
+        if self._token is not None:
+            book._owner = self._token
+        return book
+
+    def _insert(self, tr: Transaction, amount) -> bool:
+        """
+        :complexity: Best case is O(1) when the key is an integer and the destination
+        page at the current level is empty, so we place a leaf.
 
-    def _get(self, sig: str):
+        Worst case is O(D), where D is the number of signature characters required to
+        separate colliding keys (D is less or equal to L). We walk down at most D nested
+        books in a loop (no recursion), then walk the same path once more to bump the
+        subtree sizes, so the work per level stays O(1). An integer key's pages are
+        computed one level at a time, only as deep as the walk goes; a string key is
+        first translated into its pages by one O(L) bytes.translate call (see _key_path).
 
-        idx = self.page_index(sig[self._level])
-        slot = self.pages[idx]
+        Errors (same signature, different amount) are counted on the book the insert was
+        made on, so get_error_count() sees them however deep the collision is.
+        """
+        key = ProcessingBook._key(tr)
+        path = self._key_path(key)
+        book = self
+        while True:
+            idx = ProcessingBook._page_at(path, book._level)
+            slot = book.pages[idx]
+            if not isinstance(slot, ProcessingBook):
+                break
+            book = slot
+
+        if slot is not None and ProcessingBook._matches(slot[0], key):
+            if slot[1] != amount:
+                self._count_error()
+            return False
+
+        book = self._write_path(path, book._level, 1)
         if slot is None:
-            raise KeyError(sig)
-        if isinstance(slot, ProcessingBook):
-            return slot._get(sig)
-        if slot[0].signature == sig:
+            book._set_page(idx, ProcessingBook._leaf(tr, amount))
+            return True
+
+        # Collision with a different leaf: push both down until their pages differ.
+        leaf_path = self._key_path(ProcessingBook._key(slot[0]))
+        parent = book
+        level = book._level + 1
+        while True:
+            child = self._new_nested(level, path)
+            child._size = 2
+            parent._set_page(idx, child)
+            old_idx = ProcessingBook._page_at(leaf_path, level)
+            new_idx = ProcessingBook._page_at(path, level)
+            if old_idx != new_idx:
+                child._set_page(old_idx, slot)
+                child._set_page(new_idx, ProcessingBook._leaf(tr, amount))
+                return True
+            parent = child
+            idx = old_idx
+            level += 1
+
+    def _get(self, key):
+        """
+        :complexity: Best case is O(1) when the key is an integer and the leaf sits in
+        this book's page.
+        Worst case is O(D), one loop iteration per nested book down to the leaf, for an
+        integer key. A string key adds one O(L) bytes.translate call (see _key_path).
+        """
+        path = self._key_path(key)
+        book = self
+        while True:
+            slot = book.pages[ProcessingBook._page_at(path, book._level)]
+            if slot is None:
+                raise KeyError(key)
+            if not isinstance(slot, ProcessingBook):
+                break
+            book = slot
+        if ProcessingBook._matches(slot[0], key):
             return slot[1]
-        raise KeyError(sig)
+        raise KeyError(key)
     
-    def _delete(self, sig: str) -> bool:
+    def _delete(self, key) -> bool:
         """
-       :complexity: Best case is O(1) when the target is a leaf in the current page.
+        :complexity: Best case is O(1) when the key is an integer and the target is a
+        leaf in the current page.
 
         Worst case is O(D), where D is less or equal to L is the depth to that leaf. 
-        We descend to the leaf and then possibly collapse an empty or singleton child 
-        on the way back up, doing at most one O(1) check per level.
+        A first loop checks the leaf is there; a second walks the same path decrementing
+        subtree sizes and remembers the highest nested book left with at most one entry.
+        That book is collapsed once (to nothing, or to its single remaining leaf), which
+        gives the same structure as collapsing level by level on the way back up. A
+        string key adds one O(L) bytes.translate call (see _key_path).
         """
-        idx = self.page_index(sig[self._level])
-        slot = self.pages[idx]
-        if slot is None:
-            return False 
-
-        if isinstance(slot, ProcessingBook):
-            removed = slot._delete(sig)
-            if not removed:
+        path = self._key_path(key)
+        book = self
+        while True:
+            slot = book.pages[ProcessingBook._page_at(path, book._level)]
+            if slot is None:
                 return False
-            self._size -= 1
-            if len(slot) == 0:
-                self.pages[idx] = None
-            elif len(slot) == 1:
-                lone_tr, lone_amt = slot._extract_single_leaf()
-                self.pages[idx] = ProcessingBook._leaf(lone_tr, lone_amt)
-            return True
-
-        if slot[0].signature != sig:
+            if not isinstance(slot, ProcessingBook):
+                break
+            book = slot
+        if not ProcessingBook._matches(slot[0], key):
             return False
-        self.pages[idx] = None
-        self._size -= 1
+
+        collapse_parent = None
+        collapse_idx = 0
+        self._own_pages()
+        self._resize(-1)
+        token = self._token
+        walk = self
+        while True:
+            idx = ProcessingBook._page_at(path, walk._level)
+            child = walk.pages[idx]
+            if not isinstance(child, ProcessingBook):
+                walk.pages[idx] = None
+                break
+            if collapse_parent is None and child._size - 1 <= 1:
+                collapse_parent = walk
+                collapse_idx = idx
+            if child._owner is not token:
+                child = walk._copy_child(idx, token)
+            child._size -= 1
+            walk = child
+
+        if collapse_parent is not None:
+            collapse_parent._collapse_child(collapse_idx, collapse_parent.pages[collapse_idx])
         return True
+
+    def _collapse_child(self, idx, child):
+        """
+        :complexity: Best case is O(1) when child keeps at least two entries.
+        Worst case is O(H * 36) to find the single entry left, as _extract_single_leaf.
+
+        Keeps the structure minimal after deletes under the nested book child (in page
+        idx of this book): a book left empty is removed, and one left with a single entry
+        is replaced by that entry's leaf.
+        """
+        if child._size == 0:
+            self.pages[idx] = None
+        elif child._size == 1:
+            lone_tr, lone_amt = child._extract_single_leaf()
+            self.pages[idx] = ProcessingBook._leaf(lone_tr, lone_amt)
     
     def _extract_single_leaf(self):
         """
@@ -188,16 +932,19 @@ class ProcessingBook:
 
         Worst case is O(H), where H is the current nesting height (H is less or equal to L). 
         We scan up to 36 fixed pages per level to find the unique non-empty slot, 
-        then recurse once.
+        then move down one level.
         """
+        book = self
         i = 0
-        while i < len(self.pages):
-            slot = self.pages[i]
+        while i < len(book.pages):
+            slot = book.pages[i]
             if slot is None:
                 i += 1
                 continue
             if isinstance(slot, ProcessingBook):
-                return slot._extract_single_leaf()
+                book = slot
+                i = 0
+                continue
             return slot[0], slot[1]
         raise KeyError("Empty subtree during extract")
     
@@ -208,49 +955,934 @@ class ProcessingBook:
         Traversal cost is paid lazily by successive next() calls. Items are yielded in
         page order (a..z then 0..9), depth-first across nested books.
         """
-        stack = LinkedStack()
-        frame = ArrayR(2)
-        frame[0] = self
-        frame[1] = -1
-        stack.push(frame)
+        return _BookIterator(self)
 
-        class _Iterator:
-            def __init__(self, st):
-                self._stack = st
+    def iter_prefix(self, prefix):
+        """
+        Iterates lazily, in page order, over the (transaction, amount) pairs whose
+        signature starts with prefix. Raises ValueError for illegal characters.
+
+        :complexity: Best case is O(P) to create the iterator, for a prefix of length P,
+        when the prefix leads to an empty page.
 
-            def __iter__(self):
-                return self
+        Worst case is O(P) to create it as well: it descends straight to the prefix's
+        page, one level per character. Then each next() is O(L) to check the entry
+        against the end of the prefix's range, plus the scan of at most 36 pages per
+        nested book visited; only books holding matching entries are entered, apart from
+        the one entry found after the range, which ends the iteration.
+        """
+        lo = self.page_indices(prefix)
+        # The first path after every path starting with lo: drop trailing last pages
+        # ("9"), then move the last remaining page on by one.
+        last = len(ProcessingBook.LEGAL_CHARACTERS) - 1
+        k = len(lo)
+        while k > 0 and lo[k - 1] == last:
+            k -= 1
+        hi = None
+        if k > 0:
+            hi = lo[:k - 1] + bytes((lo[k - 1] + 1,))
+        return _BookIterator(self, lo, hi)
 
-            def __next__(self):
-                while len(self._stack) > 0:
-                    fr = self._stack.pop()
-                    b = fr[0]      
-                    p = fr[1] + 1 
+    def iter_range(self, lo=None, hi=None):
+        """
+        Iterates lazily, in page order, over the (transaction, amount) pairs with
+        lo <= signature < hi, comparing signatures page by page (a..z then 0..9, so
+        "z" < "0"). lo and hi may be signatures or prefixes of one (a prefix sorts
+        before every signature that extends it), or None to leave that end open.
+        Raises ValueError for illegal characters.
 
-                    while p < len(b.pages) and b.pages[p] is None:
-                        p += 1
+        :complexity: Best case is O(P) to create the iterator, where P <= L is the
+        length of lo, since it descends straight along lo's pages.
 
-                    if p >= len(b.pages):
-                        continue
+        Worst case is O(P) to create it as well. Each next() is then O(L) to compare the
+        entry with hi, plus the scan of at most 36 pages per nested book visited, so the
+        whole iteration costs O(P + K * L) for K results, up to the books on the way.
+        """
+        if lo is not None:
+            lo = self.page_indices(lo)
+        if hi is not None:
+            hi = self.page_indices(hi)
+        return _BookIterator(self, lo, hi)
+
+    def rank(self, tr: Transaction) -> int:
+        """
+        Returns how many stored entries sort before tr's signature in page order. tr
+        does not need to be stored; if it is, its own position is rank(tr).
+
+        :complexity: Best case is O(36) when tr's page in this book is empty or a leaf.
+
+        Worst case is O(D * 36) for the D books on tr's path: the subtree sizes of the
+        pages before tr's page are added up in each of them.
+        """
+        key = ProcessingBook._key(tr)
+        if key is None:
+            raise KeyError("Unsigned transaction")
+        path = self.page_indices(key)
+        count = 0
+        book = self
+        # A shorter signature sorts before every signature that extends it.
+        while book._level < len(path):
+            level = book._level
+            page = path[level]
+            p = 0
+            while p < page:
+                slot = book.pages[p]
+                if isinstance(slot, ProcessingBook):
+                    count += slot._size
+                elif slot is not None:
+                    count += 1
+                p += 1
+            slot = book.pages[page]
+            if slot is None:
+                return count
+            if not isinstance(slot, ProcessingBook):
+                if self.page_indices(ProcessingBook._key(slot[0])) < path:
+                    count += 1
+                return count
+            if slot._level > level + 1:
+                # A compressed book: everything in it is before or after tr if the
+                # levels it skipped differ from tr's.
+                skipped = slot._prefix[level + 1:slot._level]
+                target = path[level + 1:slot._level]
+                if skipped < target:
+                    return count + slot._size
+                if skipped > target:
+                    return count
+            book = slot
+        return count
+
+    def select(self, k: int):
+        """
+        Returns the (transaction, amount) pair at position k in page order (0 is the
+        first; negative k counts from the end). Raises IndexError if k is out of range.
+
+        :complexity: Best case is O(36) when the entry is a leaf in this book.
+        Worst case is O(D * 36): in each of the D books on the way, pages are skipped
+        by their subtree sizes until the one holding position k.
+        """
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("select index out of range")
+        return next(_BookIterator(self, start=k))
+
+    def slice(self, i: int, j: int = None):
+        """
+        Iterates lazily, in page order, over the entries at positions i to j - 1, with
+        the same index rules as slicing a sequence (negative positions count from the
+        end, out-of-range ones are clamped, j = None runs to the end).
+
+        :complexity: Best case is O(1) to create the iterator, when the slice is empty.
+        Worst case is O(D * 36) to create it, to find position i as select() does.
+        Each next() is then O(D * 36) at worst, and O(1) amortised over the slice.
+        """
+        start, stop, _ = slice(i, j).indices(len(self))
+        if start >= stop:
+            return _BookIterator(self, limit=0)
+        return _BookIterator(self, start=start, limit=stop - start)
 
-                    fr2 = ArrayR(2)
-                    fr2[0] = b
-                    fr2[1] = p
-                    self._stack.push(fr2)
+    def save(self, path):
+        """
+        Writes the book to the file at path, in the fixed-size record format that
+        MappedProcessingBook opens. Timestamps must be 64-bit integers and amounts
+        64-bit integers or floats; raises TypeError for other amounts.
 
-                    slot = b.pages[p]
+        :complexity: Best case is O(N * L) and worst case is O(N * L + B * 36), for N
+        entries with signatures of length L and B nested books. The book is walked once
+        in page order (each book written after its pages), with one 296-byte buffer per
+        book on the current path, so the file is streamed rather than built in memory.
+        """
+        pages = len(ProcessingBook.LEGAL_CHARACTERS)
+        with open(path, "wb") as out:
+            out.write(_FILE_HEADER.pack(_FILE_MAGIC, _FILE_VERSION, 0, 0, 0, 0))
+            offset = _FILE_HEADER.size
+            stack = LinkedStack()
+            stack.push(ProcessingBook._save_frame(self))
+            while True:
+                frame = stack.peek()
+                book = frame[0]
+                p = frame[1]
+                while p < pages and book.pages[p] is None:
+                    p += 1
+                if p < pages:
+                    frame[1] = p + 1
+                    slot = book.pages[p]
                     if isinstance(slot, ProcessingBook):
-                        child = ArrayR(2)
-                        child[0] = slot
-                        child[1] = -1
-                        self._stack.push(child)
+                        stack.push(ProcessingBook._save_frame(slot))
                         continue
+                    record = ProcessingBook._leaf_record(slot)
+                    _SLOT.pack_into(frame[2], _BOOK_HEAD.size + _SLOT.size * p, offset << 1 | 1)
+                    out.write(record)
+                    offset += len(record)
+                    continue
+
+                record = frame[2]
+                _BOOK_HEAD.pack_into(record, 0, book._level, book._size)
+                out.write(record)
+                stack.pop()
+                if len(stack) == 0:
+                    break
+                parent = stack.peek()
+                _SLOT.pack_into(parent[2], _BOOK_HEAD.size + _SLOT.size * (parent[1] - 1), offset << 1)
+                offset += len(record)
 
-                    return (slot[0], slot[1])
+            out.seek(0)
+            out.write(_FILE_HEADER.pack(
+                _FILE_MAGIC, _FILE_VERSION, 0, offset, self._size, self._errors))
 
-                raise StopIteration
+    @staticmethod
+    def _save_frame(book):
+        """ A save() stack frame: the book, its next page, and its record being filled. """
+        frame = ArrayR(3)
+        frame[0] = book
+        frame[1] = 0
+        frame[2] = bytearray(_BOOK_RECORD.size)
+        return frame
+
+    @staticmethod
+    def _leaf_record(leaf):
+        """
+        :complexity: Best = Worst = O(L + U) for a signature of length L and user names
+        of total length U.
+        """
+        tr, amount = leaf[0], leaf[1]
+        if type(amount) is float:
+            kind, packed = 1, _FLOAT_AMOUNT.pack(amount)
+        elif isinstance(amount, int):
+            kind, packed = 0, _INT_AMOUNT.pack(amount)
+        else:
+            raise TypeError(f"cannot save an amount of type {type(amount).__name__}")
+        signature = tr.signature.encode("ascii")
+        from_user = tr.from_user.encode("utf-8")
+        to_user = tr.to_user.encode("utf-8")
+        head = _LEAF_HEAD.pack(tr.timestamp, kind, len(signature), len(from_user), len(to_user))
+        return b"".join((head, packed, signature, from_user, to_user))
+
+class CompressedProcessingBook(ProcessingBook):
+    """
+    A path-compressed (radix) ProcessingBook. Where the plain book would create a chain
+    of nested books with one non-empty page each, this keeps a single nested book at the
+    level where entries actually branch, and records the pages it skipped in _prefix.
+
+    Every nested book therefore has at least two non-empty pages. Lookups, ordered
+    iteration and the pages view behave exactly as in ProcessingBook, since a book's
+    skipped levels are the same for everything under it.
+    """
+    _PATH_COMPRESSION = True
+
+    def __init__(self, level: int = 0, prefix: bytes = b""):
+        """
+        :complexity: Best case is O(1) and worst case is O(1), as ProcessingBook.
+        prefix holds the page indices of levels 0..level-1 shared by this book's entries.
+        """
+        super().__init__(level)
+        self._prefix = prefix
+
+    @staticmethod
+    def _nested(level: int, path):
+        """
+        :complexity: Best = Worst = O(level), to copy (or, for an integer key, decode) the
+        skipped prefix.
+        """
+        return CompressedProcessingBook(level, ProcessingBook._page_range(path, 0, level))
+
+    def _insert(self, tr: Transaction, amount) -> bool:
+        """
+        :complexity: Best case is O(1) when the key is an integer and the destination
+        page at this level is empty; a string key is first translated in O(L).
+
+        Worst case is O(L), to walk down (only through branching books), to decode and
+        compare the levels a nested book skipped, and to walk the path again to bump
+        sizes. A collision decodes the rest of both keys to find where they split, and a
+        new branching book is created only there.
+        """
+        key = ProcessingBook._key(tr)
+        path = self._key_path(key)
+        book = self
+        while True:
+            idx = ProcessingBook._page_at(path, book._level)
+            slot = book.pages[idx]
+            if not isinstance(slot, ProcessingBook):
+                break
+            lo = book._level + 1
+            hi = slot._level
+            skipped = ProcessingBook._page_range(path, lo, hi)
+            if skipped != slot._prefix[lo:hi]:
+                # The new key leaves this book's skipped prefix: branch above it.
+                split = lo
+                while skipped[split - lo] == slot._prefix[split]:
+                    split += 1
+                branch = self._new_nested(split, slot._prefix)
+                branch._set_page(slot._prefix[split], slot)
+                branch._set_page(skipped[split - lo], ProcessingBook._leaf(tr, amount))
+                branch._size = slot._size + 1
+                book = self._write_path(path, book._level, 1)
+                book.pages[idx] = branch
+                return True
+            book = slot
+
+        if slot is not None and ProcessingBook._matches(slot[0], key):
+            if slot[1] != amount:
+                self._count_error()
+            return False
+
+        book = self._write_path(path, book._level, 1)
+        if slot is None:
+            book._set_page(idx, ProcessingBook._leaf(tr, amount))
+        else:
+            leaf_path = self._key_path(ProcessingBook._key(slot[0]))
+            lo = book._level + 1
+            stop = Transaction._SIG_LEN if type(path) is int else len(path)
+            rest = ProcessingBook._page_range(path, lo, stop)
+            leaf_rest = ProcessingBook._page_range(leaf_path, lo, stop)
+            split = lo
+            while split < stop and rest[split - lo] == leaf_rest[split - lo]:
+                split += 1
+            branch = self._new_nested(split, path)
+            branch._set_page(leaf_rest[split - lo], slot)
+            branch._set_page(rest[split - lo], ProcessingBook._leaf(tr, amount))
+            branch._size = 2
+            book.pages[idx] = branch
+        return True
+
+    def _delete(self, key) -> bool:
+        """
+        :complexity: Best case is O(1) when the key is an integer and the target is a
+        leaf in this book's page; a string key is first translated in O(L).
+
+        Worst case is O(D) to find the leaf and walk the path again decrementing sizes,
+        plus one O(36) scan of the book that held the leaf. If that book is left with a
+        single non-empty page, it is replaced by that page's content (a leaf, or a
+        nested book that keeps its own level and prefix), which re-compresses the path.
+        """
+        path = self._key_path(key)
+        parent = None
+        book = self
+        while True:
+            slot = book.pages[ProcessingBook._page_at(path, book._level)]
+            if slot is None:
+                return False
+            if not isinstance(slot, ProcessingBook):
+                break
+            parent = book
+            book = slot
+        if not ProcessingBook._matches(slot[0], key):
+            return False
+
+        if parent is None:
+            book = self._write_path(path, book._level, -1)
+        else:
+            parent = self._write_path(path, parent._level, -1)
+            idx = ProcessingBook._page_at(path, parent._level)
+            book = parent.pages[idx]
+            if book._owner is not self._token:
+                book = parent._copy_child(idx, self._token)
+            book._size -= 1
+        book.pages[ProcessingBook._page_at(path, book._level)] = None
+
+        if parent is not None:
+            parent._collapse_child(idx, book)
+        return True
+
+    def _collapse_child(self, idx, child):
+        """
+        :complexity: Best = Worst = O(36), to count child's non-empty pages.
+        A nested book left with fewer than two non-empty pages is replaced by the
+        content of its only page (a leaf, or a nested book that keeps its own level and
+        prefix), which re-compresses the path, or removed if it has none.
+        """
+        only = None
+        count = 0
+        i = 0
+        while i < len(child.pages) and count < 2:
+            if child.pages[i] is not None:
+                only = child.pages[i]
+                count += 1
+            i += 1
+        if count < 2:
+            self.pages[idx] = only
+
+
+class ConcurrentProcessingBook(ProcessingBook):
+    """
+    A ProcessingBook that can be read and written from several threads at once.
+
+    Locks are striped by root page: a write only changes the nested books under the
+    root page its signature starts with, so each of the 36 root pages has its own lock
+    and writes to different root pages never wait for each other. The stripe is read
+    off the key's first character (or leading base-36 digit), without decoding the rest.
+    The counters every write shares (len() and get_error_count()) are updated under one
+    more, short-lived lock. The root pages are always a full ArrayR, whose slots can be
+    replaced independently, rather than a SparseArrayR, which rebuilds its item tuple
+    on writes.
+
+    Lookups take their root page's lock too, since a write may be halfway through
+    splitting or collapsing that page. The locks are reentrant, as get_many() and
+    delete_many() hold all of them and may then look up or delete each transaction on
+    its own through _get and _delete.
+
+    The point queries rank() and select() briefly hold every lock and run on the live
+    book. Iteration, slice() and save() may take arbitrarily long, so they run on a
+    snapshot() instead, which sees one consistent state without blocking writes (the
+    next write to each path then copies it, see ProcessingBook.snapshot()).
+    """
+
+    def __init__(self):
+        """
+        :complexity: Best case is O(1) and worst case is O(1), for 36 pages and locks.
+        """
+        super().__init__()
+        pages = len(ProcessingBook.LEGAL_CHARACTERS)
+        self.pages = ArrayR(pages)
+        # A tuple rather than an ArrayR: _lock_all() walks all 36 locks, and tuple
+        # iteration avoids a Python-level __getitem__ call per lock.
+        self._locks = tuple(threading.RLock() for _ in range(pages))
+        self._counter_lock = threading.Lock()
+
+    def _stripe(self, key):
+        """
+        :complexity: Best = Worst = O(1).
+        The lock of the root page the key belongs to: the leading base-36 digit of an
+        integer key, or the page of a string key's first character.
+        """
+        if type(key) is int:
+            return self._locks[key // Transaction._POWERS[0]]
+        return self._locks[self.page_index(key[0])]
+
+    def _lock_all(self):
+        """
+        :complexity: Best = Worst = O(36).
+        Takes every root page's lock, always in page order so two callers cannot each
+        hold locks the other waits for.
+        """
+        for lock in self._locks:
+            lock.acquire()
+
+    def _unlock_all(self):
+        for lock in self._locks:
+            lock.release()
+
+    def _resize(self, delta):
+        """
+        :complexity: Best = Worst = O(1).
+        """
+        with self._counter_lock:
+            self._size += delta
+
+    def _count_error(self):
+        """
+        :complexity: Best = Worst = O(1).
+        """
+        with self._counter_lock:
+            self._errors += 1
+
+    def _insert(self, tr: Transaction, amount) -> bool:
+        """
+        :complexity: As ProcessingBook._insert, plus waiting for the root page's lock.
+        """
+        with self._stripe(ProcessingBook._key(tr)):
+            return super()._insert(tr, amount)
+
+    def _get(self, key):
+        """
+        :complexity: As ProcessingBook._get, plus waiting for the root page's lock.
+        """
+        with self._stripe(key):
+            return super()._get(key)
+
+    def _delete(self, key) -> bool:
+        """
+        :complexity: As ProcessingBook._delete, plus waiting for the root page's lock.
+        """
+        with self._stripe(key):
+            return super()._delete(key)
+
+    def get_many(self, transactions, default=None):
+        """
+        :complexity: As ProcessingBook.get_many, holding every root page's lock, so the
+        results come from one consistent state.
+        """
+        self._lock_all()
+        try:
+            return super().get_many(transactions, default)
+        finally:
+            self._unlock_all()
+
+    def delete_many(self, transactions) -> int:
+        """
+        :complexity: As ProcessingBook.delete_many, holding every root page's lock, so
+        the deletes are made as one.
+        """
+        self._lock_all()
+        try:
+            return super().delete_many(transactions)
+        finally:
+            self._unlock_all()
+
+    def rank(self, tr: Transaction) -> int:
+        """
+        :complexity: As ProcessingBook.rank, plus O(36) to take every root page's lock,
+        so the subtree sizes it adds up are not halfway through a write.
+        """
+        self._lock_all()
+        try:
+            return super().rank(tr)
+        finally:
+            self._unlock_all()
+
+    def select(self, k: int):
+        """
+        :complexity: As ProcessingBook.select, plus O(36) to take every root page's lock.
+        """
+        self._lock_all()
+        try:
+            return super().select(k)
+        finally:
+            self._unlock_all()
+
+    def snapshot(self):
+        """
+        Returns a read-only view of the book as it is now, as a plain ProcessingBook
+        (which needs no locks).
+
+        :complexity: Best case is O(1) and worst case is O(1).
+        It waits for every root page's lock, so no write is halfway done, and copies the
+        36 root pages before letting writes go on, so writes to different root pages
+        never copy them at the same time; after that writes copy the nested books they
+        change as in ProcessingBook.snapshot().
+        """
+        self._lock_all()
+        try:
+            snap = super().snapshot()
+            self._own_pages()
+        finally:
+            self._unlock_all()
+        snap.__class__ = ProcessingBook
+        del snap._locks
+        del snap._counter_lock
+        return snap
+
+    def __iter__(self):
+        """
+        :complexity: Best case is O(1) and worst case is O(1) to create the iterator,
+        as ProcessingBook.__iter__; it iterates over a snapshot().
+        """
+        return iter(self.snapshot())
+
+    def iter_prefix(self, prefix):
+        """
+        :complexity: As ProcessingBook.iter_prefix, on a snapshot().
+        """
+        return self.snapshot().iter_prefix(prefix)
+
+    def iter_range(self, lo=None, hi=None):
+        """
+        :complexity: As ProcessingBook.iter_range, on a snapshot().
+        """
+        return self.snapshot().iter_range(lo, hi)
+
+    def slice(self, i: int, j: int = None):
+        """
+        :complexity: As ProcessingBook.slice, on a snapshot().
+        """
+        return self.snapshot().slice(i, j)
+
+    def save(self, path):
+        """
+        :complexity: As ProcessingBook.save, on a snapshot().
+        """
+        self.snapshot().save(path)
+
+
+class MappedProcessingBook:
+    """
+    A read-only ProcessingBook opened from a file written by ProcessingBook.save().
+
+    The file is memory-mapped rather than read: opening it only checks the header, and
+    lookups and iteration decode the book and leaf records they visit straight from the
+    map, so the operating system pages in (and may drop again) just the parts in use.
+    Lookups, iteration and iter_prefix behave as on the saved book.
+    """
+    # Signatures are decoded to pages exactly as in ProcessingBook.
+    page_index = ProcessingBook.page_index
+    page_indices = ProcessingBook.page_indices
+
+    def __init__(self, path):
+        """
+        :complexity: Best case is O(1) and worst case is O(1), whatever the book's size:
+        the file is mapped, not read, and only its header is decoded.
+        Raises ValueError if the file is not a saved ProcessingBook.
+        """
+        with open(path, "rb") as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _FILE_HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path!r} is not a saved ProcessingBook")
+        magic, version, _, root, size, errors = _FILE_HEADER.unpack_from(self._map, 0)
+        if magic != _FILE_MAGIC or version != _FILE_VERSION:
+            self._map.close()
+            raise ValueError(f"{path!r} is not a saved ProcessingBook")
+        self._root = root
+        self._size = size
+        self._errors = errors
+
+    def close(self):
+        """ Unmaps the file; the book cannot be used afterwards. """
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_error_count(self):
+        """
+        :complexity: Best case is O(1) and worst case is O(1), read from the header.
+        """
+        return self._errors
+
+    def __len__(self):
+        """
+        :complexity: Best case is O(1) and worst case is O(1), read from the header.
+        """
+        return self._size
+
+    def __getitem__(self, tr: Transaction):
+        """
+        :complexity: Best case is O(L) when the leaf is in the root book's page.
+        Worst case is O(D + L): one slot is decoded per book on the way down, and the
+        leaf's signature is compared with the key.
+        Raises KeyError if the transaction is not stored.
+        """
+        signature = tr.signature
+        if signature is None:
+            raise KeyError("Unsigned transaction")
+        path = self.page_indices(signature)
+        view = self._map
+        offset = self._root
+        while True:
+            level = _BOOK_HEAD.unpack_from(view, offset)[0]
+            if level >= len(path):
+                raise KeyError(signature)
+            slot = _SLOT.unpack_from(view, offset + _BOOK_HEAD.size + _SLOT.size * path[level])[0]
+            if slot == 0:
+                raise KeyError(signature)
+            offset = slot >> 1
+            if slot & 1:
+                break
+        _, kind, length, _, _ = _LEAF_HEAD.unpack_from(view, offset)
+        start = offset + _LEAF_HEAD.size + _INT_AMOUNT.size
+        if view[start:start + length] != signature.encode("ascii"):
+            raise KeyError(signature)
+        return (_FLOAT_AMOUNT if kind else _INT_AMOUNT).unpack_from(view, offset + _LEAF_HEAD.size)[0]
+
+    def _leaf(self, offset):
+        """
+        :complexity: Best = Worst = O(L + U), to decode the leaf record at offset into a
+        (transaction, amount) pair.
+        """
+        view = self._map
+        timestamp, kind, signature_len, from_len, to_len = _LEAF_HEAD.unpack_from(view, offset)
+        offset += _LEAF_HEAD.size
+        amount = (_FLOAT_AMOUNT if kind else _INT_AMOUNT).unpack_from(view, offset)[0]
+        start = offset + _INT_AMOUNT.size
+        from_start = start + signature_len
+        to_start = from_start + from_len
+        tr = Transaction(timestamp, view[from_start:to_start].decode("utf-8"),
+                         view[to_start:to_start + to_len].decode("utf-8"))
+        tr.signature = view[start:from_start].decode("ascii")
+        return (tr, amount)
+
+    def __iter__(self):
+        """
+        :complexity: Best case is O(1) and worst case is O(1) to create the iterator.
+        Entries come in page order, as from the saved book.
+        """
+        return _MappedIterator(self, self._root << 1)
+
+    def iter_prefix(self, prefix):
+        """
+        Iterates lazily, in page order, over the (transaction, amount) pairs whose
+        signature starts with prefix. Raises ValueError for illegal characters.
+
+        :complexity: Best case is O(P) to create the iterator, for a prefix of length P.
+        Worst case is O(P) as well, descending one book per level; each next() then
+        costs as for full iteration, plus O(P) to check the entry is in the prefix.
+        """
+        path = self.page_indices(prefix)
+        view = self._map
+        slot = self._root << 1
+        while not slot & 1:
+            offset = slot >> 1
+            level = _BOOK_HEAD.unpack_from(view, offset)[0]
+            if level >= len(path):
+                break
+            slot = _SLOT.unpack_from(view, offset + _BOOK_HEAD.size + _SLOT.size * path[level])[0]
+            if slot == 0:
+                break
+        return _MappedIterator(self, slot, prefix)
+
+
+class _BookIterator:
+    """
+    Page-order iterator over a book's (transaction, amount) pairs, used by __iter__,
+    iter_prefix, iter_range, select and slice.
+
+    The cursor is the current book and the last page visited in it, plus two ArrayRs
+    holding the same for every book above it on the current path. They are allocated
+    once, one slot per level of a full signature, so stepping through pages and going
+    in and out of nested books allocates nothing; only a deeper trie (custom signatures
+    longer than Transaction._SIG_LEN) grows them. In sparse pages the next non-empty
+    page is read from the SparseArrayR bitmap instead of scanning.
+
+    With a lower bound lo (a page path), the iterator starts by descending along lo, so
+    books wholly before it are never entered; with an upper bound hi, it stops at the
+    first entry whose page path is not below hi. Alternatively it can start at position
+    `start` in page order, found from the subtree sizes, and stop after `limit` entries.
+    """
+
+    def __init__(self, book: ProcessingBook, lo=None, hi=None, start: int = 0, limit=None):
+        """
+        :complexity: Best case is O(L) without lo or start, to allocate the cursor for
+        signatures of length L.
+        Worst case is O(L + P) to descend along a lower bound of P pages, or
+        O(L + D * 36) to find position start.
+        """
+        self._book = book
+        self._books = ArrayR(Transaction._SIG_LEN + 1)
+        self._pages = ArrayR(Transaction._SIG_LEN + 1)
+        # Number of books saved above the current one.
+        self._depth = 0
+        # The book being scanned (None once the iteration is over) and its last page.
+        self._current = None
+        self._page = -1
+        self._hi = hi
+        self._remaining = limit
+        # A leaf found while descending along lo, returned before the cursor moves on.
+        self._first = None
+        if lo is not None:
+            self._seek(book, lo)
+        elif start > 0:
+            self._seek_position(book, start)
+        else:
+            self._push(book, -1)
+
+    def _push(self, book, page):
+        """
+        :complexity: O(1), amortised when the cursor has to grow.
+        Makes book (with `page` its last visited page) the current book.
+        """
+        if self._current is not None:
+            depth = self._depth
+            if depth == len(self._books):
+                self._grow()
+            self._books[depth] = self._current
+            self._pages[depth] = self._page
+            self._depth = depth + 1
+        self._current = book
+        self._page = page
+
+    def _pop(self):
+        """
+        :complexity: O(1).
+        Goes back to the book above the current one.
+        """
+        if self._depth == 0:
+            self._current = None
+            return
+        self._depth -= 1
+        self._current = self._books[self._depth]
+        self._page = self._pages[self._depth]
+
+    def _grow(self):
+        """
+        :complexity: O(D) for a cursor of depth D, doubling it.
+        """
+        books = ArrayR(2 * len(self._books))
+        pages = ArrayR(2 * len(self._pages))
+        i = 0
+        while i < self._depth:
+            books[i] = self._books[i]
+            pages[i] = self._pages[i]
+            i += 1
+        self._books = books
+        self._pages = pages
+
+    def _seek(self, book, lo):
+        """
+        :complexity: O(P) for a lower bound of P pages, one book per level.
+        Leaves the cursor so that iteration resumes at the first entry >= lo.
+        """
+        while book._level < len(lo):
+            level = book._level
+            page = lo[level]
+            # Everything under the pages after `page` is > lo: resume there afterwards.
+            self._push(book, page)
+            slot = book.pages[page]
+            if slot is None:
+                return
+            if not isinstance(slot, ProcessingBook):
+                if book.page_indices(ProcessingBook._key(slot[0])) >= lo:
+                    self._first = slot
+                return
+            if slot._level > level + 1:
+                # A compressed book skips the levels between this one and its own.
+                skipped = slot._prefix[level + 1:slot._level]
+                target = lo[level + 1:slot._level]
+                if skipped < target:
+                    return
+                if skipped > target:
+                    self._push(slot, -1)
+                    return
+            book = slot
+        # lo is a prefix of every path in this book, so they all come after it.
+        self._push(book, -1)
+
+    def _seek_position(self, book, start):
+        """
+        :complexity: O(D * 36) for the D books down to the entry at position start,
+        which must be below len(book).
+        """
+        while True:
+            p = 0
+            while True:
+                slot = book.pages[p]
+                if slot is not None:
+                    size = slot._size if isinstance(slot, ProcessingBook) else 1
+                    if start < size:
+                        break
+                    start -= size
+                p += 1
+            self._push(book, p)
+            if not isinstance(slot, ProcessingBook):
+                self._first = slot
+                return
+            book = slot
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        :complexity: Best case is O(1) when the next entry is in the page after the
+        current one (and there is no upper bound).
+        Worst case is O(D * 36 + L): up to 36 pages are scanned in each of the D books
+        left or entered on the way to the next entry (only the full ArrayR ones; sparse
+        pages find their next page in O(1)), and O(L) to compare it with hi.
+        """
+        slot = self._first
+        if slot is not None:
+            self._first = None
+            return self._emit(slot)
+
+        book = self._current
+        while book is not None:
+            pages = book.pages
+            count = len(pages)
+            p = self._page + 1
+            if type(pages) is SparseArrayR:
+                p = pages.next_set(p)
+            else:
+                while p < count and pages[p] is None:
+                    p += 1
+            if p >= count:
+                self._pop()
+                book = self._current
+                continue
+
+            self._page = p
+            slot = pages[p]
+            if isinstance(slot, ProcessingBook):
+                self._push(slot, -1)
+                book = slot
+                continue
+
+            return self._emit(slot)
+
+        raise StopIteration
+
+    def _stop(self):
+        self._current = None
+        self._depth = 0
+        raise StopIteration
+
+    def _emit(self, slot):
+        tr = slot[0]
+        if self._remaining is not None:
+            if self._remaining == 0:
+                self._stop()
+            self._remaining -= 1
+        if self._hi is not None:
+            if self._book.page_indices(ProcessingBook._key(tr)) >= self._hi:
+                self._stop()
+        return (tr, slot[1])
+
+
+class _MappedIterator:
+    """
+    Page-order iterator over the entries under one slot of a MappedProcessingBook.
+
+    The stack holds one frame per book record on the current path: an ArrayR of the
+    record's decoded slots and the next one to visit. With a prefix, every entry under
+    the slot shares the levels walked to reach it, but a compressed book may skip
+    levels: they hold the same pages for all its entries, so either every entry
+    matches the prefix or none does, and iteration stops at the first that does not.
+    """
+
+    def __init__(self, book: MappedProcessingBook, slot: int, prefix=None):
+        """
+        :complexity: Best case is O(1) and worst case is O(1).
+        """
+        self._book = book
+        self._stack = LinkedStack()
+        self._prefix = prefix
+        # A lone leaf to return before anything on the stack.
+        self._first = 0
+        if slot & 1:
+            self._first = slot
+        elif slot != 0:
+            self._push(slot >> 1)
+
+    def _push(self, offset):
+        frame = ArrayR(2)
+        frame[0] = _BOOK_RECORD.unpack_from(self._book._map, offset)
+        frame[1] = 2
+        self._stack.push(frame)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        :complexity: Best case is O(L + U) to decode a leaf in the next slot of the
+        current book. Worst case is O(D * 36 + L + U): up to 36 slots are checked in
+        each of the D books left or entered on the way to the next leaf.
+        """
+        slot = self._first
+        self._first = 0
+        while slot == 0 and len(self._stack) > 0:
+            frame = self._stack.peek()
+            slots = frame[0]
+            i = frame[1]
+            while i < len(slots) and slots[i] == 0:
+                i += 1
+            if i == len(slots):
+                self._stack.pop()
+                continue
+            frame[1] = i + 1
+            slot = slots[i]
+            if not slot & 1:
+                self._push(slot >> 1)
+                slot = 0
+        if slot == 0:
+            raise StopIteration
+        entry = self._book._leaf(slot >> 1)
+        if self._prefix is not None and not entry[0].signature.startswith(self._prefix):
+            self._stack.clear()
+            raise StopIteration
+        return entry
 
-        return _Iterator(stack)
 
 if __name__ == "__main__":
     # Write tests for your code here...
@@ -1,26 +1,286 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import attrgetter
+
 from data_structures.referential_array import ArrayR
 from data_structures.linked_queue import LinkedQueue
 from data_structures.linked_stack import LinkedStack
+from data_structures.lru_cache import LRUCache
+from data_structures.node import Node
+
+try:
+    import numpy as np
+except ImportError:  # optional: only signature scheme 2's batch backend needs it
+    np = None
 
 class Transaction:
+    # Fixed fields only: no per-instance __dict__, which matters with millions alive.
+    # A signature is kept either as a string in _signature or, when signed in integer
+    # mode, as its value in _signature_value; .signature renders the latter on each read.
+    __slots__ = ("timestamp", "from_user", "to_user", "_signature", "_signature_value")
+
     def __init__(self, timestamp, from_user, to_user):
         self.timestamp = timestamp
         self.from_user = from_user
         self.to_user = to_user
-        self.signature = None
+        self._signature = None
+        self._signature_value = None
 
     _SIG_LEN = 36  
     _ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789" 
     _MODULUS = 36 ** _SIG_LEN 
+    _POWERS = tuple(36 ** k for k in range(_SIG_LEN - 1, -1, -1))
+    _FROM_MULTIPLIER = 16777619
+    _TO_MULTIPLIER = 1099511628211
+    _user_cache = None
+    _integer_signatures = False
+    _MASK64 = (1 << 64) - 1
+    _WORD_MODULUS = 36 ** 12
+    # Below this many lanes still mixing, a vectorised step per character costs more
+    # than finishing those lanes in pure Python (see _mix_users_numpy).
+    _NUMPY_MIN_LANES = 32
+
+    # Signature schemes. Scheme 1 is the original arbitrary-precision hash. Scheme 2 runs
+    # the same mixing steps truncated to 64 bits, then expands the 64-bit state into three
+    # SplitMix64 words, each rendered as 12 base-36 digits (36^12 < 2^64). Its fixed-width
+    # arithmetic gives identical results in pure Python and in NumPy uint64 lanes on every
+    # platform. Signatures from different schemes differ, so a stored signature must be
+    # checked with the scheme that produced it.
+    SCHEME_V1 = 1
+    SCHEME_V2 = 2
+
+    @property
+    def signature(self):
+        """
+        The signature string, or None if unsigned. An integer signature is rendered on
+        every read and never stored, so the transaction keeps its integer form.
+        :complexity: O(1) for a string signature, O(L) to render an integer one.
+        """
+        signature = self._signature
+        if signature is None and self._signature_value is not None:
+            return Transaction._encode(self._signature_value, Transaction._triples())
+        return signature
+
+    @signature.setter
+    def signature(self, value):
+        self._signature = value
+        self._signature_value = None
+
+    @property
+    def signature_value(self):
+        """
+        The signature as an integer below _MODULUS when signed in integer mode, else None.
+        Its base-36 digits, most significant first, are the signature's page indices.
+        :complexity: O(1)
+        """
+        return self._signature_value
+
+    def is_signed(self):
+        """
+        :complexity: O(1). Unlike reading .signature, never renders an integer signature.
+        """
+        return self._signature_value is not None or self._signature is not None
+
+    def signature_digit(self, k):
+        """
+        Returns the alphabet index (0..35) of the k-th signature character.
+
+        :complexity: Best = Worst = O(1). Integer signatures use one division and one
+        modulo; string signatures look the character up in the 36-character alphabet.
+        """
+        value = self._signature_value
+        if value is not None:
+            return (value // Transaction._POWERS[k]) % 36
+        return Transaction._ALPHABET.index(self._signature[k])
+
+    @staticmethod
+    def set_integer_signatures(enabled: bool = True) -> None:
+        """
+        When enabled, sign() and sign_many() store the signature as its integer value and
+        the string is only rendered if someone reads .signature. Signatures already made
+        are not affected, and both forms describe the same signature.
+        :complexity: O(1)
+        """
+        Transaction._integer_signatures = enabled
+
+    def _set_signature_value(self, value):
+        self._signature = None
+        self._signature_value = value
+
+    def _store_value(self, value):
+        """ Stores a signature value below _MODULUS in the configured form. """
+        if Transaction._integer_signatures:
+            self._set_signature_value(value)
+        else:
+            self.signature = Transaction._encode(value, Transaction._triples())
+
+    @staticmethod
+    def _value_v2(timestamp, from_user, to_user):
+        """
+        Signature scheme 2 for one transaction, as an integer below _MODULUS. This is the
+        reference the NumPy backend must agree with.
+
+        :complexity: Best = Worst = O(S + R), as every step is fixed-width arithmetic.
+        """
+        m = Transaction._MASK64
+        h = (0x9E3779B185EBCA87 ^ ((timestamp & m) * 0xC2B2AE3D27D4EB4F)) & m
+        for c in from_user:
+            h = ((h * 1315423911) ^ (ord(c) * 16777619)) & m
+            h ^= h >> 13
+        h = ((h * 1469598103934665603) ^ ord('|')) & m
+        for c in to_user:
+            h = ((h * 2166136261) ^ (ord(c) * 1099511628211)) & m
+            h ^= h >> 11
+        h = ((h * 1469598103934665603) ^ ord('>')) & m
+        h ^= (h << 7) & m
+        h ^= h >> 17
+        h ^= (h << 31) & m
+
+        value = 0
+        j = 1
+        while j <= 3:
+            z = (h + j * 0x9E3779B97F4A7C15) & m
+            z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & m
+            z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & m
+            z ^= z >> 31
+            value = value * Transaction._WORD_MODULUS + z % Transaction._WORD_MODULUS
+            j += 1
+        return value
+
+    @staticmethod
+    def _mix_users_numpy(h, users, multiplier, term, shift):
+        """
+        :complexity: O(T + N log N) element operations for N lanes whose usernames have
+        T characters in total, in O(U) vectorised steps for U the length that at least
+        _NUMPY_MIN_LANES usernames reach; longer ones finish in pure Python.
+
+        The usernames' code points are kept in one concatenated buffer with each lane's
+        start offset and length, so names may contain any character (a NUL included)
+        and one long name costs only its own length. Lanes are ordered by decreasing
+        length, so at character position j the lanes still mixing are a prefix of them.
+        """
+        u64 = np.uint64
+        n = len(users)
+        lengths = np.fromiter(map(len, users), dtype=np.int64, count=n)
+        points = np.frombuffer("".join(users).encode("utf-32-le", "surrogatepass"),
+                               dtype=np.uint32).astype(np.uint64)
+        starts = np.cumsum(lengths) - lengths
+        order = np.argsort(-lengths, kind="stable")
+        starts = starts[order]
+        # Negated so they ascend, for searchsorted.
+        descending = -lengths[order]
+        state = h[order]
+        longest = int(-descending[0]) if n > 0 else 0
+        active = n
+        j = 0
+        while j < longest:
+            active = int(np.searchsorted(descending, -j, side="left"))
+            if active < Transaction._NUMPY_MIN_LANES:
+                break
+            mixed = (state[:active] * u64(multiplier)) ^ (points[starts[:active] + j] * u64(term))
+            mixed ^= mixed >> u64(shift)
+            state[:active] = mixed
+            j += 1
+
+        # The few lanes longer than all the others finish one by one on Python ints, so
+        # one long username does not cost a vectorised step per character.
+        m = Transaction._MASK64
+        k = 0
+        while j < longest and k < active:
+            x = int(state[k])
+            for c in users[order[k]][j:]:
+                x = ((x * multiplier) ^ (ord(c) * term)) & m
+                x ^= x >> shift
+            state[k] = x
+            k += 1
+        h = np.empty_like(state)
+        h[order] = state
+        return h
+
+    @staticmethod
+    def _sign_many_v2_numpy(transactions):
+        """
+        :complexity: O(N * (S + R + L)) element operations for N transactions, done as
+        O(S + R + L) NumPy array operations plus O(N) Python work to read inputs and
+        store the signatures.
+        """
+        n = len(transactions)
+        if n == 0:
+            return
+        u64 = np.uint64
+        m = Transaction._MASK64
+        # One ArrayR read per transaction; the field passes below then run over a tuple.
+        txs = tuple(map(transactions.__getitem__, range(n)))
+        ts = np.fromiter((t & m for t in map(attrgetter("timestamp"), txs)), dtype=np.uint64, count=n)
+        h = u64(0x9E3779B185EBCA87) ^ (ts * u64(0xC2B2AE3D27D4EB4F))
+        h = Transaction._mix_users_numpy(h, tuple(map(attrgetter("from_user"), txs)), 1315423911, 16777619, 13)
+        h = (h * u64(1469598103934665603)) ^ u64(ord('|'))
+        h = Transaction._mix_users_numpy(h, tuple(map(attrgetter("to_user"), txs)), 2166136261, 1099511628211, 11)
+        h = (h * u64(1469598103934665603)) ^ u64(ord('>'))
+        h ^= h << u64(7)
+        h ^= h >> u64(17)
+        h ^= h << u64(31)
+
+        words = ArrayR(3)
+        digits = np.empty((n, Transaction._SIG_LEN), dtype=np.uint8)
+        j = 0
+        while j < 3:
+            z = h + u64(((j + 1) * 0x9E3779B97F4A7C15) & m)
+            z = (z ^ (z >> u64(30))) * u64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> u64(27))) * u64(0x94D049BB133111EB)
+            z ^= z >> u64(31)
+            z %= u64(Transaction._WORD_MODULUS)
+            words[j] = z
+            k = 11
+            while k >= 0:
+                digits[:, 12 * j + k] = z % u64(36)
+                z = z // u64(36)
+                k -= 1
+            j += 1
+
+        if Transaction._integer_signatures:
+            base = Transaction._WORD_MODULUS
+            i = 0
+            for w0, w1, w2 in zip(words[0].tolist(), words[1].tolist(), words[2].tolist()):
+                txs[i]._set_signature_value((w0 * base + w1) * base + w2)
+                i += 1
+            return
+
+        alphabet = np.frombuffer(Transaction._ALPHABET.encode("ascii"), dtype=np.uint8)
+        signatures = alphabet[digits].view(f"S{Transaction._SIG_LEN}").ravel().astype(np.str_)
+        for tx, signature in zip(txs, signatures.tolist()):
+            tx.signature = signature
     
-    def sign(self):
+    def sign(self, scheme: int = SCHEME_V1):
         """
         :complexity: Best = Worst = O(S + R + L), where S = len(from_user),
         R = len(to_user), and L is the fixed signature length.
         
         This is because, under the assignment assumptions, arithmetic/bit ops 
         are O(1), so nothing else affects the cost.
+
+        When the username cache is enabled (see enable_user_cache), repeat users skip
+        turning their names into mixing terms; the result is the same signature.
+        scheme selects the signature scheme (see SCHEME_V1 / SCHEME_V2).
         """
+        if scheme == Transaction.SCHEME_V2:
+            self._store_value(Transaction._value_v2(self.timestamp, self.from_user, self.to_user))
+            return
+        if scheme != Transaction.SCHEME_V1:
+            raise ValueError(f"Unknown signature scheme {scheme}.")
+
+        cache = Transaction._user_cache
+        if cache is not None:
+            from_terms = Transaction._cached_terms(cache, self.from_user, 0)
+            to_terms = Transaction._cached_terms(cache, self.to_user, 1)
+            h = Transaction._digest(self.timestamp, from_terms, to_terms)
+            if Transaction._integer_signatures:
+                self._set_signature_value(h % Transaction._MODULUS)
+            else:
+                self.signature = Transaction._encode(h, Transaction._triples())
+            return
+
         h = 0x9E3779B185EBCA87 
         h ^= self.timestamp * 0xC2B2AE3D27D4EB4F 
    
@@ -52,6 +312,9 @@ class Transaction:
      
         L = Transaction._SIG_LEN 
         x = h % Transaction._MODULUS
+        if Transaction._integer_signatures:
+            self._set_signature_value(x)
+            return
         chars = ArrayR(L) 
         k = L - 1
         while k >= 0:
@@ -65,7 +328,254 @@ class Transaction:
             k += 1
         self.signature = s 
 
+    @staticmethod
+    def sign_many(transactions: ArrayR, scheme: int = SCHEME_V1):
+        """
+        Signs every transaction in the given ArrayR, producing exactly the signatures
+        sign() would.
+
+        :complexity: Best = Worst = O(N * (S + R + L)), where N = len(transactions) and
+        S, R, L are as in sign().
+
+        The asymptotic cost is the same as N calls to sign(), but the constant is much
+        smaller: each username is turned into its per-character mixing terms only when it
+        differs from the previous transaction's, and the signature is encoded three
+        characters at a time from a shared lookup table instead of one at a time.
+
+        With scheme=SCHEME_V2 and NumPy installed, the whole batch is hashed in uint64
+        lanes instead, one vectorised step per username character position.
+        """
+        if scheme == Transaction.SCHEME_V2:
+            if np is not None:
+                Transaction._sign_many_v2_numpy(transactions)
+            else:
+                i = 0
+                while i < len(transactions):
+                    transactions[i].sign(Transaction.SCHEME_V2)
+                    i += 1
+            return
+        if scheme != Transaction.SCHEME_V1:
+            raise ValueError(f"Unknown signature scheme {scheme}.")
+
+        Transaction._sign_many_v1(transactions, Transaction._user_cache, Transaction._integer_signatures)
+
+    @staticmethod
+    def _sign_many_v1(transactions, cache, integer_signatures):
+        """
+        sign_many's scheme 1 loop, with the username cache (or None) and the signing mode
+        given explicitly instead of read from Transaction's settings.
+        :complexity: Best = Worst = O(N * (S + R + L)), as sign_many().
+        """
+        triples = Transaction._triples()
+        last_from = None
+        last_to = None
+        from_terms = None
+        to_terms = None
+        i = 0
+        while i < len(transactions):
+            tx = transactions[i]
+            if cache is not None:
+                from_terms = Transaction._cached_terms(cache, tx.from_user, 0)
+                to_terms = Transaction._cached_terms(cache, tx.to_user, 1)
+            else:
+                if tx.from_user != last_from:
+                    last_from = tx.from_user
+                    from_terms = Transaction._user_terms(last_from, Transaction._FROM_MULTIPLIER)
+                if tx.to_user != last_to:
+                    last_to = tx.to_user
+                    to_terms = Transaction._user_terms(last_to, Transaction._TO_MULTIPLIER)
+            h = Transaction._digest(tx.timestamp, from_terms, to_terms)
+            if integer_signatures:
+                tx._set_signature_value(h % Transaction._MODULUS)
+            else:
+                tx.signature = Transaction._encode(h, triples)
+            i += 1
+
+    @staticmethod
+    def _user_terms(user, multiplier):
+        """
+        :complexity: Best = Worst = O(U), where U = len(user).
+        Returns the per-character terms sign() xors into the hash for this username.
+        """
+        return tuple(ord(c) * multiplier for c in user)
+
+    @staticmethod
+    def enable_user_cache(capacity: int = 1024) -> LRUCache:
+        """
+        Turns on a bounded LRU cache of per-username mixing terms, shared by sign() and
+        sign_many(), and returns it. Any previously enabled cache is discarded.
+
+        The hash chain itself depends on the timestamp, so only the username-specific
+        terms can be cached; the per-character mixing still runs on every signature.
+
+        :complexity: O(C) where C is the capacity, to allocate the cache.
+        """
+        Transaction._user_cache = LRUCache(capacity)
+        return Transaction._user_cache
+
+    @staticmethod
+    def disable_user_cache() -> None:
+        """
+        :complexity: O(1). Signing goes back to scanning usernames every time.
+        """
+        Transaction._user_cache = None
+
+    @staticmethod
+    def user_cache_stats():
+        """
+        Returns (hits, misses, evictions) of the username cache, or None when disabled.
+        Hits and misses count the (name, role) terms served: a name cached only as a
+        sender is a miss the first time it is needed as a receiver.
+        :complexity: O(1)
+        """
+        cache = Transaction._user_cache
+        if cache is None:
+            return None
+        return (cache.hits, cache.misses, cache.evictions)
+
+    @staticmethod
+    def _cached_terms(cache, user, role):
+        """
+        :complexity: Best case O(1) when the user's terms for this role are cached.
+        Worst case O(U), U = len(user), to compute and store them.
+
+        role 0 is the from_user terms and role 1 the to_user terms; both live in one
+        cache entry per username so each name counts once against the capacity. The
+        cache's hits and misses count terms served: finding the name without this role's
+        terms is recorded as a miss, not a hit.
+        """
+        entry = cache.get(user)
+        if entry is None:
+            entry = ArrayR(2)
+            cache[user] = entry
+            terms = None
+        else:
+            terms = entry[role]
+            if terms is None:
+                cache.hits -= 1
+                cache.misses += 1
+        if terms is None:
+            if role == 0:
+                terms = Transaction._user_terms(user, Transaction._FROM_MULTIPLIER)
+            else:
+                terms = Transaction._user_terms(user, Transaction._TO_MULTIPLIER)
+            entry[role] = terms
+        return terms
+
+    @staticmethod
+    def _digest(timestamp, from_terms, to_terms):
+        """
+        :complexity: Best = Worst = O(S + R), the lengths of the two term tuples.
+        Same mixing steps as sign(), but over precomputed username terms.
+        """
+        h = 0x9E3779B185EBCA87
+        h ^= timestamp * 0xC2B2AE3D27D4EB4F
+        for term in from_terms:
+            h = (h * 1315423911) ^ term
+            h ^= (h >> 13)
+        h = (h * 1469598103934665603) ^ ord('|')
+        for term in to_terms:
+            h = (h * 2166136261) ^ term
+            h ^= (h >> 11)
+        h = (h * 1469598103934665603) ^ ord('>')
+
+        h ^= (h << 7)
+        h ^= (h >> 17)
+        h ^= (h << 31)
+        if h < 0:
+            h = -h
+        return h
+
+    @staticmethod
+    def _encode(h, triples):
+        """
+        :complexity: Best = Worst = O(L), with L/3 table lookups instead of L.
+        Renders h % _MODULUS as the L-character signature, three base-36 digits per step.
+        """
+        x = h % Transaction._MODULUS
+        s = ""
+        k = 0
+        while k < Transaction._SIG_LEN // 3:
+            x, r = divmod(x, 46656)
+            s = triples[r] + s
+            k += 1
+        return s
+
+    _TRIPLES = None
+
+    @staticmethod
+    def _triples():
+        """
+        :complexity: O(1) once built; the first call builds all 36^3 three-character
+        strings, which is a fixed amount of work.
+        """
+        if Transaction._TRIPLES is None:
+            a = Transaction._ALPHABET
+            # A tuple rather than an ArrayR: this is read 12 times per signature and
+            # tuple indexing avoids a Python-level __getitem__ call each time.
+            Transaction._TRIPLES = tuple(
+                a[i // 1296] + a[(i // 36) % 36] + a[i % 36] for i in range(46656)
+            )
+        return Transaction._TRIPLES
+
+
+def _sign_rows(rows, integer_signatures=False, cache_capacity=None):
+    """
+    Executor worker: signs (timestamp, from_user, to_user) rows and returns their
+    signatures in the same order, for the caller to store on its own thread. Rows travel
+    as tuples because ArrayR cannot be pickled, so this runs on process pools too.
+    Each signature is returned as an int when integer_signatures is set, else as a string.
+
+    The signing mode and username cache capacity (None for no cache) are arguments, and
+    the cache is local to the call: Transaction's settings are neither read, which
+    spawn or forkserver workers would not have inherited, nor shared with other threads.
+
+    :complexity: Best = Worst = O(C * (S + R + L)) for a chunk of C rows, plus O(capacity)
+    to allocate the cache.
+    """
+    batch = ArrayR(len(rows))
+    i = 0
+    while i < len(rows):
+        row = rows[i]
+        batch[i] = Transaction(row[0], row[1], row[2])
+        i += 1
+    cache = None if cache_capacity is None else LRUCache(cache_capacity)
+    Transaction._sign_many_v1(batch, cache, integer_signatures)
+    if integer_signatures:
+        return tuple(batch[k].signature_value for k in range(len(batch)))
+    return tuple(batch[k].signature for k in range(len(batch)))
+
+
+def _signing_settings():
+    """
+    The arguments after the rows that _sign_rows needs to sign as this process would.
+    :complexity: O(1)
+    """
+    cache = Transaction._user_cache
+    return (Transaction._integer_signatures, None if cache is None else cache.capacity)
+
+
+def _store_signatures(pending, start, signatures):
+    """
+    Stores signatures returned by _sign_rows on pending[start:], in order.
+    :complexity: O(C) for C signatures.
+    """
+    k = start
+    j = 0
+    while j < len(signatures):
+        if type(signatures[j]) is int:
+            pending[k]._set_signature_value(signatures[j])
+        else:
+            pending[k].signature = signatures[j]
+        k += 1
+        j += 1
+
+
 class ProcessingLine:
+    PARALLEL_THRESHOLD = 20000
+    PARALLEL_CHUNK_SIZE = 5000
+    ASYNC_BATCH_SIZE = 256
+
     def __init__(self, critical_transaction):
         """
         :complexity: Best case is O(1).
@@ -81,6 +591,32 @@ class ProcessingLine:
         self._after = LinkedStack()
         self._locked = False
         self._iter_created = False
+        self._parallel = False
+        self._max_workers = None
+        self._parallel_threshold = ProcessingLine.PARALLEL_THRESHOLD
+        self._parallel_chunk_size = ProcessingLine.PARALLEL_CHUNK_SIZE
+        self._async_executor = None
+        self._async_batch_size = ProcessingLine.ASYNC_BATCH_SIZE
+
+    def enable_parallel_signing(self, max_workers=None, threshold=None, chunk_size=None):
+        """
+        Pre-sign every unsigned transaction on a process pool when iteration locks the line,
+        instead of signing lazily one at a time. Lines with fewer than `threshold` unsigned
+        transactions keep the lazy inline signing, since starting a pool costs more than it
+        saves there. Emission order is not affected.
+
+        :complexity: Best = Worst = O(1); the work happens in __iter__.
+        """
+        if self._locked:
+            raise RuntimeError("ProcessingLine is locked; cannot change signing mode.")
+        self._parallel = True
+        self._max_workers = max_workers
+        if threshold is not None:
+            self._parallel_threshold = threshold
+        if chunk_size is not None:
+            if chunk_size <= 0:
+                raise ValueError("chunk_size should be larger than 0.")
+            self._parallel_chunk_size = chunk_size
 
     def add_transaction(self, transaction):
         """
@@ -97,6 +633,71 @@ class ProcessingLine:
         else:
             self._after.push(transaction)
 
+    async def add_transaction_async(self, transaction):
+        """
+        add_transaction for producers running on an event loop: yields to the loop first,
+        so many producers interleave fairly, then adds. Raises RuntimeError once the
+        line is locked, like add_transaction.
+
+        :complexity: Best = Worst = O(1), as add_transaction.
+        """
+        await asyncio.sleep(0)
+        self.add_transaction(transaction)
+
+    def configure_async(self, executor=None, batch_size=None):
+        """
+        Sets the concurrent.futures executor async iteration signs on (None uses the event
+        loop's default executor) and how many transactions it signs per executor call.
+        Thread and process pools both work: workers sign picklable rows with their own
+        username cache and only return the signatures.
+        :complexity: O(1)
+        """
+        if self._locked:
+            raise RuntimeError("ProcessingLine is locked; cannot change signing mode.")
+        self._async_executor = executor
+        if batch_size is not None:
+            if batch_size <= 0:
+                raise ValueError("batch_size should be larger than 0.")
+            self._async_batch_size = batch_size
+
+    def add_transactions(self, transactions):
+        """
+        Adds every transaction from an iterable, exactly as repeated add_transaction calls
+        would, but partitions the batch in one pass into two pre-linked node chains and
+        splices each into its ADT at once.
+
+        :complexity: Best = Worst = O(N) for N transactions, with one comparison and one
+        node per transaction and O(1) splicing. If the line is locked, raising
+        RuntimeError is O(1) and nothing is added.
+        """
+        if self._locked:
+            raise RuntimeError("ProcessingLine is locked; cannot add transactions.")
+        critical_ts = self._critical.timestamp
+        front = None
+        rear = None
+        n_before = 0
+        top = None
+        bottom = None
+        n_after = 0
+        for tx in transactions:
+            node = Node(tx)
+            if tx.timestamp <= critical_ts:
+                if rear is None:
+                    front = node
+                else:
+                    rear.link = node
+                rear = node
+                n_before += 1
+            else:
+                # Later transactions go on top, as repeated pushes would leave them.
+                node.link = top
+                if top is None:
+                    bottom = node
+                top = node
+                n_after += 1
+        self._before.append_chain(front, rear, n_before)
+        self._after.push_chain(top, bottom, n_after)
+
     class _Iterator:
         def __init__(self, line):
             self._line = line
@@ -121,7 +722,7 @@ class ProcessingLine:
             # Emit <= critical in FIFO order
             if len(self._line._before) > 0:
                 tx = self._line._before.serve()
-                if tx.signature is None:
+                if not tx.is_signed():
                     tx.sign()  
                 return tx
 
@@ -129,14 +730,14 @@ class ProcessingLine:
             if not self._gave_critical:
                 self._gave_critical = True
                 tx = self._line._critical
-                if tx.signature is None:
+                if not tx.is_signed():
                     tx.sign()
                 return tx
 
             # Then > critical in LIFO order
             if len(self._line._after) > 0:
                 tx = self._line._after.pop()
-                if tx.signature is None:
+                if not tx.is_signed():
                     tx.sign()
                 return tx
 
@@ -157,8 +758,347 @@ class ProcessingLine:
             raise RuntimeError("An iterator already exists; processing has started.")
         self._iter_created = True
         self._locked = True
+        if self._parallel:
+            self._presign()
         return ProcessingLine._Iterator(self)
 
+    class _AsyncIterator:
+        def __init__(self, line):
+            self._line = line
+            self._gave_critical = False
+            self._batch = ArrayR(line._async_batch_size)
+            self._count = 0
+            self._index = 0
+
+        def __aiter__(self):
+            return self
+
+        def _take(self):
+            """
+            :complexity: Best = Worst = O(1). Next transaction in FIFO -> critical -> LIFO
+            order without signing it, or None when the line is exhausted.
+            """
+            line = self._line
+            if len(line._before) > 0:
+                return line._before.serve()
+            if not self._gave_critical:
+                self._gave_critical = True
+                return line._critical
+            if len(line._after) > 0:
+                return line._after.pop()
+            return None
+
+        async def __anext__(self):
+            """
+            :complexity: Best case is O(1) when the current batch still has transactions.
+
+            Worst case is O(B * (S + R + L)) for batch size B, when a new batch is taken and
+            signed; that signing runs on the executor, so the event loop is not blocked.
+            The executor gets the unsigned transactions as rows and returns signatures,
+            which are stored here on the loop's thread.
+            """
+            if self._index == self._count:
+                count = 0
+                unsigned = 0
+                while count < len(self._batch):
+                    tx = self._take()
+                    if tx is None:
+                        break
+                    self._batch[count] = tx
+                    if not tx.is_signed():
+                        unsigned += 1
+                    count += 1
+                if count == 0:
+                    raise StopAsyncIteration
+                if unsigned > 0:
+                    pending = ArrayR(unsigned)
+                    j = 0
+                    i = 0
+                    while i < count:
+                        if not self._batch[i].is_signed():
+                            pending[j] = self._batch[i]
+                            j += 1
+                        i += 1
+                    rows = tuple((pending[k].timestamp, pending[k].from_user, pending[k].to_user)
+                                 for k in range(unsigned))
+                    loop = asyncio.get_running_loop()
+                    signatures = await loop.run_in_executor(self._line._async_executor, _sign_rows,
+                                                            rows, *_signing_settings())
+                    _store_signatures(pending, 0, signatures)
+                self._count = count
+                self._index = 0
+
+            tx = self._batch[self._index]
+            self._batch[self._index] = None
+            self._index += 1
+            return tx
+
+    def __aiter__(self):
+        """
+        :complexity: Best = Worst = O(B) for the async batch size B, to allocate the batch
+        buffer. Locks the line like __iter__; only one iterator of either kind may exist.
+        """
+        if self._iter_created:
+            raise RuntimeError("An iterator already exists; processing has started.")
+        self._iter_created = True
+        self._locked = True
+        return ProcessingLine._AsyncIterator(self)
+
+    def _presign(self):
+        """
+        :complexity: Best = Worst = O(N) on this thread for N queued transactions, plus
+        O(U * (S + R + L)) signing work for the U unsigned ones, spread over the pool.
+
+        Both ADTs are drained into an array and rebuilt in the same order, so the iterator
+        still serves FIFO -> critical -> LIFO; only the signature fields change. Lines that
+        hold fewer transactions than the threshold return in O(1) without being drained.
+        """
+        n_before = len(self._before)
+        n_after = len(self._after)
+        if n_before + n_after + 1 < self._parallel_threshold:
+            return
+        pending = ArrayR(n_before + n_after + 1)
+        count = 0
+
+        i = 0
+        while i < n_before:
+            tx = self._before.serve()
+            self._before.append(tx)
+            if not tx.is_signed():
+                pending[count] = tx
+                count += 1
+            i += 1
+
+        if not self._critical.is_signed():
+            pending[count] = self._critical
+            count += 1
+
+        popped = ArrayR(n_after)
+        i = 0
+        while i < n_after:
+            tx = self._after.pop()
+            popped[i] = tx
+            if not tx.is_signed():
+                pending[count] = tx
+                count += 1
+            i += 1
+        i = n_after - 1
+        while i >= 0:
+            self._after.push(popped[i])
+            i -= 1
+
+        if count < self._parallel_threshold:
+            return
+
+        size = self._parallel_chunk_size
+        chunks = (
+            tuple((pending[k].timestamp, pending[k].from_user, pending[k].to_user)
+                  for k in range(start, min(start + size, count)))
+            for start in range(0, count, size)
+        )
+        integer_signatures, cache_capacity = _signing_settings()
+        with ProcessPoolExecutor(max_workers=self._max_workers) as pool:
+            start = 0
+            for signatures in pool.map(_sign_rows, chunks, repeat(integer_signatures),
+                                       repeat(cache_capacity)):
+                _store_signatures(pending, start, signatures)
+                start += len(signatures)
+
+class MultiPivotProcessingLine:
+    """
+    A ProcessingLine with k critical transactions (pivots) sorted by timestamp, replacing
+    k lines run back to back with a single pass over the feed.
+
+    Pivot i owns the segment of timestamps in (pivot[i-1], pivot[i]]: those are emitted
+    FIFO, followed by pivot i itself. Timestamps after the last pivot are emitted LIFO at
+    the very end. With one pivot this is exactly ProcessingLine's order.
+    """
+
+    def __init__(self, critical_transactions: ArrayR):
+        """
+        :complexity: Best = Worst = O(k) for k pivots, to copy them and create one queue
+        per segment. Raises ValueError if there are no pivots or they are not sorted by
+        timestamp.
+        """
+        k = len(critical_transactions)
+        if k == 0:
+            raise ValueError("At least one critical transaction is required.")
+        self._pivots = ArrayR(k)
+        self._pivot_ts = ArrayR(k)
+        self._segments = ArrayR(k)
+        i = 0
+        while i < k:
+            pivot = critical_transactions[i]
+            if i > 0 and pivot.timestamp < self._pivot_ts[i - 1]:
+                raise ValueError("Critical transactions must be sorted by timestamp.")
+            self._pivots[i] = pivot
+            self._pivot_ts[i] = pivot.timestamp
+            self._segments[i] = LinkedQueue()
+            i += 1
+        self._after = LinkedStack()
+        self._locked = False
+        self._iter_created = False
+
+    def _segment_of(self, timestamp):
+        """
+        :complexity: Best = Worst = O(log k). Binary search for the first pivot whose
+        timestamp is >= timestamp; k means the transaction is after every pivot.
+        """
+        lo = 0
+        hi = len(self._pivot_ts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._pivot_ts[mid] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def add_transaction(self, transaction):
+        """
+        :complexity: Best = Worst = O(log k) to find the segment, then O(1) to enqueue or
+        push. If the line is locked, raising RuntimeError is O(1).
+        """
+        if self._locked:
+            raise RuntimeError("ProcessingLine is locked; cannot add transactions.")
+        i = self._segment_of(transaction.timestamp)
+        if i == len(self._segments):
+            self._after.push(transaction)
+        else:
+            self._segments[i].append(transaction)
+
+    class _Iterator:
+        def __init__(self, line):
+            self._line = line
+            self._segment = 0
+            self._gave_critical = False
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            """
+            :complexity: Best case is O(1) when the current segment still has a signed
+            transaction to serve.
+
+            Worst case is O(k + S + R + L): skipping past empty segments costs O(1) each,
+            plus signing the emitted transaction if it is unsigned.
+            """
+            line = self._line
+            while self._segment < len(line._segments):
+                queue = line._segments[self._segment]
+                if len(queue) > 0:
+                    tx = queue.serve()
+                elif not self._gave_critical:
+                    self._gave_critical = True
+                    tx = line._pivots[self._segment]
+                else:
+                    self._segment += 1
+                    self._gave_critical = False
+                    continue
+                if not tx.is_signed():
+                    tx.sign()
+                return tx
+
+            if len(line._after) > 0:
+                tx = line._after.pop()
+                if not tx.is_signed():
+                    tx.sign()
+                return tx
+
+            raise StopIteration
+
+    def __iter__(self):
+        """
+        :complexity: Best = Worst = O(1). Locks the line; a second iterator raises
+        RuntimeError.
+        """
+        if self._iter_created:
+            raise RuntimeError("An iterator already exists; processing has started.")
+        self._iter_created = True
+        self._locked = True
+        return MultiPivotProcessingLine._Iterator(self)
+
+
+class StreamingProcessingLine:
+    """
+    A ProcessingLine fed from an iterable (e.g. a generator over a day's feed) instead of
+    add_transaction calls, emitting in the same FIFO -> critical -> LIFO order.
+
+    Transactions with timestamp <= critical are emitted as soon as they are pulled from
+    the source; only those > critical are buffered, since they must come out LIFO after
+    the source is exhausted. Memory held by the line is therefore O(A), where A is the
+    number of > critical transactions, rather than O(N) for the whole feed.
+    """
+
+    def __init__(self, critical_transaction, source):
+        """
+        :complexity: Best = Worst = O(1); the source is not read until iteration.
+        """
+        self._critical = critical_transaction
+        self._source = source
+        self._after = LinkedStack()
+        self._iter_created = False
+
+    class _Iterator:
+        def __init__(self, line):
+            self._line = line
+            self._source = iter(line._source)
+            self._exhausted = False
+            self._gave_critical = False
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            """
+            :complexity: Best case is O(1) when the next source item is <= critical and
+            already signed.
+
+            Worst case is O(K + S + R + L), where K is the number of consecutive > critical
+            items pulled (and pushed) before one can be emitted, and S + R + L is the cost
+            of signing the emitted transaction.
+            """
+            line = self._line
+            critical_ts = line._critical.timestamp
+            while not self._exhausted:
+                try:
+                    tx = next(self._source)
+                except StopIteration:
+                    self._exhausted = True
+                    break
+                if tx.timestamp <= critical_ts:
+                    if not tx.is_signed():
+                        tx.sign()
+                    return tx
+                line._after.push(tx)
+
+            if not self._gave_critical:
+                self._gave_critical = True
+                tx = line._critical
+                if not tx.is_signed():
+                    tx.sign()
+                return tx
+
+            if len(line._after) > 0:
+                tx = line._after.pop()
+                if not tx.is_signed():
+                    tx.sign()
+                return tx
+
+            raise StopIteration
+
+    def __iter__(self):
+        """
+        :complexity: Best = Worst = O(1). The source can only be consumed once, so a second
+        iterator raises RuntimeError like ProcessingLine does.
+        """
+        if self._iter_created:
+            raise RuntimeError("An iterator already exists; processing has started.")
+        self._iter_created = True
+        return StreamingProcessingLine._Iterator(self)
+
+
 if __name__ == "__main__":
     # Write tests for your code here...
     # We are not grading your tests, but we will grade your code with our own tests!
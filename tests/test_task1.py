@@ -1,11 +1,17 @@
 from unittest import TestCase
 import ast
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import copy
 import inspect
+import pickle
 
 from tests.helper import CollectionsFinder
 
 
-from processing_line import ProcessingLine, Transaction
+from processing_line import MultiPivotProcessingLine, ProcessingLine, StreamingProcessingLine, Transaction, _sign_rows
+
+from data_structures import ArrayR
 
 
 class TestTask1Setup(TestCase):
@@ -43,7 +49,326 @@ class TestTask1(TestTask1Setup):
                 self.fail("Iterator returned more transactions than expected.")
         
         self.assertEqual(counter, 3, "Line iterator should've returned exactly 3 transactions.")
-    
+
+    def test_sign_many_matches_sign(self):
+        """
+        #name(Batch signing matches per-transaction signing)
+        """
+        users = ["alice", "bob", "bob", "", "dave", "frank"]
+        batch = ArrayR(len(users) * 3)
+        singles = ArrayR(len(users) * 3)
+        for i in range(len(batch)):
+            args = (i * 7919 - 20, users[i % len(users)], users[(i * 5) % len(users)])
+            batch[i] = Transaction(*args)
+            singles[i] = Transaction(*args)
+            singles[i].sign()
+
+        Transaction.sign_many(batch)
+        for i in range(len(batch)):
+            self.assertEqual(batch[i].signature, singles[i].signature)
+            self.assertEqual(len(batch[i].signature), 36)
+
+    def test_user_cache(self):
+        """
+        #name(Username cache keeps signatures identical and counts hits, misses, evictions)
+        """
+        expected = Transaction(10, "alice", "bob")
+        expected.sign()
+
+        cache = Transaction.enable_user_cache(2)
+        try:
+            first = Transaction(10, "alice", "bob")
+            first.sign()
+            second = Transaction(10, "alice", "bob")
+            second.sign()
+            self.assertEqual(first.signature, expected.signature)
+            self.assertEqual(second.signature, expected.signature)
+            self.assertEqual(Transaction.user_cache_stats(), (2, 2, 0))
+
+            Transaction(11, "carol", "bob").sign()
+            self.assertEqual(Transaction.user_cache_stats(), (3, 3, 1))
+            self.assertNotIn("alice", cache)
+            self.assertEqual(len(cache), 2)
+
+            # Each role's terms are a separate hit or miss, even for a cached name.
+            cache = Transaction.enable_user_cache(4)
+            Transaction(1, "alice", "bob").sign()
+            Transaction(2, "bob", "alice").sign()
+            self.assertEqual(Transaction.user_cache_stats(), (0, 4, 0))
+            Transaction(3, "bob", "alice").sign()
+            self.assertEqual(Transaction.user_cache_stats(), (2, 4, 0))
+            self.assertEqual((cache.hits, cache.misses, cache.evictions), (2, 4, 0))
+            self.assertEqual(len(cache), 2)
+        finally:
+            Transaction.disable_user_cache()
+        self.assertIsNone(Transaction.user_cache_stats())
+
+    def test_integer_signatures_render_lazily(self):
+        """
+        #name(Integer-native signatures render to the same string on demand)
+        """
+        expected = Transaction(42, "alice", "bob")
+        expected.sign()
+
+        Transaction.set_integer_signatures(True)
+        try:
+            tx = Transaction(42, "alice", "bob")
+            tx.sign()
+            batch = ArrayR(1)
+            batch[0] = Transaction(42, "alice", "bob")
+            Transaction.sign_many(batch)
+        finally:
+            Transaction.set_integer_signatures(False)
+
+        self.assertTrue(tx.is_signed())
+        self.assertIsNotNone(tx.signature_value)
+        self.assertEqual(batch[0].signature_value, tx.signature_value)
+        for k in range(36):
+            self.assertEqual(tx.signature_digit(k), expected.signature_digit(k))
+        self.assertEqual(tx.signature, expected.signature)
+        # Reading the string renders it without storing it; copies keep the integer.
+        self.assertIsNotNone(tx.signature_value)
+        self.assertEqual(copy.copy(tx).signature_value, tx.signature_value)
+        self.assertEqual(pickle.loads(pickle.dumps(tx)).signature, expected.signature)
+
+        tx.signature = "abc"
+        self.assertIsNone(tx.signature_value)
+        self.assertEqual(tx.signature_digit(2), 2)
+
+        # Subclasses, with or without a __dict__, keep their class and their own methods.
+        class NotedTransaction(Transaction):
+            def describe(self):
+                return f"{self.note}: {self.signature}"
+
+        class SlottedTransaction(Transaction):
+            __slots__ = ("note",)
+
+            def describe(self):
+                return f"{self.note}: {self.signature}"
+
+        for cls in (NotedTransaction, SlottedTransaction):
+            Transaction.set_integer_signatures(True)
+            try:
+                sub = cls(42, "alice", "bob")
+                sub.note = "late"
+                sub.sign()
+            finally:
+                Transaction.set_integer_signatures(False)
+            self.assertIs(type(sub), cls)
+            self.assertEqual(sub.signature_value, batch[0].signature_value)
+            self.assertEqual(sub.describe(), f"late: {expected.signature}")
+            self.assertEqual(copy.copy(sub).signature_value, batch[0].signature_value)
+            sub.signature = "abc"
+            self.assertIs(type(sub), cls)
+            self.assertIsNone(sub.signature_value)
+
+    def test_add_transactions_matches_add_transaction(self):
+        """
+        #name(Bulk add_transactions behaves like repeated add_transaction)
+        """
+        timestamps = [10, 90, 20, 70, 30, 50, 60, 40]
+        single = ProcessingLine(Transaction(50, "carol", "dave"))
+        bulk = ProcessingLine(Transaction(50, "carol", "dave"))
+        single.add_transaction(Transaction(1, "x", "y"))
+        bulk.add_transaction(Transaction(1, "x", "y"))
+        bulk.add_transactions([])
+        for ts in timestamps:
+            single.add_transaction(Transaction(ts, "alice", "bob"))
+        bulk.add_transactions(Transaction(ts, "alice", "bob") for ts in timestamps)
+        bulk.add_transactions([Transaction(99, "x", "y"), Transaction(2, "x", "y")])
+        single.add_transaction(Transaction(99, "x", "y"))
+        single.add_transaction(Transaction(2, "x", "y"))
+
+        self.assertEqual([tx.timestamp for tx in bulk], [tx.timestamp for tx in single])
+        with self.assertRaises(RuntimeError):
+            bulk.add_transactions([Transaction(5, "alice", "bob")])
+
+    def test_multi_pivot_line(self):
+        """
+        #name(Multi-pivot line routes each transaction to its segment)
+        """
+        pivots = ArrayR.from_list([Transaction(ts, "carol", "dave") for ts in (20, 50, 80)])
+        line = MultiPivotProcessingLine(pivots)
+        for ts in [10, 90, 20, 70, 30, 50, 60, 40, 5, 95, 80, 81]:
+            line.add_transaction(Transaction(ts, "alice", "bob"))
+        order = [tx.timestamp for tx in line]
+        self.assertEqual(order, [10, 20, 5, 20, 30, 50, 40, 50, 70, 60, 80, 80, 81, 95, 90])
+        with self.assertRaises(RuntimeError):
+            line.add_transaction(Transaction(1, "alice", "bob"))
+
+        # A single pivot behaves exactly like ProcessingLine.
+        one = MultiPivotProcessingLine(ArrayR.from_list([Transaction(50, "carol", "dave")]))
+        reference = ProcessingLine(Transaction(50, "carol", "dave"))
+        for ts in [10, 90, 50, 70, 30]:
+            one.add_transaction(Transaction(ts, "alice", "bob"))
+            reference.add_transaction(Transaction(ts, "alice", "bob"))
+        self.assertEqual([tx.timestamp for tx in one], [tx.timestamp for tx in reference])
+
+        with self.assertRaises(ValueError):
+            MultiPivotProcessingLine(ArrayR.from_list([Transaction(9, "a", "b"), Transaction(3, "a", "b")]))
+
+    def test_async_iteration(self):
+        """
+        #name(Async iteration signs in batches and keeps the line's order)
+        """
+        timestamps = [10, 90, 20, 70, 30, 50, 60, 40]
+
+        async def run():
+            line = ProcessingLine(Transaction(50, "carol", "dave"))
+            line.configure_async(batch_size=3)
+            await asyncio.gather(*(line.add_transaction_async(Transaction(ts, "alice", "bob"))
+                                   for ts in timestamps))
+            emitted = [tx async for tx in line]
+            with self.assertRaises(RuntimeError):
+                await line.add_transaction_async(Transaction(1, "alice", "bob"))
+            return emitted
+
+        emitted = asyncio.run(run())
+        self.assertEqual([tx.timestamp for tx in emitted], [10, 20, 30, 50, 40, 50, 60, 70, 90])
+        for tx in emitted:
+            expected = Transaction(tx.timestamp, tx.from_user, tx.to_user)
+            expected.sign()
+            self.assertEqual(tx.signature, expected.signature)
+
+    def test_async_iteration_on_executors(self):
+        """
+        #name(Async iteration signs on thread and process pools in every signing mode)
+        """
+        async def run(executor):
+            line = ProcessingLine(Transaction(50, "carol", "dave"))
+            line.configure_async(executor, batch_size=4)
+            for ts in [10, 90, 20, 70, 30, 60]:
+                line.add_transaction(Transaction(ts, "alice", "bob"))
+            return [tx async for tx in line]
+
+        for executor in (ThreadPoolExecutor(2), ProcessPoolExecutor(1)):
+            with executor:
+                for integer_signatures in (False, True):
+                    Transaction.set_integer_signatures(integer_signatures)
+                    Transaction.enable_user_cache(4)
+                    try:
+                        emitted = asyncio.run(run(executor))
+                        stats = Transaction.user_cache_stats()
+                    finally:
+                        Transaction.set_integer_signatures(False)
+                        Transaction.disable_user_cache()
+                    # Workers sign with their own cache, never the shared one.
+                    self.assertEqual(stats, (0, 0, 0))
+                    self.assertEqual([tx.timestamp for tx in emitted], [10, 20, 30, 50, 60, 70, 90])
+                    for tx in emitted:
+                        self.assertEqual(tx.signature_value is not None, integer_signatures)
+                        expected = Transaction(tx.timestamp, tx.from_user, tx.to_user)
+                        expected.sign()
+                        self.assertEqual(tx.signature, expected.signature)
+
+    def test_streaming_line_matches_processing_line(self):
+        """
+        #name(Streaming line emits the same order and does not wait for the whole feed)
+        """
+        timestamps = [10, 90, 20, 70, 30, 50, 60, 40]
+        critical = Transaction(50, "carol", "dave")
+        line = ProcessingLine(critical)
+        for ts in timestamps:
+            line.add_transaction(Transaction(ts, "alice", "bob"))
+        expected = [tx.timestamp for tx in line]
+
+        pulled = []
+
+        def feed():
+            for ts in timestamps:
+                pulled.append(ts)
+                yield Transaction(ts, "alice", "bob")
+
+        stream = iter(StreamingProcessingLine(Transaction(50, "carol", "dave"), feed()))
+        first = next(stream)
+        self.assertEqual(first.timestamp, 10)
+        self.assertEqual(pulled, [10])
+        self.assertIsNotNone(first.signature)
+        self.assertEqual([first.timestamp] + [tx.timestamp for tx in stream], expected)
+
+    def test_signature_scheme_golden_values(self):
+        """
+        #name(Signature schemes 1 and 2 produce their documented golden values)
+        """
+        golden = [
+            ((0, "alice", "bob"), "8ket373n3fw8n4z6sq44moiiztne25ir3rfj", "jzbfzggeu44emb5uckbbap15ae7cc75oi4d2"),
+            ((50, "alice", "bob"), "0rdrpgopsp189gciq7mgner7plf3bw7iqfbm", "ou5gx4otgsnwkv1oowl0wxahcda0ire2s9bj"),
+            ((1700000000, "carol", "dave"), "kn35di5t3utr6grbkx8xwv4i0cv029fi1ocq", "dvaffhsug0ikrg93z9uop5xhw3hsdpi3gda0"),
+            ((-5, "", ""), "d3cxc4c0kvmrr4fwpk6cbbzbfp5s6wvymza0", "srsln1mp5ulztolg7bumk93arhi3oeae82kx"),
+            # Trailing NULs are part of the name.
+            ((1, "ab\x00", "b"), "58iwnrn5f581fb57suwnfdl190vv89nku0ib", "cwt2gjdig8z647ofztyhh56vi1zrfneog4bo"),
+            ((2, "x", "y\x00\x00"), "ao5ghplw7apaltrn3xlupxsqba69cnvbssvb", "yni9dm4a1ceuvn9gvsylhj76jq0xmikpmrri"),
+        ]
+        batch = ArrayR(len(golden))
+        for i, (args, v1, v2) in enumerate(golden):
+            tx = Transaction(*args)
+            tx.sign()
+            self.assertEqual(tx.signature, v1)
+            tx.sign(Transaction.SCHEME_V2)
+            self.assertEqual(tx.signature, v2)
+            batch[i] = Transaction(*args)
+
+        # Uses the NumPy backend when it is installed, the pure-Python one otherwise.
+        Transaction.sign_many(batch, Transaction.SCHEME_V2)
+        self.assertEqual([batch[i].signature for i in range(len(batch))], [v2 for _, _, v2 in golden])
+        with self.assertRaises(ValueError):
+            Transaction(1, "a", "b").sign(3)
+
+    def test_numpy_scheme_matches_reference(self):
+        """
+        #name(NumPy signing backend agrees with the pure-Python scheme 2)
+        """
+        import processing_line
+        if processing_line.np is None:
+            self.skipTest("NumPy is not installed")
+        users = ["alice", "bob", "", "\u00fcn\u00ef", "x" * 40, "ab\x00", "\x00", "y\x00\x00"]
+        batch = ArrayR(200)
+        for i in range(len(batch)):
+            batch[i] = Transaction(i * 982451653 - 2 ** 70, users[i % 8], users[(i * 3) % 7])
+        Transaction.sign_many(batch, Transaction.SCHEME_V2)
+        for i in range(len(batch)):
+            expected = Transaction(batch[i].timestamp, batch[i].from_user, batch[i].to_user)
+            expected.sign(Transaction.SCHEME_V2)
+            self.assertEqual(batch[i].signature, expected.signature)
+
+    def test_parallel_signing_keeps_order(self):
+        """
+        #name(Parallel pre-signing keeps FIFO, critical, LIFO order and signatures)
+        """
+        critical = Transaction(50, "carol", "dave")
+        line = ProcessingLine(critical)
+        line.enable_parallel_signing(max_workers=2, threshold=0, chunk_size=3)
+        added = []
+        for ts in [10, 90, 20, 70, 30, 50, 60, 40]:
+            tx = Transaction(ts, "alice", "bob")
+            line.add_transaction(tx)
+            added.append(tx)
+
+        # The iterator signs nothing itself: everything was signed when it locked the line.
+        line_iterator = iter(line)
+        for tx in added:
+            self.assertIsNotNone(tx.signature)
+        self.assertIsNotNone(critical.signature)
+
+        order = [tx.timestamp for tx in line_iterator]
+        self.assertEqual(order, [10, 20, 30, 50, 40, 50, 60, 70, 90])
+        for tx in added:
+            expected = Transaction(tx.timestamp, tx.from_user, tx.to_user)
+            expected.sign()
+            self.assertEqual(tx.signature, expected.signature)
+
+        # Workers get the signing mode and cache capacity as arguments, not globals.
+        rows = ((42, "alice", "bob"), (43, "bob", "alice"))
+        values = _sign_rows(rows, True, 8)
+        strings = _sign_rows(rows)
+        self.assertFalse(Transaction._integer_signatures)
+        self.assertIsNone(Transaction.user_cache_stats())
+        for row, value, string in zip(rows, values, strings):
+            expected = Transaction(*row)
+            expected.sign()
+            self.assertEqual(string, expected.signature)
+            self.assertEqual(Transaction._encode(value, Transaction._triples()), expected.signature)
+
 
 class TestTask1Approach(TestTask1Setup):
     def test_python_built_ins_not_used(self):
@@ -1,17 +1,61 @@
 from unittest import TestCase
 import ast
 import inspect
+import os
+import random
+import sys
+import tempfile
+import threading
 
 from tests.helper import CollectionsFinder
 
 from processing_line import Transaction
-from processing_book import ProcessingBook
+from processing_book import (
+    CompressedProcessingBook, ConcurrentProcessingBook, MappedProcessingBook, ProcessingBook,
+)
 
-from data_structures import ArrayR
+from data_structures import ArrayR, SparseArrayR
+
+
+def signed(signature, timestamp=1):
+    tr = Transaction(timestamp, "Alice", "Bob")
+    tr.signature = signature
+    return tr
+
+
+def page_order(signature):
+    return [ProcessingBook.LEGAL_CHARACTERS.index(c) for c in signature]
 
 
 class TestTask2Setup(TestCase):
-    pass
+    def assertBookMatches(self, book, expected):
+        """
+        Checks book holds exactly `expected` ({signature: amount}), iterates it in page
+        order, and that every nested book is minimal (at least two entries).
+        """
+        self.assertEqual(len(book), len(expected))
+        for signature, amount in expected.items():
+            self.assertEqual(book[signed(signature)], amount)
+        self.assertEqual(
+            [(tr.signature, amount) for tr, amount in book],
+            sorted(expected.items(), key=lambda item: page_order(item[0])),
+        )
+        stack = [book]
+        while stack:
+            current = stack.pop()
+            count = 0
+            for slot in current.pages:
+                if isinstance(slot, ProcessingBook):
+                    self.assertGreaterEqual(len(slot), 2)
+                    stack.append(slot)
+                    count += len(slot)
+                elif slot is not None:
+                    count += 1
+            self.assertEqual(count, len(current))
+
+    def random_signatures(self, rng, count, length=6, alphabet="ab0"):
+        """ Signatures over a tiny alphabet, so they share long prefixes. """
+        return list({"".join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)})
 
 
 class TestTask2(TestTask2Setup):
@@ -26,6 +70,500 @@ class TestTask2(TestTask2Setup):
 
         book[transaction] = 100
         self.assertEqual(book[transaction], 100)
+
+    def test_randomised_operations(self):
+        """
+        #name(Test inserts, updates and deletes against a model, including deep collisions)
+        """
+        self.run_random_operations(ProcessingBook())
+
+    def test_compressed_book(self):
+        """
+        #name(Test the path-compressed book matches the model and has no single-page books)
+        """
+        book = self.run_random_operations(CompressedProcessingBook())
+        stack = [book]
+        while stack:
+            current = stack.pop()
+            children = [slot for slot in current.pages if slot is not None]
+            if current is not book:
+                self.assertGreaterEqual(len(children), 2)
+            stack.extend(slot for slot in children if isinstance(slot, ProcessingBook))
+
+        # Two signatures sharing 30 characters need one nested book, not 30.
+        book = CompressedProcessingBook()
+        book[signed("a" * 30 + "bbbbbb")] = 1
+        book[signed("a" * 30 + "cccccc")] = 2
+        book[signed("a" * 29 + "zcccccc")] = 3
+        nested = book.pages[book.page_index("a")]
+        self.assertEqual(nested._level, 29)
+        self.assertEqual(nested.pages[book.page_index("a")]._level, 30)
+        del book[signed("a" * 29 + "zcccccc")]
+        self.assertEqual(book.pages[book.page_index("a")]._level, 30)
+        self.assertBookMatches(book, {"a" * 30 + "bbbbbb": 1, "a" * 30 + "cccccc": 2})
+
+    def test_bulk_load(self):
+        """
+        #name(Test bulk_load builds the same book and error count as item-by-item inserts)
+        """
+        def layout(book):
+            return [
+                layout(slot) if isinstance(slot, ProcessingBook)
+                else None if slot is None else (slot[0].signature, slot[1])
+                for slot in book.pages
+            ] + [book._level, len(book)]
+
+        rng = random.Random(1014)
+        signatures = self.random_signatures(rng, 80)
+        pairs = [(signed(rng.choice(signatures)), rng.randint(1, 3)) for _ in range(200)]
+        presorted = sorted(pairs, key=lambda pair: page_order(pair[0].signature))
+        for cls in (ProcessingBook, CompressedProcessingBook):
+            expected = cls()
+            for tr, amount in pairs:
+                expected[tr] = amount
+            for book in (cls.bulk_load(pairs), cls.bulk_load(pairs, sort=True),
+                         cls.bulk_load(presorted, presorted=True)):
+                self.assertIs(type(book), cls)
+                self.assertEqual(layout(book), layout(expected))
+                self.assertEqual(book.get_error_count(), expected.get_error_count())
+                self.assertBookMatches(book, {tr.signature: amount for tr, amount in expected})
+
+        self.assertEqual(len(ProcessingBook.bulk_load([])), 0)
+        with self.assertRaises(ValueError):
+            ProcessingBook.bulk_load([(signed("b1"), 1), (signed("a1"), 2)], presorted=True)
+        for sort in (False, True):
+            with self.assertRaises(KeyError):
+                ProcessingBook.bulk_load([(Transaction(1, "Alice", "Bob"), 1)], sort=sort)
+
+    def test_sparse_pages(self):
+        """
+        #name(Test books keep sparse pages until they pass SPARSE_PAGE_LIMIT)
+        """
+        book = ProcessingBook()
+        self.assertIsInstance(book.pages, SparseArrayR)
+        limit = ProcessingBook.SPARSE_PAGE_LIMIT
+        characters = ProcessingBook.LEGAL_CHARACTERS
+        expected = {}
+        for i in range(limit - 1):
+            expected[characters[-1 - i] + "a"] = i
+            book[signed(characters[-1 - i] + "a")] = i
+        self.assertIsInstance(book.pages, SparseArrayR)
+        self.assertEqual(book.pages.occupied(), limit - 1)
+        self.assertEqual(len(book.pages), len(characters))
+        self.assertEqual([slot is not None for slot in book.pages],
+                         [i > len(characters) - limit for i in range(len(characters))])
+
+        book[signed("ab")] = 100
+        book[signed("ac")] = 101
+        expected.update({"ab": 100, "ac": 101})
+        nested = book.pages[book.page_index("a")]
+        self.assertIsInstance(book.pages, SparseArrayR)
+        self.assertIsInstance(nested.pages, SparseArrayR)
+        self.assertBookMatches(book, expected)
+
+        book[signed("ba")] = 200
+        expected["ba"] = 200
+        self.assertIs(type(book.pages), ArrayR)
+        self.assertBookMatches(book, expected)
+        del book[signed("ab")]
+        del expected["ab"]
+        self.assertBookMatches(book, expected)
+
+        pages = SparseArrayR(5)
+        pages[3] = "x"
+        pages[-5] = "y"
+        self.assertEqual(pages.to_list(), ["y", None, None, "x", None])
+        self.assertEqual(pages.to_dense().to_list(), pages.to_list())
+        self.assertEqual([pages.next_set(i) for i in range(6)], [0, 3, 3, 3, 5, 5])
+        pages[3] = None
+        self.assertEqual(pages.occupied(), 1)
+        self.assertEqual(pages.next_set(1), 5)
+        with self.assertRaises(IndexError):
+            pages[5]
+
+        for source in (["a", None, "b", None], ArrayR.from_list(["a", None, "b", None])):
+            pages = SparseArrayR.from_list(source)
+            self.assertIs(type(pages), SparseArrayR)
+            self.assertEqual(pages.to_list(), ["a", None, "b", None])
+            self.assertEqual(pages.occupied(), 2)
+            self.assertEqual(str(pages), repr(pages))
+            self.assertEqual(str(pages), str(ArrayR.from_list(pages.to_list())))
+
+    def test_deep_iteration(self):
+        """
+        #name(Test iterating books nested deeper than a standard signature)
+        """
+        depth = Transaction._SIG_LEN + 10
+        expected = {}
+        for tail in ("a", "b", "0", "9"):
+            expected["z" * depth + tail] = len(expected)
+            expected["z" * (depth // 2) + "a" + tail] = len(expected)
+        expected["a"] = len(expected)
+        for book in (ProcessingBook(), CompressedProcessingBook()):
+            for signature, amount in expected.items():
+                book[signed(signature)] = amount
+            self.assertBookMatches(book, expected)
+            self.assertEqual([tr.signature for tr, _ in book.iter_prefix("z" * depth)],
+                             ["z" * depth + tail for tail in ("a", "b", "0", "9")])
+            self.assertEqual(list(book.slice(2, 5)), list(book)[2:5])
+
+    def test_prefix_and_range_queries(self):
+        """
+        #name(Test iter_prefix and iter_range stream the matching entries in page order)
+        """
+        rng = random.Random(1016)
+        signatures = self.random_signatures(rng, 150, length=5, alphabet="ab9z0")
+        for book in (ProcessingBook(), CompressedProcessingBook()):
+            for i, signature in enumerate(signatures):
+                book[signed(signature)] = i
+            ordered = sorted(signatures, key=page_order)
+            for prefix in ("", "a", "z0", "99", "9", "b0a", "aaaaa", "zzzzzz"):
+                self.assertEqual(
+                    [tr.signature for tr, _ in book.iter_prefix(prefix)],
+                    [s for s in ordered if s.startswith(prefix)],
+                )
+            for lo, hi in (("a", "b"), ("ab", "z"), ("z", "0"), ("b9", "b9"), ("0", "a"),
+                           (None, "b"), ("9", None), (None, None), ("a0z", "aab")):
+                self.assertEqual(
+                    [tr.signature for tr, _ in book.iter_range(lo, hi)],
+                    [s for s in ordered
+                     if (lo is None or page_order(s) >= page_order(lo))
+                     and (hi is None or page_order(s) < page_order(hi))],
+                )
+            amounts = {tr.signature: amount for tr, amount in book.iter_prefix("a")}
+            self.assertEqual(amounts, {s: signatures.index(s) for s in ordered if s[0] == "a"})
+            with self.assertRaises(ValueError):
+                book.iter_prefix("A")
+
+    def test_rank_select_slice(self):
+        """
+        #name(Test rank, select and slice follow page order)
+        """
+        rng = random.Random(1017)
+        signatures = self.random_signatures(rng, 150, length=5, alphabet="ab9z0")
+        for book in (ProcessingBook(), CompressedProcessingBook()):
+            for i, signature in enumerate(signatures):
+                book[signed(signature)] = i
+            ordered = sorted(signatures, key=page_order)
+            for k, signature in enumerate(ordered):
+                self.assertEqual(book.rank(signed(signature)), k)
+                self.assertEqual(book.select(k)[0].signature, signature)
+                self.assertEqual(book.select(k)[1], signatures.index(signature))
+            self.assertEqual(book.select(-1)[0].signature, ordered[-1])
+            for absent in ("aaaa", "zzzzzz", "99999", "b"):
+                self.assertEqual(book.rank(signed(absent)),
+                                 sum(page_order(s) < page_order(absent) for s in signatures))
+            for i, j in ((0, 10), (37, 41), (-5, None), (5, 5), (40, 30), (-1000, 3), (140, 1000)):
+                self.assertEqual([tr.signature for tr, _ in book.slice(i, j)], ordered[i:j])
+            with self.assertRaises(IndexError):
+                book.select(len(ordered))
+
+    def test_get_many_delete_many(self):
+        """
+        #name(Test batched lookups and deletes match one-by-one ones)
+        """
+        rng = random.Random(1022)
+        signatures = self.random_signatures(rng, 150)
+        limits = (ProcessingBook.SHARED_DESCENT_MIN_BATCH, ProcessingBook.SHARED_DESCENT_MIN_DEPTH)
+        try:
+            # With the limits at 0 every batch shares its descent; by default these ones
+            # are looked up and deleted one by one.
+            for batch, depth in (limits, (0, 0)):
+                ProcessingBook.SHARED_DESCENT_MIN_BATCH = batch
+                ProcessingBook.SHARED_DESCENT_MIN_DEPTH = depth
+                for cls in (ProcessingBook, CompressedProcessingBook, ConcurrentProcessingBook):
+                    self.check_get_many_delete_many(rng, cls(), signatures)
+        finally:
+            ProcessingBook.SHARED_DESCENT_MIN_BATCH, ProcessingBook.SHARED_DESCENT_MIN_DEPTH = limits
+
+        shallow = ProcessingBook()
+        deep = ProcessingBook()
+        for signature in signatures:
+            shallow[signed(signature)] = 1
+            deep[signed("0" * 20 + signature)] = 1
+        in_order = sorted(signatures, key=deep.page_indices)
+        requests = ArrayR.from_list([signed("0" * 20 + signature) for signature in in_order])
+        self.assertFalse(shallow._shares_descent(ArrayR.from_list([signed(s) for s in signatures])))
+        self.assertTrue(deep._shares_descent(requests))
+        self.assertIsNotNone(deep._sorted_requests(requests, sort=False)[0])
+        self.assertEqual(deep.get_many(requests).to_list(), [1] * len(signatures))
+        self.assertEqual(deep.delete_many(requests), len(signatures))
+        self.assertBookMatches(deep, {})
+
+    def check_get_many_delete_many(self, rng, book, signatures):
+        model = {}
+        for i, signature in enumerate(signatures):
+            book[signed(signature)] = i
+            model[signature] = i
+        snapshot = book.snapshot()
+        requested = rng.sample(signatures, 60) + ["zzzzzz", "ab", signatures[0]]
+        transactions = [signed(signature) for signature in requested]
+        transactions.append(Transaction(1, "Alice", "Bob"))
+
+        self.assertEqual(book.get_many(transactions, default=-1).to_list(),
+                         [model.get(signature, -1) for signature in requested] + [-1])
+        # get_many() only shares the descent for transactions already in page order.
+        ordered = sorted(transactions[:-1], key=lambda tr: book.page_indices(tr.signature))
+        self.assertEqual(book.get_many(ordered, default=-1).to_list(),
+                         [model.get(tr.signature, -1) for tr in ordered])
+        self.assertEqual(book.delete_many(transactions), len(set(requested) & set(model)))
+        for signature in requested:
+            model.pop(signature, None)
+        self.assertBookMatches(book, model)
+        self.assertEqual(book.get_many(transactions).to_list(), [None] * len(transactions))
+        self.assertBookMatches(snapshot, dict(zip(signatures, range(len(signatures)))))
+        with self.assertRaises(TypeError):
+            snapshot.delete_many(transactions)
+
+        self.assertEqual(book.delete_many(signed(signature) for signature in model), len(model))
+        self.assertBookMatches(book, {})
+
+    def test_snapshot(self):
+        """
+        #name(Test snapshots keep their contents while the book keeps changing)
+        """
+        rng = random.Random(1018)
+        signatures = self.random_signatures(rng, 100)
+        for book in (ProcessingBook(), CompressedProcessingBook()):
+            model = {}
+            snapshots = []
+            for step in range(500):
+                signature = rng.choice(signatures)
+                if rng.random() < 0.6:
+                    book[signed(signature)] = rng.randint(1, 3)
+                    model.setdefault(signature, book[signed(signature)])
+                elif signature in model:
+                    del book[signed(signature)]
+                    del model[signature]
+                if step % 40 == 0:
+                    snapshots.append((book.snapshot(), dict(model), book.get_error_count()))
+            self.assertBookMatches(book, model)
+            for snapshot, expected, errors in snapshots:
+                self.assertBookMatches(snapshot, expected)
+                self.assertEqual(snapshot.get_error_count(), errors)
+                self.assertIs(type(snapshot), type(book))
+
+            snapshot = snapshots[-1][0]
+            with self.assertRaises(TypeError):
+                snapshot[signed("aaaaaa")] = 1
+            with self.assertRaises(TypeError):
+                del snapshot[signed(next(iter(snapshots[-1][1])))]
+            self.assertBookMatches(snapshot.snapshot(), snapshots[-1][1])
+
+        # Only the books on the written path are copied.
+        book = ProcessingBook()
+        book[signed("aaa")] = 1
+        book[signed("aab")] = 2
+        book[signed("b")] = 3
+        snapshot = book.snapshot()
+        book[signed("abc")] = 4
+        self.assertIsNot(book.pages, snapshot.pages)
+        self.assertIsNot(book.pages[0], snapshot.pages[0])
+        self.assertIs(book.pages[0].pages[0], snapshot.pages[0].pages[0])
+        self.assertIs(book.pages[1], snapshot.pages[1])
+
+    def test_concurrent_book(self):
+        """
+        #name(Test ConcurrentProcessingBook under writes from several threads)
+        """
+        self.run_random_operations(ConcurrentProcessingBook())
+
+        rng = random.Random(1019)
+        signatures = self.random_signatures(rng, 1200, length=7)
+        shared = signatures[:100]
+        workers = 6
+        own = [signatures[100 + i::workers] for i in range(workers)]
+        book = ConcurrentProcessingBook()
+        snapshots = []
+        failures = []
+        shared_writes = []
+
+        def work(i):
+            try:
+                local = random.Random(i)
+                mine = own[i]
+                for signature in mine:
+                    book[signed(signature)] = 1
+                    # Every worker gives the shared signatures its own amount.
+                    signature = local.choice(shared)
+                    book[signed(signature)] = i + 2
+                    shared_writes.append((signature, i + 2))
+                for signature in mine[::2]:
+                    del book[signed(signature)]
+                for signature in mine[1::2]:
+                    self.assertEqual(book[signed(signature)], 1)
+                    # Point queries run on the live book while others write.
+                    self.assertLess(book.rank(signed(signature)), len(signatures))
+                    book.select(0)
+                snapshots.append(book.snapshot())
+            except Exception as e:
+                failures.append(e)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(failures, [])
+
+        expected = {signature: 1 for mine in own for signature in mine[1::2]}
+        written = {}
+        for signature in shared:
+            try:
+                written[signature] = book[signed(signature)]
+            except KeyError:
+                pass
+        expected.update(written)
+        self.assertBookMatches(book, expected)
+        # Each shared signature keeps its first write; later ones with another amount are errors.
+        self.assertEqual(book.get_error_count(),
+                         sum(written[signature] != amount for signature, amount in shared_writes))
+        # rank() and select() do not take a snapshot, so later writes copy nothing.
+        token = book._token
+        ordered = sorted(expected, key=ProcessingBook().page_indices)
+        self.assertEqual(book.rank(signed(ordered[3])), 3)
+        self.assertEqual(book.select(3)[0].signature, ordered[3])
+        self.assertIs(book._token, token)
+        for snapshot in snapshots:
+            self.assertIs(type(snapshot), ProcessingBook)
+            self.assertBookMatches(snapshot, {tr.signature: amount for tr, amount in snapshot})
+
+    def test_mapped_book(self):
+        """
+        #name(Test saving a book and opening it memory-mapped)
+        """
+        rng = random.Random(1020)
+        signatures = self.random_signatures(rng, 150)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.pbk")
+            for book in (ProcessingBook(), CompressedProcessingBook(), ConcurrentProcessingBook()):
+                for i, signature in enumerate(signatures):
+                    tr = Transaction(i, "Alice", "Zoë")
+                    tr.signature = signature
+                    book[tr] = 2.5 if i % 7 == 0 else -i
+                for signature in signatures[::3]:
+                    del book[signed(signature)]
+                book[signed(signatures[1])] = 0
+                book.save(path)
+
+                with MappedProcessingBook(path) as mapped:
+                    self.assertEqual(len(mapped), len(book))
+                    self.assertEqual(mapped.get_error_count(), 1)
+                    entries = [(tr.signature, tr.timestamp, tr.from_user, tr.to_user, amount)
+                               for tr, amount in book]
+                    self.assertEqual([(tr.signature, tr.timestamp, tr.from_user, tr.to_user, amount)
+                                      for tr, amount in mapped], entries)
+                    for signature, _, _, _, amount in entries:
+                        self.assertEqual(mapped[signed(signature)], amount)
+                    for signature in signatures[::3] + ["abc", "0000000"]:
+                        with self.assertRaises(KeyError):
+                            mapped[signed(signature)]
+                    for prefix in ("", "a", "ab0", "b0ba", "000000", "zz", "9"):
+                        self.assertEqual([tr.signature for tr, _ in mapped.iter_prefix(prefix)],
+                                         [tr.signature for tr, _ in book.iter_prefix(prefix)])
+
+            with open(path, "wb") as out:
+                out.write(b"not a book")
+            with self.assertRaises(ValueError):
+                MappedProcessingBook(path)
+
+    def run_random_operations(self, book):
+        rng = random.Random(1008)
+        model = {}
+        errors = 0
+        signatures = self.random_signatures(rng, 120)
+        for step in range(600):
+            signature = rng.choice(signatures)
+            if rng.random() < 0.6:
+                amount = rng.randint(1, 3)
+                book[signed(signature)] = amount
+                if signature not in model:
+                    model[signature] = amount
+                elif model[signature] != amount:
+                    errors += 1
+            elif signature in model:
+                del book[signed(signature)]
+                del model[signature]
+            else:
+                with self.assertRaises(KeyError):
+                    del book[signed(signature)]
+            if step % 50 == 0:
+                self.assertBookMatches(book, model)
+        self.assertBookMatches(book, model)
+        self.assertEqual(book.get_error_count(), errors)
+        return book
+
+    def test_page_lookup(self):
+        """
+        #name(Test page_index and page_indices decode signatures)
+        """
+        book = ProcessingBook()
+        for i, character in enumerate(ProcessingBook.LEGAL_CHARACTERS):
+            self.assertEqual(book.page_index(character), i)
+        for illegal in ["A", "-", "\u00e9", "\u20ac"]:
+            with self.assertRaises(ValueError):
+                book.page_index(illegal)
+
+        self.assertEqual(list(book.page_indices("az09")), [0, 25, 26, 35])
+        with self.assertRaises(ValueError):
+            book.page_indices("ab-c")
+
+        tr = Transaction(1, "Alice", "Bob")
+        tr.sign()
+        expected = [book.page_index(c) for c in tr.signature]
+        self.assertEqual(list(book.page_indices(tr.signature)), expected)
+        Transaction.set_integer_signatures(True)
+        try:
+            tr.sign()
+        finally:
+            Transaction.set_integer_signatures(False)
+        self.assertEqual(list(book.page_indices(tr.signature_value)), expected)
+
+    def test_integer_signatures(self):
+        """
+        #name(Test processing book accepts integer-native and string signatures together)
+        """
+        strings = []
+        for i in range(20):
+            tr = Transaction(i, "Alice", "Bob")
+            tr.sign()
+            strings.append(tr)
+
+        Transaction.set_integer_signatures(True)
+        try:
+            values = []
+            for i in range(20):
+                tr = Transaction(i, "Alice", "Bob")
+                tr.sign()
+                values.append(tr)
+        finally:
+            Transaction.set_integer_signatures(False)
+
+        book = ProcessingBook()
+        for i in range(10):
+            book[values[i]] = i
+        for i in range(10, 20):
+            book[strings[i]] = i
+        self.assertEqual(len(book), 20)
+
+        # Same signatures in the other form find the same entries.
+        for i in range(20):
+            self.assertEqual(book[strings[i]], i)
+            self.assertEqual(book[values[i]], i)
+        book[strings[3]] = 99
+        self.assertEqual(book.get_error_count(), 1)
+
+        del book[strings[4]]
+        del book[values[15]]
+        self.assertEqual(len(book), 18)
+        with self.assertRaises(KeyError):
+            book[values[4]]
+        self.assertEqual(sorted(amount for _, amount in book), [i for i in range(20) if i not in (4, 15)])
     
 
 
@@ -1,13 +1,15 @@
 from unittest import TestCase
 import ast
 import inspect
+import random
 
 from tests.helper import CollectionsFinder
 
-from data_structures import ArrayR
+from data_structures import ArrayR, HashCounter, LinkedList
+from algorithms import counting_sort
 
 from processing_line import Transaction
-from fraud_detection import FraudDetection
+from fraud_detection import BlockGrouper, FraudDetection
 
 
 def to_array(lst):
@@ -25,6 +27,30 @@ def from_array(arr):
     return [from_array(item) if isinstance(item, ArrayR) else item for item in arr]
 
 
+def block_score(signatures, S):
+    """ The score of block size S, straight from its definition. """
+    L = len(signatures[0])
+    B = L // S
+    groups = {}
+    for sig in signatures:
+        key = (sig[B * S:], tuple(sorted(sig[i * S:i * S + S] for i in range(B))))
+        groups[key] = groups.get(key, 0) + 1
+    score = 1
+    for size in groups.values():
+        score *= size
+    return score
+
+
+class CollidingGrouper(BlockGrouper):
+    """ Fingerprints modulo 5, so different block multisets share them all the time. """
+    FINGERPRINT_PRIME = 5
+
+
+class CountingGrouper(BlockGrouper):
+    """ Counting sorts the blocks of every canonical key with more than one block. """
+    COUNTING_SORT_BLOCKS = 2
+
+
 class TestTask3Setup(TestCase):
     pass
     
@@ -46,6 +72,150 @@ class TestTask3(TestTask3Setup):
         self.assertGreater(blocks_response[0], 0, "Block size should be greater than 0.")
         self.assertGreaterEqual(blocks_response[1], 1, "Suspicion score for this example is 1, because there is only one transaction.")
 
+    def test_integer_signatures(self):
+        """
+        #name(Test block detection gives the same answer for integer-native signatures)
+        """
+        strings = []
+        for i in range(12):
+            tr = Transaction(i % 4, "Alice", "Bob")
+            tr.sign()
+            strings.append(tr)
+
+        Transaction.set_integer_signatures(True)
+        try:
+            values = []
+            for i in range(12):
+                tr = Transaction(i % 4, "Alice", "Bob")
+                tr.sign()
+                values.append(tr)
+        finally:
+            Transaction.set_integer_signatures(False)
+
+        expected = FraudDetection(to_array(strings)).detect_by_blocks()
+        self.assertEqual(expected[1], 3 ** 4)
+        self.assertEqual(FraudDetection(to_array(values)).detect_by_blocks(), expected)
+        # The blocks are cut from the integers: nothing is rendered onto the transactions.
+        self.assertIsNone(BlockGrouper(to_array(values)).signatures)
+        for tr in values:
+            self.assertIsNotNone(tr.signature_value)
+            self.assertIsNone(tr._signature)
+
+        # Block-shuffled signatures, so the integer path's groups are not all singletons.
+        rng = random.Random(1023)
+        L = Transaction._SIG_LEN
+        bases = ["".join(rng.choice("ab0") for _ in range(L)) for _ in range(3)]
+        signatures = []
+        integers = []
+        for i in range(40):
+            sig = rng.choice(bases)
+            S = rng.randint(1, L)
+            blocks = [sig[j * S:j * S + S] for j in range(L // S)]
+            rng.shuffle(blocks)
+            sig = "".join(blocks) + sig[L // S * S:]
+            signatures.append(sig)
+            value = 0
+            for c in sig:
+                value = value * 36 + Transaction._ALPHABET.index(c)
+            tr = Transaction(i, "Alice", "Bob")
+            tr._set_signature_value(value)
+            integers.append(tr)
+        self.assertEqual([tr.signature for tr in integers], signatures)
+        scores = [block_score(signatures, S) for S in range(1, L + 1)]
+        for grouper in (BlockGrouper(to_array(integers)),
+                        BlockGrouper(to_array(integers), fingerprints=False),
+                        CollidingGrouper(to_array(integers)),
+                        CountingGrouper(to_array(integers), fingerprints=False)):
+            self.assertIsNotNone(grouper.values)
+            self.assertEqual([grouper.score(S) for S in range(1, L + 1)], scores)
+
+
+    def test_block_grouper(self):
+        """
+        #name(Test BlockGrouper scores every block size as the definition does)
+        """
+        rng = random.Random(1023)
+        for L in (1, 5, 12):
+            bases = ["".join(rng.choice("ab0") for _ in range(L)) for _ in range(3)]
+            signatures = []
+            for i in range(60):
+                sig = rng.choice(bases)
+                S = rng.randint(1, L)
+                blocks = [sig[j * S:j * S + S] for j in range(L // S)]
+                rng.shuffle(blocks)
+                signatures.append("".join(blocks) + sig[L // S * S:])
+            transactions = []
+            for sig in signatures:
+                tr = Transaction(1, "Alice", "Bob")
+                tr.signature = sig
+                transactions.append(tr)
+
+            scores = [block_score(signatures, S) for S in range(1, L + 1)]
+            for grouper in (BlockGrouper(to_array(transactions)),
+                            BlockGrouper(to_array(transactions), fingerprints=False),
+                            CollidingGrouper(to_array(transactions)),
+                            CountingGrouper(to_array(transactions), fingerprints=False)):
+                self.assertEqual([grouper.score(S) for S in range(1, L + 1)], scores)
+            best = max(scores)
+            self.assertEqual(FraudDetection(to_array(transactions)).detect_by_blocks(),
+                             (scores.index(best) + 1, best))
+        self.assertEqual(FraudDetection(ArrayR(0)).detect_by_blocks(), (1, 1))
+
+        # Characters outside the base-36 alphabet, and case, only matter to canonical keys.
+        signatures = ["A~b0aB", "aBb0A~", "b0A~aB", "a~b0AB", "é~b0aB", "b0é~aB", "A~b0ab"]
+        transactions = []
+        for sig in signatures:
+            tr = Transaction(1, "Alice", "Bob")
+            tr.signature = sig
+            transactions.append(tr)
+        scores = [block_score(signatures, S) for S in range(1, 7)]
+        for grouper in (BlockGrouper(to_array(transactions)), CollidingGrouper(to_array(transactions)),
+                        CountingGrouper(to_array(transactions))):
+            self.assertEqual([grouper.score(S) for S in range(1, 7)], scores)
+        best = max(scores)
+        self.assertEqual(FraudDetection(to_array(transactions)).detect_by_blocks(),
+                         (scores.index(best) + 1, best))
+        self.assertEqual(BlockGrouper.fingerprint("A~b0aB", 2), BlockGrouper.fingerprint("aBb0A~", 2))
+        self.assertNotEqual(BlockGrouper.fingerprint("A~b0aB", 2), BlockGrouper.fingerprint("a~b0AB", 2))
+
+        mixed = []
+        for sig in ("abcde", "abcdefgh"):
+            tr = Transaction(1, "Alice", "Bob")
+            tr.signature = sig
+            mixed.append(tr)
+        with self.assertRaises(ValueError):
+            BlockGrouper(to_array(mixed))
+
+        self.assertEqual(BlockGrouper.fingerprint("ab0ab9", 2), BlockGrouper.fingerprint("b90aab", 2))
+        self.assertNotEqual(BlockGrouper.fingerprint("ab0ab9", 2), BlockGrouper.fingerprint("ab0a9b", 2))
+        self.assertNotEqual(BlockGrouper.fingerprint("ab0ab9", 4), BlockGrouper.fingerprint("ab0a9b", 4))
+
+        for sig, S in (("ab0ab9", 1), ("9zb0ab", 2), ("A~b0aB", 1), ("a~A~ab", 2)):
+            B = len(sig) // S
+            self.assertEqual(CountingGrouper.canonical(sig, S, ArrayR(B)),
+                             sig[B * S:] + "".join(sorted(sig[j * S:j * S + S] for j in range(B))))
+
+        for c in BlockGrouper.SYMBOLS + "A~\x00é\u20ac":
+            self.assertEqual(BlockGrouper.symbol_rank(c + "x"), BlockGrouper.SYMBOLS.find(c) + 1)
+
+        items = ArrayR.from_list(["b2", "a1", "c1", "a2", "b1"])
+        self.assertIs(counting_sort(items, lambda x: ord(x[0]) - ord("a"), 3), items)
+        self.assertEqual(items.to_list(), ["a1", "a2", "b2", "b1", "c1"])
+        linked = LinkedList()
+        for x in (3, 0, 2, 0):
+            linked.append(x)
+        self.assertEqual(list(counting_sort(linked, lambda x: x, 4)), [0, 0, 2, 3])
+        self.assertEqual(list(linked), [3, 0, 2, 0])
+
+        counter = HashCounter(2)
+        for key in ("x", "y", "x", "z", "x"):
+            counter.add(key)
+        self.assertEqual(counter.add("y", 3), 4)
+        self.assertEqual(list(counter), ["x", "y", "z"])
+        self.assertEqual(list(counter.counts()), [3, 4, 1])
+        self.assertEqual((counter["x"], counter["w"], len(counter)), (3, 0, 3))
+        counter.clear()
+        self.assertEqual((len(counter), list(counter)), (0, []))
 
 
 class TestTask3Approach(TestTask3Setup):